@@ -1,21 +1,37 @@
+import time
+
+_PROCESS_START = time.perf_counter()
+
 import os
 import json
 import tkinter as tk
-import time
 import sys
-import subprocess
 import re
-import hashlib
-from tkinter import messagebox, ttk, simpledialog
-from core.api import (
-    FlashStudyAPI,
-    verify_license,
-    enqueue_download_job,
-    get_download_statuses,
-    get_drive_link,
-    schedule_cleanup,
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from urllib.parse import urlsplit
+from tkinter import filedialog, messagebox, ttk, simpledialog
+from core.batch import BatchJobQueue, BatchPipeline, JOB_DONE, JOB_FAILED, JOB_PENDING, JOB_RUNNING
+from core.downloader import LocalVideoDownloader, default_download_dir, safe_filename
+from core.event_log import configure_event_logger
+from core.metrics import get_metrics
+from core.models import (
+    CourseDetail,
+    Lesson,
+    LessonChild,
+    LessonDetail,
+    LessonType,
+    lesson_type,
+    normalize_video_url,
+    video_id_for,
 )
-from core.utils import load_config, save_config, ensure_resource_dir, get_device_info
+from core.prefetch import LessonPrefetcher
+from core.tasks import TaskRunner
+from core.store import JsonStore, open_store
+from core.utils import ensure_resource_dir, get_device_info, log_event
+from core.virtual_list import RowView, VirtualList
 
 def app_root_dir() -> str:
     """
@@ -38,11 +54,122 @@ def app_root_dir() -> str:
 RESOURCE_DIR = os.path.join(app_root_dir(), "app_resource")
 CONFIG_FILE_PATH = os.path.join(RESOURCE_DIR, ".conf.json")
 TEMP_FILE_PATH = os.path.join(RESOURCE_DIR, ".temp.data")
+TEMP_DB_PATH = os.path.join(RESOURCE_DIR, ".temp.db")
+LICENSE_KEY_RE = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+
+
+ROW_BG = "#FFFFFF"
+ROW_HOVER_BG = "#F1F5F9"
+
+
+def _course_tree_key(item: Lesson | LessonChild) -> tuple:
+    return ("chapter" if isinstance(item, Lesson) else "lesson"), item.lesson_id
+
+
+def _course_tree_kind(item: Lesson | LessonChild) -> str:
+    if isinstance(item, Lesson):
+        return "chapter"
+    return "action" if item.openable else "lesson"
+
+
+class _CourseRow(RowView):
+    def __init__(self, master, on_open):
+        self.widget = tk.Frame(master, bg=ROW_BG, pady=4)
+        self._card = tk.Frame(self.widget, bg=ROW_BG, padx=10, pady=8, highlightthickness=1, highlightbackground="#E2E8F0")
+        self._card.pack(fill="both", expand=True)
+        self._card.grid_columnconfigure(0, weight=1)
+        self._left = tk.Frame(self._card, bg=ROW_BG)
+        self._left.grid(row=0, column=0, sticky="w")
+        self._title = tk.Label(self._left, bg=ROW_BG, fg="#0F172A", font=("SF Pro Text", 12, "bold"))
+        self._title.pack(anchor="w")
+        self._meta = tk.Label(self._left, bg=ROW_BG, fg="#334155", font=("SF Pro Text", 10))
+        self._meta.pack(anchor="w", pady=(2, 0))
+        ttk.Button(self._card, text="Chi tiết", style="Primary.TButton", command=lambda: on_open(self.item)).grid(
+            row=0, column=1, sticky="e", padx=(12, 6)
+        )
+
+    def update(self, item):
+        self.item = item
+        self._title.configure(text=item.course_name)
+        self._meta.configure(text=f"Giáo viên: {item.teacher_name} • Hết hạn: {item.expired_time}")
+
+    def set_hover(self, hover):
+        bg = ROW_HOVER_BG if hover else ROW_BG
+        for w in (self._card, self._left, self._title, self._meta):
+            w.configure(bg=bg)
+
+
+class _ChapterRow(RowView):
+    def __init__(self, master):
+        self.widget = tk.Frame(master, bg=ROW_BG, pady=4)
+        card = tk.Frame(self.widget, bg=ROW_BG, padx=10, pady=8, highlightthickness=1, highlightbackground="#E2E8F0")
+        card.pack(fill="both", expand=True)
+        self._title = tk.Label(card, bg=ROW_BG, fg="#0F172A", font=("SF Pro Text", 12, "bold"))
+        self._title.pack(anchor="w")
+
+    def update(self, item):
+        self.item = item
+        self._title.configure(text=item.lesson_name)
+
+
+class _LessonRow(RowView):
+    def __init__(self, master, on_action=None):
+        self.widget = tk.Frame(master, bg=ROW_BG, padx=28, pady=6)
+        self.widget.grid_columnconfigure(0, weight=1)
+        self._title = tk.Label(self.widget, bg=ROW_BG, fg="#0F172A", font=("SF Pro Text", 11))
+        self._title.grid(row=0, column=0, sticky="w")
+        self._button = None
+        if on_action is not None:
+            self._button = ttk.Button(
+                self.widget, style="Primary.TButton", width=18, command=lambda: on_action(self.item)
+            )
+            self._button.grid(row=0, column=2, sticky="e", padx=(12, 6))
+
+    def update(self, item):
+        self.item = item
+        self._title.configure(text=item.lesson_name)
+        if self._button is not None:
+            self._button.configure(text="Video và đáp án" if item.type == LessonType.VIDEO else "Đề thi thử")
+
+    def set_hover(self, hover):
+        bg = ROW_HOVER_BG if hover else ROW_BG
+        self.widget.configure(bg=bg)
+        self._title.configure(bg=bg)
+
+
+class _SearchResultRow(RowView):
+    def __init__(self, master, on_open):
+        self.widget = tk.Frame(master, bg=ROW_BG, padx=10, pady=6)
+        self.widget.grid_columnconfigure(0, weight=1)
+        self._title = tk.Label(self.widget, bg=ROW_BG, fg="#0F172A", font=("SF Pro Text", 11, "bold"))
+        self._title.grid(row=0, column=0, sticky="w")
+        self._meta = tk.Label(self.widget, bg=ROW_BG, fg="#64748B", font=("SF Pro Text", 10))
+        self._meta.grid(row=1, column=0, sticky="w")
+        ttk.Button(self.widget, text="Mở", style="Secondary.TButton", command=lambda: on_open(self.item)).grid(
+            row=0, column=1, rowspan=2, sticky="e", padx=(12, 6)
+        )
+
+    def update(self, item):
+        self.item = item
+        if item.get("lesson_id") is None:
+            self._title.configure(text=item.get("course_name", ""))
+            self._meta.configure(text=f"Khoá học • Giáo viên: {item.get('teacher_name', '')}")
+        else:
+            self._title.configure(text=item.get("lesson_name", ""))
+            path = [item.get("course_name", ""), item.get("parent_name", "")]
+            self._meta.configure(text=" › ".join(p for p in path if p))
+
+    def set_hover(self, hover):
+        bg = ROW_HOVER_BG if hover else ROW_BG
+        for w in (self.widget, self._title, self._meta):
+            w.configure(bg=bg)
 
 
 class FlashStudyDownloaderApp:
-    def __init__(self, root):
+    def __init__(self, root, startup_benchmark: bool = False):
         self.root = root
+        self._startup_benchmark = startup_benchmark
+        self._startup_marks = {}
         self.root.title("FlashStudy Downloader")
         self.root.minsize(960, 640)
         self._center_window(900, 560)
@@ -50,37 +177,180 @@ class FlashStudyDownloaderApp:
         # ---- ttk theme & styles ----
         self._init_style()
 
-        # Load config + temp store
+        # Load config + temp store (ghi nguyên tử, gộp nhiều lần lưu liên tiếp thành một lần ghi)
         ensure_resource_dir(RESOURCE_DIR)
-        self.configuration = load_config(CONFIG_FILE_PATH)
-        self.temp = self._load_temp_store()
+        self._config_store = JsonStore(CONFIG_FILE_PATH, debounce=0.2, indent=2)
+        self.configuration = self._config_store.snapshot()
+        configure_event_logger(self.configuration)
+        self._temp_store = self._open_temp_store()
+        self.temp = self._temp_store.snapshot()
         self.device_info = self._ensure_device_info()
 
-        # API client
-        self.AppApi = FlashStudyAPI()
+        # API client + requests được import/khởi tạo ở nền (xem _init_backend)
+        self.AppApi = None
+        self.catalog = None
+        self.backend_batcher = None
+        self.drive_links = None
+        self.cleanup_scheduler = None
+        self.license_checker = None
+        self.root.protocol("WM_DELETE_WINDOW", self._on_app_close)
 
         self.auth = None
         self.current_frame = None
+        # màn hình đã dựng (danh sách khoá, nội dung từng khoá) -> ẩn/hiện thay vì dựng lại
+        self._screens: "OrderedDict[Any, dict]" = OrderedDict()
+        self._screen_key = None
 
         # status bar
         self.status_var = tk.StringVar(value="Sẵn sàng")
+        # trạng thái rate limiter/circuit breaker theo host (chỉ host không "ok")
+        self._host_health: dict = {}
         self._build_statusbar()
 
-        if not self._verify_license_on_startup():
+        # worker pool cho các call mạng, kết quả trả về thread UI qua root.after
+        self.tasks = TaskRunner(
+            self.root,
+            max_workers=int(self.configuration.get("ui_workers") or 4),
+            on_busy_change=self._on_busy_change,
+        )
+        self._login_pending = False
+        # kết quả get_my_courses lúc kiểm tra phiên (token không phải JWT) -> dùng cho lần vẽ đầu
+        self._resume_courses = None
+        self.prefetcher = None
+        self.downloader = None
+        self.segmented = None
+        self.media_library = None
+        # _resolve và thread tải gọi _get_media_library song song -> chỉ dựng một MediaLibrary
+        self._media_library_lock = threading.Lock()
+        self.status_watcher = None
+        # mọi tra cứu trạng thái video (popup, batch, prefetch) gom thành một request mỗi tick
+        self.status_registry = None
+        self.lesson_list = None
+        self._visible_job = None
+        self._current_course = (None, "")
+
+        # hàng đợi tải cả khoá (lưu trên đĩa, chạy tiếp sau khi mở lại app)
+        self.batch_queue = BatchJobQueue(os.path.join(RESOURCE_DIR, ".batch_queue.json"))
+        self.batch = BatchPipeline.from_config(
+            self.batch_queue,
+            self._process_batch_job,
+            self.configuration,
+            on_change=lambda summary: self.tasks.post(self._on_batch_change, summary),
+        )
+        self._batch_win = None
+        self._diag_win = None
+        self._start_metrics_export()
+
+        # Vẽ cửa sổ ngay; license và phiên đăng nhập được kiểm tra song song ở nền
+        self._show_startup_screen()
+        self.root.after_idle(self._mark_startup, "first_paint")
+        self.tasks.submit(self._run_startup_checks, on_success=self._on_startup_checks, on_error=self._on_startup_failed)
+
+    # ========== STARTUP ==========
+
+    def _show_startup_screen(self):
+        self._switch_frame(ttk.Frame(self.root, padding=24))
+        ttk.Label(self.current_frame, text="Đang khởi động…", style="Title2.TLabel").pack(expand=True)
+        self._set_status("Đang kiểm tra license…")
+
+    def _init_backend(self):
+        """Chạy nền: import requests/core.api và dựng API client trong lúc UI đã hiện."""
+        from core.api import BackendBatcher, FlashStudyAPI, configure_http_client, schedule_cleanups, verify_license
+        from core.cache import ResponseCache
+        from core.catalog import CatalogIndex
+        from core.drive_links import CleanupScheduler, DriveLinkCache
+        from core.license import LicenseCache, LicenseChecker
+        from core.status_registry import StatusRegistry
+
+        # API client (dùng chung pool kết nối keep-alive theo host)
+        http = configure_http_client(self.configuration)
+        if http.limiter is not None:
+            http.limiter.add_listener(lambda host, state: self.tasks.post(self._on_host_health, host, state))
+        # dữ liệu khoá/bài tải về được đánh chỉ mục vào .catalog.db để tìm kiếm offline
+        self.catalog = CatalogIndex(os.path.join(RESOURCE_DIR, ".catalog.db"))
+        self.AppApi = FlashStudyAPI(
+            cache=ResponseCache.from_config(os.path.join(RESOURCE_DIR, ".cache"), self.configuration),
+            catalog=self.catalog,
+        )
+        # token được đăng nhập lại trước khi hết hạn; token mới ghi vào .temp.data trên thread UI
+        self.AppApi.session.refresh_margin = float(self.configuration.get("session_refresh_margin") or 300)
+        self.AppApi.session.on_token_changed = lambda token: self.tasks.post(self._on_token_refreshed, token)
+        self.status_registry = StatusRegistry.from_config(self.configuration)
+        # get-link / enqueue / cleanup tới gần nhau được gom thành request batch
+        self.backend_batcher = BackendBatcher.from_config(self.configuration)
+        # drive link đã lấy (hoặc có sẵn trong trạng thái "done") dùng lại tới khi hết hạn
+        self.drive_links = DriveLinkCache.from_config(
+            self.configuration, open_store(os.path.join(RESOURCE_DIR, ".drive_links.json"), debounce=1.0)
+        )
+        self.status_registry.add_listener(self.drive_links.update_from_statuses)
+        self.cleanup_scheduler = CleanupScheduler(
+            lambda ids: schedule_cleanups(self.configuration, ids),
+            on_scheduled=lambda vid, data: self.drive_links.put(vid, data) if isinstance(data, dict) else None,
+        )
+        # kết quả verify license lưu lại theo device, chỉ gọi backend khi sắp/đã hết hạn
+        self.license_checker = LicenseChecker(
+            LicenseCache.from_config(
+                os.path.join(RESOURCE_DIR, ".license_cache.json"), self.configuration, self.device_info.get("device_id")
+            ),
+            verify_license,
+            on_revoked=lambda message: self.tasks.post(self._on_license_revoked, message),
+        )
+
+    def _run_startup_checks(self):
+        started = time.perf_counter()
+        self._init_backend()
+        backend_ms = (time.perf_counter() - started) * 1000
+
+        def _timed(fn):
+            t0 = time.perf_counter()
+            return fn(), (time.perf_counter() - t0) * 1000
+
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="flashstudy-startup") as pool:
+            license_future = pool.submit(_timed, self._check_license_in_background)
+            session_future = pool.submit(_timed, self._check_saved_session)
+            return backend_ms, license_future.result(), session_future.result()
+
+    def _on_startup_checks(self, result):
+        backend_ms, (license_result, license_ms), (session_valid, session_ms) = result
+        if not self._verify_license_on_startup(license_result):
             self.root.destroy()
             return
 
-        if self._auto_resume_session():
+        if self.batch_queue.has_pending():
+            self.batch.start()
+
+        if self._auto_resume_session(session_valid):
             # Có phiên còn hạn -> bỏ qua login
             self.show_course_selection()
-            return
+        else:
+            self.show_login_screen()
+        self._mark_startup("interactive")
+        self._report_startup(backend_ms=backend_ms, license_ms=license_ms, session_ms=session_ms)
 
-        self.show_login_screen()
+    def _on_startup_failed(self, exc):
+        messagebox.showerror("Lỗi khởi động", f"Không khởi tạo được kết nối.\n{exc}")
+        self.root.destroy()
+
+    def _mark_startup(self, name: str):
+        self._startup_marks.setdefault(name, (time.perf_counter() - _PROCESS_START) * 1000)
+
+    def _report_startup(self, **extra):
+        timings = {
+            "first_paint_ms": round(self._startup_marks.get("first_paint", 0.0), 1),
+            "interactive_ms": round(self._startup_marks.get("interactive", 0.0), 1),
+        }
+        timings.update({k: round(v, 1) for k, v in extra.items()})
+        log_event("startup", "READY", **timings)
+        if self._startup_benchmark:
+            print(json.dumps(timings))
+            self.root.after(0, self._on_app_close)
 
     # ========== UI BUILDERS ==========
 
     def show_login_screen(self):
         self._switch_frame(ttk.Frame(self.root, padding=24))
+        self._drop_cached_screens()
+        self._login_pending = False
 
         # outer container
         container = self.current_frame
@@ -147,109 +417,169 @@ class FlashStudyDownloaderApp:
         self._set_status("Nhập thông tin để đăng nhập")
 
     def show_course_selection(self):
-        self._switch_frame(ttk.Frame(self.root, padding=24))
-        wrapper = ttk.Frame(self.current_frame, style="Card.TFrame", padding=20)
-        wrapper.pack(expand=True, fill="both")
-
-        ttk.Label(wrapper, text="Danh sách khóa học", style="Title.TLabel").grid(row=0, column=0, sticky="w")
-
-        # fetch course list
+        screen = self._show_cached_screen("courses")
+        if screen is None:
+            screen = self._switch_frame(ttk.Frame(self.root, padding=24), key="courses")
+            wrapper = ttk.Frame(self.current_frame, style="Card.TFrame", padding=20)
+            wrapper.pack(expand=True, fill="both")
+            ttk.Label(wrapper, text="Danh sách khóa học", style="Title.TLabel").grid(row=0, column=0, sticky="w")
+            screen["wrapper"] = wrapper
+            screen["course_list"] = None
+            screen["search_results"] = None
+            screen["search_job"] = None
+            self._build_catalog_search(screen)
+
+        # fetch course list (chạy nền, UI vẫn phản hồi); màn đã có thì chỉ vá các hàng thay đổi
         self._set_status("Đang tải danh sách khóa học…")
-        code, courses = self.AppApi.get_my_courses()
-        if code != 0:
-            self._set_status("Không có khóa học trực tuyến")
-            messagebox.showinfo("Thông báo", "Bạn chưa mua khóa học online nào")
-            self.show_login_screen()
+        loading = None
+        if screen["course_list"] is None:
+            loading = ttk.Label(screen["wrapper"], text="Đang tải…", style="Label.TLabel")
+            loading.grid(row=1, column=0, sticky="w", pady=(12, 0))
+
+        def _on_loaded(result):
+            code, courses = result
+            if loading is not None:
+                loading.destroy()
+            if code != 0:
+                self._set_status("Không có khóa học trực tuyến")
+                messagebox.showinfo("Thông báo", "Bạn chưa mua khóa học online nào")
+                self.show_login_screen()
+                return
+            if screen["course_list"] is None:
+                self._render_course_list(screen, courses)
+            else:
+                screen["course_list"].set_items(courses)
+            self._set_status(f"Đã tải {len(courses)} khóa học")
+
+        def _on_failed(exc):
+            if loading is not None:
+                loading.destroy()
+            self._set_status("Không tải được danh sách khóa học")
+            messagebox.showerror("Lỗi", f"Không tải được danh sách khóa học.\n{exc}")
+
+        prefetched, self._resume_courses = self._resume_courses, None
+        if prefetched is not None and prefetched[0] == 0:
+            _on_loaded(prefetched)
             return
+        self.tasks.submit(self.AppApi.get_my_courses, on_success=_on_loaded, on_error=_on_failed, group="screen")
 
-        # Scrollable list
-        list_wrap = ttk.Frame(wrapper)
-        list_wrap.grid(row=1, column=0, sticky="nsew", pady=(12, 0))
+    def _render_course_list(self, screen: dict, courses):
+        wrapper = screen["wrapper"]
+        # Chỉ dựng các hàng đang hiển thị, tái sử dụng hàng khi cuộn
+        course_list = VirtualList(
+            wrapper,
+            row_factory=lambda _kind, master: _CourseRow(master, self._open_course_row),
+            item_key=lambda c: c.course_id,
+        )
+        course_list.grid(row=1, column=0, columnspan=3, sticky="nsew", pady=(12, 0))
         wrapper.grid_rowconfigure(1, weight=1)
         wrapper.grid_columnconfigure(0, weight=1)
+        course_list.set_items(courses)
+        screen["course_list"] = course_list
 
-        canvas = tk.Canvas(list_wrap, highlightthickness=0, bg="#FFFFFF")
-        vsb = ttk.Scrollbar(list_wrap, orient="vertical", command=canvas.yview)
-        canvas.configure(yscrollcommand=vsb.set)
-        canvas.pack(side="left", fill="both", expand=True)
-        vsb.pack(side="right", fill="y")
-
-        rows_frame = tk.Frame(canvas, bg="#FFFFFF")
-        rows_window = canvas.create_window((0, 0), window=rows_frame, anchor="nw")
-
-        def _on_frame_config(_e):
-            canvas.configure(scrollregion=canvas.bbox("all"))
-
-        def _on_canvas_config(e):
-            canvas.itemconfigure(rows_window, width=e.width)
-
-        rows_frame.bind("<Configure>", _on_frame_config)
-        canvas.bind("<Configure>", _on_canvas_config)
-
-        def _set_row_bg(frame, labels, bg):
-            frame.configure(bg=bg)
-            for lbl in labels:
-                lbl.configure(bg=bg)
-
-        for c in courses:
-            row = tk.Frame(rows_frame, bg="#FFFFFF", padx=10, pady=8, highlightthickness=1, highlightbackground="#E2E8F0")
-            row.pack(fill="x", pady=4)
-            row.grid_columnconfigure(0, weight=1)
-            row.grid_columnconfigure(1, weight=0)
-
-            left = tk.Frame(row, bg="#FFFFFF")
-            left.grid(row=0, column=0, sticky="w")
-
-            title = tk.Label(
-                left,
-                text=c.get("course_name", ""),
-                bg="#FFFFFF",
-                fg="#0F172A",
-                font=("SF Pro Text", 12, "bold"),
-            )
-            title.pack(anchor="w")
-
-            meta_text = f"Giáo viên: {c.get('teacher_name', '')} • Hết hạn: {c.get('expired_time', '')}"
-            meta = tk.Label(
-                left,
-                text=meta_text,
-                bg="#FFFFFF",
-                fg="#334155",
-                font=("SF Pro Text", 10),
-            )
-            meta.pack(anchor="w", pady=(2, 0))
+        actions = ttk.Frame(wrapper, style="Card.TFrame")
+        actions.grid(row=2, column=0, columnspan=3, pady=(12, 0), sticky="e")
+        ttk.Button(actions, text="Đăng xuất", style="Secondary.TButton", command=self.logout).pack(side="right")
+        if screen["search_var"].get().strip():
+            # người dùng đã gõ tìm kiếm trong lúc danh sách đang tải
+            self._run_catalog_search(screen)
+
+    # ----- tìm kiếm offline trong catalogue -----
+
+    def _build_catalog_search(self, screen: dict):
+        query_var = tk.StringVar()
+        entry = ttk.Entry(screen["wrapper"], textvariable=query_var, width=36)
+        entry.grid(row=0, column=1, sticky="e", padx=(12, 0))
+        ttk.Label(screen["wrapper"], text="🔍", style="Label.TLabel").grid(row=0, column=2, sticky="e", padx=(4, 0))
+        screen["search_var"] = query_var
+
+        def _on_change(*_args):
+            # gõ liên tục -> chỉ tìm sau khi dừng 150ms
+            if screen["search_job"] is not None:
+                self.root.after_cancel(screen["search_job"])
+            screen["search_job"] = self.root.after(150, self._run_catalog_search, screen)
+
+        query_var.trace_add("write", _on_change)
+        entry.bind("<Escape>", lambda _e: query_var.set(""))
+
+    def _run_catalog_search(self, screen: dict):
+        screen["search_job"] = None
+        query = screen["search_var"].get().strip()
+        course_list = screen["course_list"]
+        results_list = screen["search_results"]
+        if not query or self.catalog is None:
+            if results_list is not None:
+                results_list.grid_remove()
+            if course_list is not None:
+                course_list.grid()
+            return
 
-            btn = ttk.Button(
-                row,
-                text="Chi tiết",
-                style="Primary.TButton",
-                command=lambda cid=c.get("course_id"), cname=c.get("course_name", ""): self._open_course_detail(cid, cname),
+        started = time.perf_counter()
+        results = self.catalog.search(query, user_key=self.AppApi.user_key if self.AppApi else None)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if results_list is None:
+            results_list = VirtualList(
+                screen["wrapper"],
+                row_factory=lambda _kind, master: _SearchResultRow(master, self._open_search_result),
+                item_key=lambda r: (r.get("course_id"), r.get("lesson_id")),
             )
-            btn.grid(row=0, column=1, sticky="e", padx=(12, 6))
-
-            def _on_enter(_e, frame=row, labels=(title, meta)):
-                _set_row_bg(frame, labels, "#F1F5F9")
-
-            def _on_leave(_e, frame=row, labels=(title, meta)):
-                _set_row_bg(frame, labels, "#FFFFFF")
-
-            row.bind("<Enter>", _on_enter)
-            row.bind("<Leave>", _on_leave)
-            title.bind("<Enter>", _on_enter)
-            title.bind("<Leave>", _on_leave)
-            meta.bind("<Enter>", _on_enter)
-            meta.bind("<Leave>", _on_leave)
-            btn.bind("<Enter>", _on_enter)
-            btn.bind("<Leave>", _on_leave)
+            screen["search_results"] = results_list
+        if course_list is not None:
+            course_list.grid_remove()
+        results_list.grid(row=1, column=0, columnspan=3, sticky="nsew", pady=(12, 0))
+        screen["wrapper"].grid_rowconfigure(1, weight=1)
+        results_list.set_items(results)
+        self._set_status(f"{len(results)} kết quả cho “{query}” ({elapsed_ms:.0f} ms)")
+
+    def _open_search_result(self, item: dict):
+        self._open_course_detail(item.get("course_id"), item.get("course_name", ""))
+        if item.get("lesson_id") is None:
+            return
+        lesson = LessonChild(item["lesson_id"], item.get("lesson_name", ""), lesson_type(item.get("type")))
+        if lesson.openable:
+            self._open_lesson_row(lesson)
+
+    def show_course_content(self, chapters: CourseDetail, course_title: str = "", course_id=None, prefetch: bool = True):
+        key = ("course", course_id) if course_id is not None else None
+        screen = self._show_cached_screen(key) if key is not None else None
+        if screen is None:
+            screen = self._switch_frame(ttk.Frame(self.root, padding=16), key=key)
+            self._build_course_content(screen, course_title)
+        self.lesson_list = screen["lesson_list"]
+        self._current_course = (course_id, course_title)
+        self._apply_course_content(screen, chapters, prefetch=prefetch)
+
+    def _open_cached_course(self, course_id, course_title: str) -> bool:
+        """Khoá đã mở trước đó: hiện lại màn cũ ngay, nạp lại nội dung ở nền rồi vá phần thay đổi."""
+        key = ("course", course_id)
+        screen = self._screens.get(key)
+        if screen is None:
+            return False
+        self.show_course_content(screen["chapters"], course_title=course_title, course_id=course_id)
 
-        actions = ttk.Frame(wrapper, style="Card.TFrame")
-        actions.grid(row=2, column=0, pady=(12, 0), sticky="e")
-        ttk.Button(actions, text="Đăng xuất", style="Secondary.TButton", command=self.logout).pack(side="right")
+        def _on_loaded(result):
+            code, lessons = result
+            if code == 0 and self._screens.get(key) is screen:
+                self._apply_course_content(screen, lessons)
 
-        self._set_status(f"Đã tải {len(courses)} khóa học")
+        self.tasks.submit(self.AppApi.get_course_detail, course_id, on_success=_on_loaded, group="screen")
+        return True
 
-    def show_course_content(self, chapters_dict: dict, course_title: str = ""):
-        self._switch_frame(ttk.Frame(self.root, padding=16))
+    def _apply_course_content(self, screen: dict, chapters, prefetch: bool = True):
+        screen["chapters"] = CourseDetail.coerce(chapters)
+        if screen.get("key") is not None and self._screen_key != screen["key"]:
+            # màn đang ẩn -> lần hiện lại sẽ vá
+            return
+        self._chapters_raw = screen["chapters"]
+        changed = screen.get("rendered") != screen["chapters"]
+        if changed:
+            self._rebuild_course_tree()
+            screen["rendered"] = screen["chapters"]
+        # bản dở (đang stream) chưa prefetch, chờ danh sách đầy đủ
+        if prefetch and (changed or self.prefetcher is None):
+            self._start_prefetch()
+
+    def _build_course_content(self, screen: dict, course_title: str):
         rootf = self.current_frame
 
         # Header
@@ -261,6 +591,7 @@ class FlashStudyDownloaderApp:
 
         ttk.Button(header, text="Đăng xuất", style="Secondary.TButton", command=self.logout).pack(side="right")
         ttk.Button(header, text="⬅ Quay lại", style="Secondary.TButton", command=self._go_back_to_course_selection).pack(side="right", padx=(0, 8))
+        ttk.Button(header, text="Tải cả khoá", style="Primary.TButton", command=self._start_course_batch).pack(side="right", padx=(0, 8))
 
         # ----- Content list -----
 
@@ -268,26 +599,57 @@ class FlashStudyDownloaderApp:
         list_wrap = ttk.Frame(rootf, style="Card.TFrame", padding=8)
         list_wrap.pack(expand=True, fill="both")
 
-        self.lesson_canvas = tk.Canvas(list_wrap, highlightthickness=0, bg="#FFFFFF")
-        vsb = ttk.Scrollbar(list_wrap, orient="vertical", command=self.lesson_canvas.yview)
-        self.lesson_canvas.configure(yscrollcommand=vsb.set)
-        self.lesson_canvas.pack(side="left", fill="both", expand=True)
-        vsb.pack(side="right", fill="y")
-
-        self.course_items_frame = tk.Frame(self.lesson_canvas, bg="#FFFFFF")
-        items_window = self.lesson_canvas.create_window((0, 0), window=self.course_items_frame, anchor="nw")
-
-        def _on_items_config(_e):
-            self.lesson_canvas.configure(scrollregion=self.lesson_canvas.bbox("all"))
-
-        def _on_canvas_config(e):
-            self.lesson_canvas.itemconfigure(items_window, width=e.width)
+        lesson_list = VirtualList(
+            list_wrap,
+            row_factory=self._make_course_tree_row,
+            item_kind=_course_tree_kind,
+            item_key=_course_tree_key,
+            on_scroll=self._schedule_visible_prefetch,
+        )
+        lesson_list.pack(expand=True, fill="both")
+        screen["lesson_list"] = lesson_list
+
+    def _start_prefetch(self):
+        """Tải trước chi tiết mọi bài type 1/5 của khoá để popup mở ngay."""
+        self._stop_prefetch()
+        lesson_ids = [child.lesson_id for _idx, child in self._chapters_raw.iter_children() if child.openable]
+        if not lesson_ids:
+            return
+        self.prefetcher = LessonPrefetcher(
+            self._prefetch_lesson_detail,
+            max_workers=int(self.configuration.get("prefetch_workers") or 6),
+        )
+        self.prefetcher.start(lesson_ids)
+        self._schedule_visible_prefetch()
 
-        self.course_items_frame.bind("<Configure>", _on_items_config)
-        self.lesson_canvas.bind("<Configure>", _on_canvas_config)
+    def _prefetch_lesson_detail(self, lesson_id: str):
+        code, data = self.AppApi.get_lesson_detail(lesson_id)
+        if code == 0:
+            # hâm nóng luôn trạng thái video, các bài prefetch cùng lúc dùng chung một request
+            self.status_registry.lookup(data.video_ids)
+        return code, data
+
+    def _stop_prefetch(self):
+        if self.prefetcher is not None:
+            self.prefetcher.stop()
+            self.prefetcher = None
+
+    def _schedule_visible_prefetch(self):
+        # gom các sự kiện cuộn liên tiếp thành một lần cập nhật ưu tiên
+        if self._visible_job is not None:
+            return
+        self._visible_job = self.root.after(120, self._prioritize_visible_lessons)
 
-        self._chapters_raw = self._coerce_chapters(chapters_dict)
-        self._rebuild_course_tree()
+    def _prioritize_visible_lessons(self):
+        self._visible_job = None
+        if self.prefetcher is None or self.lesson_list is None:
+            return
+        try:
+            items = self.lesson_list.visible_items(margin=4)
+        except tk.TclError:
+            return
+        visible = [it.lesson_id for it in items if _course_tree_kind(it) == "action"]
+        self.prefetcher.prioritize(visible)
     
     # ========== HANDLERS ==========
 
@@ -298,11 +660,24 @@ class FlashStudyDownloaderApp:
             messagebox.showwarning("Thiếu thông tin", "Vui lòng nhập đầy đủ Số điện thoại và Mật khẩu.")
             return
 
+        if self._login_pending:
+            return
+        self._login_pending = True
         self._set_status("Đang đăng nhập…")
-        self.root.config(cursor="watch")
-        self.root.update_idletasks()
-        code, login_response = self.AppApi.login(phone, password)
-        self.root.config(cursor="")
+
+        def _on_done(result):
+            self._login_pending = False
+            code, login_response = result
+            self._on_login_result(phone, password, code, login_response)
+
+        def _on_failed(exc):
+            self._login_pending = False
+            self._set_status("Đăng nhập thất bại")
+            messagebox.showerror("Lỗi đăng nhập", str(exc))
+
+        self.tasks.submit(self.AppApi.login, phone, password, on_success=_on_done, on_error=_on_failed, group="screen")
+
+    def _on_login_result(self, phone: str, password: str, code: int, login_response):
         if code == 0:
             self.auth = {"access_token": login_response}
             payload = {
@@ -322,88 +697,73 @@ class FlashStudyDownloaderApp:
             )
 
     def _open_course_detail(self, course_id: str, course_title: str):
-        code, lessons = self.AppApi.get_course_detail(course_id)
-        if code != 0:
-            messagebox.showerror("Lỗi", "Không lấy được nội dung khóa học.")
+        if self._open_cached_course(course_id, course_title):
+            self._set_status(f"Đã chọn khoá + {course_title}")
             return
-
-        self._set_status(f"Đã chọn khoá + {course_title}")
-        self.show_course_content(lessons, course_title=course_title)
+        self._set_status(f"Đang tải khoá {course_title}…")
+        # dựng màn khoá (rỗng) trước khi stream: _switch_frame huỷ group "screen",
+        # nếu để partial đầu tiên mới chuyển màn thì chính task stream bị huỷ theo
+        self.show_course_content(CourseDetail(), course_title=course_title, course_id=course_id, prefetch=False)
+        key = ("course", course_id)
+        task = None
+
+        def _on_partial(lessons):
+            # các chương đầu đã parse xong trong lúc body còn đang tải -> vẽ trước
+            screen = self._screens.get(key)
+            if task is None or task.cancelled or screen is None:
+                return
+            self._apply_course_content(screen, lessons, prefetch=False)
+            self._set_status(f"Đang tải khoá {course_title}… ({len(lessons)} chương)")
+
+        def _on_loaded(result):
+            code, lessons = result
+            if code != 0:
+                self._set_status("Không lấy được nội dung khóa học")
+                messagebox.showerror("Lỗi", "Không lấy được nội dung khóa học.")
+                return
+            self._set_status(f"Đã chọn khoá + {course_title}")
+            self.show_course_content(lessons, course_title=course_title, course_id=course_id)
+
+        def _on_failed(exc):
+            messagebox.showerror("Lỗi", f"Không lấy được nội dung khóa học.\n{exc}")
+
+        task = self.tasks.submit(
+            self.AppApi.stream_course_detail,
+            course_id,
+            on_lessons=lambda lessons: self.tasks.post(_on_partial, lessons),
+            on_success=_on_loaded,
+            on_error=_on_failed,
+            group="screen",
+        )
 
     def _rebuild_course_tree(self):
-        for w in self.course_items_frame.winfo_children():
-            w.destroy()
-
-        lessons = self._chapters_raw.get("lessons", [])
-        for item in lessons:
-            name = (item.get("lesson_name") or item.get("name") or "").strip()
-            children = item.get("children") or []
-
-            # Parent item (type=3)
-            parent = tk.Frame(self.course_items_frame, bg="#FFFFFF", padx=10, pady=8, highlightthickness=1, highlightbackground="#E2E8F0")
-            parent.pack(fill="x", pady=4)
-            tk.Label(
-                parent,
-                text=name,
-                bg="#FFFFFF",
-                fg="#0F172A",
-                font=("SF Pro Text", 12, "bold"),
-            ).pack(anchor="w")
-
-            for child in children:
-                child_type = child.get("type")
-                child_name = (child.get("lesson_name") or child.get("name") or "").strip()
-                child_id = child.get("lesson_id") or child.get("id")
-                child_row = tk.Frame(self.course_items_frame, bg="#FFFFFF", padx=28, pady=6)
-                child_row.pack(fill="x")
-                child_title = tk.Label(
-                    child_row,
-                    text=child_name,
-                    bg="#FFFFFF",
-                    fg="#0F172A",
-                    font=("SF Pro Text", 11),
-                )
-                child_title.grid(row=0, column=0, sticky="w")
-                if child_type in (1, 5):
-                    btn_text = "Video và đáp án" if child_type == 1 else "Đề thi thử"
-                    if child_type == 1:
-                        action_cmd = lambda lid=child_id, lname=child_name: self._open_lesson_popup(
-                            lid, {"lesson_title": lname}
-                        )
-                    else:
-                        action_cmd = lambda lid=child_id: self._open_exam_link(lid)
-                    action_btn = ttk.Button(
-                        child_row,
-                        text=btn_text,
-                        style="Primary.TButton",
-                        width=18,
-                        command=action_cmd,
-                    )
-                    action_btn.grid(row=0, column=2, sticky="e", padx=(12, 6))
-                child_row.grid_columnconfigure(0, weight=1)
-
-                def _set_child_bg(frame, labels, bg):
-                    frame.configure(bg=bg)
-                    for lbl in labels:
-                        lbl.configure(bg=bg)
-
-                def _on_child_enter(_e, frame=child_row, labels=(child_title,)):
-                    _set_child_bg(frame, labels, "#F1F5F9")
-
-                def _on_child_leave(_e, frame=child_row, labels=(child_title,)):
-                    _set_child_bg(frame, labels, "#FFFFFF")
-
-                child_row.bind("<Enter>", _on_child_enter)
-                child_row.bind("<Leave>", _on_child_leave)
-                child_title.bind("<Enter>", _on_child_enter)
-                child_title.bind("<Leave>", _on_child_leave)
-                if child_type in (1, 5):
-                    action_btn.bind("<Enter>", _on_child_enter)
-                    action_btn.bind("<Leave>", _on_child_leave)
+        # hàng của cây dùng thẳng model chương/bài, không dựng dict riêng cho UI
+        items = []
+        for lesson in self._chapters_raw:
+            items.append(lesson)
+            items.extend(lesson.children)
+        self.lesson_list.set_items(items)
+
+    def _make_course_tree_row(self, kind, master):
+        if kind == "chapter":
+            return _ChapterRow(master)
+        return _LessonRow(master, self._open_lesson_row if kind == "action" else None)
+
+    def _open_course_row(self, course):
+        self._open_course_detail(course.course_id, course.course_name)
+
+    def _open_lesson_row(self, item: LessonChild):
+        if item.type == LessonType.VIDEO:
+            self._open_lesson_popup(item.lesson_id, {"lesson_title": item.lesson_name})
+        else:
+            self._open_exam_link(item.lesson_id)
 
     def _fetch_lesson_details(self, lesson_id: str):
         """Gọi API lấy chi tiết bài học (video + syllabus)."""
         try:
+            prefetcher = self.prefetcher
+            if prefetcher is not None:
+                return prefetcher.fetch(lesson_id)
             code, data = self.AppApi.get_lesson_detail(lesson_id)
             return code, data
         except Exception as e:
@@ -411,15 +771,29 @@ class FlashStudyDownloaderApp:
             return -1, {"message": "Không lấy được chi tiết bài học"}
 
     def _open_lesson_popup(self, lesson_id: str, meta: dict | None):
-        code, data = self._fetch_lesson_details(lesson_id)
-        if code != 0:
-            messagebox.showerror("Lỗi", data.get("message", "Không lấy được chi tiết bài học"))
-            return
+        def _load():
+            code, data = self._fetch_lesson_details(lesson_id)
+            if code != 0:
+                return code, data, [], {}
+            status_map = self._fetch_download_statuses(data.video_ids)
+            return code, data, data.videos, status_map
+
+        def _on_loaded(result):
+            code, data, video_items, status_map = result
+            if code != 0:
+                self._set_status("Không lấy được chi tiết bài học")
+                messagebox.showerror("Lỗi", data.get("message", "Không lấy được chi tiết bài học"))
+                return
+            self._set_status("Sẵn sàng")
+            self._build_lesson_popup(lesson_id, meta, data, video_items, status_map)
 
-        title = data.get("lesson_name") or (meta.get("lesson_title") if meta else "Bài học")
-        video_urls = list(data.get("video_url", []) or [])
-        doc_url = data.get("document_url") or ""
-        doc_answer_url = data.get("document_answer_url") or ""
+        self._set_status("Đang tải chi tiết bài học…")
+        self.tasks.submit(_load, on_success=_on_loaded, group="screen")
+
+    def _build_lesson_popup(self, lesson_id: str, meta: dict | None, data: LessonDetail, video_items: list, status_map: dict):
+        title = data.lesson_name or (meta.get("lesson_title") if meta else "Bài học")
+        doc_url = data.document_url
+        doc_answer_url = data.document_answer_url
 
         win = tk.Toplevel(self.root)
         win.title(title)
@@ -434,6 +808,7 @@ class FlashStudyDownloaderApp:
         ww = win.winfo_width() or 720
         wh = win.winfo_height() or 420
         win.geometry(f"{ww}x{wh}+{int((sw - ww) / 2)}+{int((sh - wh) / 2.4)}")
+        popup_group = f"popup-{win.winfo_id()}"
 
         # --- main container ---
         container = tk.Frame(win, bg=popup_bg, padx=16, pady=16)
@@ -451,19 +826,13 @@ class FlashStudyDownloaderApp:
         video_frame = tk.Frame(container, bg="#FFFFFF", padx=12, pady=12, highlightthickness=1, highlightbackground="#E2E8F0")
         video_frame.pack(fill="x", pady=(6, 10))
 
-        video_items = []
-        for idx, url in enumerate(video_urls, start=1):
-            fixed_url = self._normalize_video_url(url)
-            vid = self._video_id_from_url(fixed_url)
-            video_items.append({"index": idx, "url": fixed_url, "video_id": vid})
-
-        status_map = self._fetch_download_statuses([v["video_id"] for v in video_items])
-
+        # (video, nút tải) để cập nhật trạng thái; model video dùng chung với cache nên không gắn nút vào đó
+        video_buttons = []
         if video_items:
             for item in video_items:
-                idx = item["index"]
-                url = item["url"]
-                video_id = item["video_id"]
+                idx = item.index
+                url = item.url
+                video_id = item.video_id
                 status_info = (status_map or {}).get(video_id, {}) if video_id else {}
                 status = status_info.get("status") or "not_found"
                 tk.Label(video_frame, text=f"Video {idx}", bg="#FFFFFF", fg="#0F172A").grid(
@@ -481,13 +850,32 @@ class FlashStudyDownloaderApp:
                     )
                 )
 
-                video_items[idx - 1]["download_btn"] = download_btn
+                video_buttons.append((item, download_btn))
 
                 if not url:
                     download_btn.state(["disabled"])
                 else:
-                    if status in ("queued", "in_progress"):
+                    if self.downloader is not None and self.downloader.is_active(video_id):
+                        download_btn.config(text="Đang tải…", state="disabled")
+                    elif status in ("queued", "in_progress"):
                         download_btn.config(text="Đang chờ server xử lý ...", state="disabled")
+
+            # chế độ tải trực tiếp về máy (yt-dlp) thay vì qua hàng đợi server
+            local_var = tk.BooleanVar(value=self.configuration.get("download_mode") == "local")
+
+            def _on_toggle_local():
+                self.configuration["download_mode"] = "local" if local_var.get() else "server"
+                self._save_config()
+
+            tk.Checkbutton(
+                video_frame,
+                text="Tải trực tiếp về máy",
+                variable=local_var,
+                command=_on_toggle_local,
+                bg="#FFFFFF",
+                activebackground="#FFFFFF",
+                fg="#334155",
+            ).grid(row=len(video_items), column=0, columnspan=2, sticky="w", pady=(6, 0))
         else:
             tk.Label(video_frame, text="Video", bg="#FFFFFF", fg="#0F172A").grid(
                 row=0, column=0, sticky="w", pady=(0, 4)
@@ -518,6 +906,10 @@ class FlashStudyDownloaderApp:
             tk.Label(doc_frame, text="File chưa được up lên hệ thống", bg="#FFFFFF", fg="#64748B").grid(
                 row=row, column=2, sticky="w", padx=(12, 0)
             )
+        else:
+            doc_dl_btn = ttk.Button(doc_frame, text="Tải về", style="Secondary.TButton")
+            doc_dl_btn.configure(command=lambda: self._download_asset(doc_url, f"{title} - Đề bài", doc_dl_btn))
+            doc_dl_btn.grid(row=row, column=2, sticky="w", padx=(8, 0), pady=(0, 4))
         row += 1
         tk.Label(doc_frame, text="Đáp án", bg="#FFFFFF", fg="#0F172A").grid(
             row=row, column=0, sticky="w", pady=(0, 4)
@@ -530,49 +922,75 @@ class FlashStudyDownloaderApp:
             tk.Label(doc_frame, text="File chưa được up lên hệ thống", bg="#FFFFFF", fg="#64748B").grid(
                 row=row, column=2, sticky="w", padx=(12, 0)
             )
+        else:
+            ans_dl_btn = ttk.Button(doc_frame, text="Tải về", style="Secondary.TButton")
+            ans_dl_btn.configure(
+                command=lambda: self._download_asset(doc_answer_url, f"{title} - Đáp án", ans_dl_btn)
+            )
+            ans_dl_btn.grid(row=row, column=2, sticky="w", padx=(8, 0), pady=(0, 4))
+
+        watch_token = {"value": None}
 
         def _on_popup_close():
+            self.tasks.cancel_group(popup_group)
+            if watch_token["value"] is not None:
+                self._get_status_watcher().unsubscribe(watch_token["value"])
             win.destroy()
         win.protocol("WM_DELETE_WINDOW", _on_popup_close)
 
-        def _refresh_statuses():
-            ids = [v.get("video_id") for v in video_items if v.get("video_id")]
-            latest = self._fetch_download_statuses(ids)
-            for v in video_items:
-                vid = v.get("video_id")
+        def _apply_statuses(latest):
+            if not win.winfo_exists():
+                return
+            for v, d_btn in video_buttons:
+                vid = v.video_id
                 status_info = (latest or {}).get(vid, {}) if vid else {}
                 status = status_info.get("status") or "not_found"
-                d_btn = v.get("download_btn")
-                if not d_btn:
+                if self.downloader is not None and self.downloader.is_active(vid):
                     continue
                 if status in ("queued", "in_progress"):
                     d_btn.config(text="Đang chờ server xử lý ...", state="disabled")
                 else:
                     d_btn.config(text="Tải về", state="normal")
 
+        def _refresh_statuses():
+            ids = data.video_ids
+            self.tasks.submit(
+                self._fetch_download_statuses, ids, max_age=0, on_success=_apply_statuses, group=popup_group
+            )
+
         # --- Buttons (Đóng/Refresh) ---
         btns = tk.Frame(container, bg=popup_bg)
         btns.pack(fill="x", pady=(8, 0))
         ttk.Button(btns, text="Reset trạng thái", command=_refresh_statuses).pack(side="left")
         ttk.Button(btns, text="Đóng", command=_on_popup_close).pack(side="right")
 
-        # Không dùng downloader trong màn này
+        # nhận cập nhật trạng thái tự động (SSE / long-poll) thay vì bấm Reset
+        watched_ids = data.video_ids
+        if watched_ids:
+            watch_token["value"] = self._get_status_watcher().subscribe(
+                watched_ids, lambda statuses: self.tasks.post(_apply_statuses, statuses)
+            )
+
+    def _get_status_watcher(self):
+        from core.status_watcher import StatusWatcher
+
+        if self.status_watcher is None:
+            self.status_watcher = StatusWatcher.from_config(
+                self.configuration,
+                fetch_statuses=self.status_registry.as_fetcher(max_age=1.0),
+                # event SSE vào registry; kết quả poll lấy từ chính registry nên update() bỏ qua
+                on_statuses=self.status_registry.update,
+            )
+        return self.status_watcher
 
     def _normalize_video_url(self, url: str) -> str:
-        if not url:
-            return ""
-        return url.replace("/Data/", "/DataNew/", 1)
+        return normalize_video_url(url)
 
     def _video_id_from_url(self, url: str) -> str:
-        if not url:
-            return ""
-        return hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+        return video_id_for(url)
 
-    def _fetch_download_statuses(self, video_ids: list[str]) -> dict:
-        ok, data_or_err = get_download_statuses(self.configuration, video_ids)
-        if not ok:
-            return {}
-        return data_or_err if isinstance(data_or_err, dict) else {}
+    def _fetch_download_statuses(self, video_ids: list[str], max_age: float | None = None) -> dict:
+        return self.status_registry.get(video_ids, max_age=max_age)
 
     def _enqueue_video_job(
         self,
@@ -588,28 +1006,534 @@ class FlashStudyDownloaderApp:
             messagebox.showwarning("Thiếu link", "Không có đường dẫn video.")
             return
 
-        ok, data_or_err = get_drive_link(self.configuration, video_id)
-        if ok:
-            link = (data_or_err or {}).get("drive_link")
-            if link:
-                self._show_drive_link(link)
-                schedule_cleanup(self.configuration, video_id)
+        local_mode = self.configuration.get("download_mode") == "local"
+
+        def _resolve():
+            # video đã có trong kho media (từ bài/khoá khác hoặc lần chạy trước) -> không tải/enqueue lại;
+            # materialize có thể phải copy cả file (khác ổ đĩa / FAT) nên chạy nền
+            restored = self._restore_from_library(video_id, f"{lesson_title} - Video {index}", lesson_id=lesson_id)
+            if restored:
+                return "restored", True, restored
+            if local_mode:
+                return "local", True, None
+            # link còn hạn trong cache -> không gọi mạng
+            cached = self.drive_links.get(video_id)
+            if cached:
+                return "link", True, cached["drive_link"]
+            backend = self.backend_batcher
+            ok, data_or_err = backend.get_drive_link(video_id)
+            if ok:
+                link = (data_or_err or {}).get("drive_link")
+                if link:
+                    self.drive_links.put(video_id, data_or_err)
+                    # cleanup gửi nền (có retry), không chặn việc trả link
+                    self.cleanup_scheduler.schedule(video_id)
+                    return "link", True, link
+            title = f"{lesson_title} - Video {index}"
+            ok, data_or_err = backend.enqueue_download_job(video_id, fixed_url, title=title, lesson_id=lesson_id)
+            return "enqueue", ok, data_or_err
+
+        def _on_done(result):
+            kind, ok, data_or_err = result
+            btn_alive = download_btn is not None and download_btn.winfo_exists()
+            if kind == "restored":
+                if btn_alive:
+                    download_btn.config(text="Đã có trên máy", state="disabled")
+                self._set_status(f"Video đã có sẵn: {data_or_err}")
+                return
+            if kind == "local":
+                if btn_alive:
+                    download_btn.config(text="Tải về", state="normal")
+                self._download_video_locally(fixed_url, lesson_title, index, video_id, download_btn, lesson_id=lesson_id)
                 return
+            if kind == "link":
+                if btn_alive:
+                    download_btn.config(text="Tải về", state="normal")
+                self._show_drive_link(data_or_err)
+                return
+            if not ok:
+                if btn_alive:
+                    download_btn.config(text="Tải về", state="normal")
+                messagebox.showerror("Lỗi", data_or_err or "Không thể tạo job tải video.")
+                return
+            self.status_registry.invalidate([video_id])
+            self._get_status_watcher().poke()
+            messagebox.showinfo("Thông báo", "Đã đưa video vào hàng đợi tải. Trạng thái sẽ tự cập nhật.")
+            if btn_alive:
+                download_btn.config(text="Đang chờ server xử lý ...", state="disabled")
+
+        def _on_failed(exc):
+            if download_btn is not None and download_btn.winfo_exists():
+                download_btn.config(text="Tải về", state="normal")
+            messagebox.showerror("Lỗi", f"Không thể tạo job tải video.\n{exc}")
+
+        if download_btn is not None:
+            download_btn.config(text="Đang xử lý…", state="disabled")
+        self.tasks.submit(_resolve, on_success=_on_done, on_error=_on_failed)
+
+    def _get_downloader(self) -> LocalVideoDownloader:
+        if self.downloader is None:
+            self.downloader = LocalVideoDownloader.from_config(self.configuration)
+        return self.downloader
+
+    def _get_segmented_downloader(self):
+        from core.segmented import SegmentedDownloader
+
+        if self.segmented is None:
+            self.segmented = SegmentedDownloader.from_config(self.configuration)
+        return self.segmented
+
+    def _get_media_library(self):
+        from core.media_library import MediaLibrary
+
+        with self._media_library_lock:
+            if self.media_library is None:
+                self.media_library = MediaLibrary.from_config(
+                    self.configuration, self.configuration.get("download_dir") or default_download_dir()
+                )
+            return self.media_library
+
+    def _restore_from_library(self, video_id: str, title: str, output_dir: str | None = None, lesson_id=None, course_id=None):
+        """Video đã có trong kho -> hard link ra thư mục tải và trả về đường dẫn; chưa có -> None."""
+        if not video_id:
+            return None
+        library = self._get_media_library()
+        entry = library.lookup(video_id)
+        if entry is None:
+            return None
+        ext = os.path.splitext(entry["path"])[1]
+        dest = os.path.join(
+            output_dir or self.configuration.get("download_dir") or default_download_dir(), safe_filename(title) + ext
+        )
+        try:
+            path = library.materialize(video_id, dest, lesson_id=lesson_id, course_id=course_id)
+        except OSError as e:
+            print("media library restore error:", e)
+            return None
+        if path:
+            log_event("media_library", "HIT", video_id=video_id, output=path, bytes=entry.get("size"))
+        return path
+
+    def _add_to_library(self, video_id: str, path: str, url: str = "", lesson_id=None, course_id=None, sha256=None):
+        """Gọi từ thread tải sau khi tải xong; lỗi kho media không làm hỏng lượt tải."""
+        if not video_id or not path:
+            return
+        try:
+            self._get_media_library().add(
+                video_id, path, source_url=url, lesson_id=lesson_id, course_id=course_id, sha256=sha256
+            )
+        except Exception as e:
+            print("media library add error:", e)
 
-        title = f"{lesson_title} - Video {index}"
-        ok, data_or_err = enqueue_download_job(
-            self.configuration,
-            video_id,
-            fixed_url,
-            title=title,
-            lesson_id=lesson_id,
+    def _download_asset(
+        self, url: str, title: str, button=None, default_ext: str = ".pdf", video_id: str = "", lesson_id=None
+    ):
+        """Tải file trực tiếp (PDF/MP4) bằng nhiều kết nối Range song song."""
+        if not url:
+            messagebox.showwarning("Thiếu link", "Tài liệu chưa có đường dẫn tải.")
+            return
+        ext = os.path.splitext(urlsplit(url).path)[1] or default_ext
+        output_dir = self.configuration.get("download_dir") or default_download_dir()
+        output_path = os.path.join(output_dir, safe_filename(title) + ext)
+        idle_text = button.cget("text") if button is not None else ""
+        last_pct = {"value": -1}
+
+        def _update_btn(text: str, enabled: bool = False):
+            if button is not None and button.winfo_exists():
+                button.config(text=text, state="normal" if enabled else "disabled")
+
+        def _on_progress(done: int, total: int | None):
+            pct = int(done * 100 / total) if total else -1
+            if pct != last_pct["value"]:
+                last_pct["value"] = pct
+                self.tasks.post(_update_btn, f"{pct}%" if total else f"{done // (1024 * 1024)} MB")
+
+        def _finish(ok: bool, result):
+            _update_btn(idle_text, enabled=True)
+            if ok:
+                self._set_status(f"Đã tải xong: {result.get('path')}")
+            else:
+                self._set_status("Tải file thất bại")
+                messagebox.showerror("Lỗi", result or "Không tải được file.")
+
+        def _on_done(ok: bool, result):
+            if ok and video_id:
+                self._add_to_library(video_id, result.get("path"), url, lesson_id, sha256=result.get("sha256"))
+            self.tasks.post(_finish, ok, result)
+
+        _update_btn("Đang tải…")
+        self._get_segmented_downloader().submit(url, output_path, on_progress=_on_progress, on_done=_on_done)
+
+    def _download_video_locally(
+        self, url: str, lesson_title: str, index: int, video_id: str, download_btn=None, lesson_id=None
+    ):
+        if urlsplit(url).path.lower().endswith(".mp4"):
+            # MP4 trực tiếp -> tải Range nhiều kết nối, không cần yt-dlp
+            self._download_asset(
+                url, f"{lesson_title} - Video {index}", download_btn, ".mp4", video_id=video_id, lesson_id=lesson_id
+            )
+            return
+        downloader = self._get_downloader()
+        if not downloader.available():
+            messagebox.showerror("Lỗi", "Chưa cài yt-dlp, không thể tải trực tiếp về máy.")
+            return
+
+        last_text = {"value": ""}
+
+        def _update_btn(text: str):
+            if download_btn is not None and download_btn.winfo_exists():
+                download_btn.config(text=text, state="disabled")
+
+        def _on_progress(_fraction, text):
+            # hook của yt-dlp gọi rất dày -> chỉ đẩy lên UI khi text đổi
+            if text != last_text["value"]:
+                last_text["value"] = text
+                self.tasks.post(_update_btn, f"Đang tải {text}")
+
+        def _finish(ok: bool, result: str):
+            if download_btn is not None and download_btn.winfo_exists():
+                download_btn.config(text="Tải về", state="normal")
+            if ok:
+                self._set_status(f"Đã tải xong: {result}")
+            else:
+                self._set_status("Tải video thất bại")
+                messagebox.showerror("Lỗi", f"Không tải được video.\n{result}")
+
+        def _on_done(ok: bool, result: str):
+            if ok:
+                self._add_to_library(video_id, result, url, lesson_id)
+            self.tasks.post(_finish, ok, result)
+
+        _update_btn("Đang tải…")
+        self._set_status(f"Đang tải về {downloader.output_dir}")
+        downloader.submit(url, f"{lesson_title} - Video {index}", video_id, on_progress=_on_progress, on_done=_on_done)
+
+    # ---- Tải cả khoá ----
+
+    def _start_course_batch(self):
+        course_id, course_title = self._current_course
+        mode = "local" if self.configuration.get("download_mode") == "local" else "server"
+        mode_text = "tải trực tiếp về máy" if mode == "local" else "đưa vào hàng đợi server"
+        if not messagebox.askyesno("Tải cả khoá", f"Lấy toàn bộ video của khoá và {mode_text}?"):
+            return
+        chapters = self._chapters_raw
+
+        def _on_planned(result):
+            jobs, failed, resolved = result
+            # job server đã nhận/đã có link ngay lúc lập kế hoạch -> vào hàng đợi ở trạng thái xong
+            added = self.batch_queue.add(jobs, done=resolved)
+            self.batch.start()
+            self.batch.wake()
+            msg = f"Đã thêm {added} video vào hàng đợi tải cả khoá"
+            if failed:
+                msg += f" ({failed} bài không lấy được chi tiết)"
+            self._set_status(msg)
+            self._open_batch_window()
+
+        self._set_status("Đang lấy danh sách video của khoá…")
+        self.tasks.submit(
+            self._plan_course_batch, course_id, course_title, chapters, mode, on_success=_on_planned, group="screen"
         )
-        if not ok:
-            messagebox.showerror("Lỗi", data_or_err or "Không thể tạo job tải video.")
+
+    def _plan_course_batch(self, course_id, course_title: str, chapters: CourseDetail, mode: str):
+        """Chạy nền: resolve chi tiết mọi bài video của khoá -> danh sách job."""
+        lessons = list(chapters.iter_children((LessonType.VIDEO,)))
+        if self.prefetcher is not None:
+            self.prefetcher.prioritize([child.lesson_id for _, child in lessons])
+
+        jobs, failed, order = [], 0, 0
+        for chapter_idx, child in lessons:
+            lesson_id = child.lesson_id
+            code, data = self._fetch_lesson_details(lesson_id)
+            if code != 0:
+                failed += 1
+                continue
+            lesson_title = data.lesson_name or child.lesson_name
+            for video in data.videos:
+                video_id = video.video_id
+                if not video_id:
+                    continue
+                jobs.append(
+                    {
+                        "job_id": f"{mode}:{video_id}",
+                        "mode": mode,
+                        "video_id": video_id,
+                        "url": video.url,
+                        "title": f"{lesson_title} - Video {video.index}",
+                        "lesson_id": lesson_id,
+                        "course_id": course_id,
+                        "course_title": course_title,
+                        "priority": chapter_idx,
+                        "order": order,
+                    }
+                )
+                order += 1
+        resolved = self._presubmit_server_jobs(jobs) if mode == "server" else {}
+        return jobs, failed, resolved
+
+    def _presubmit_server_jobs(self, jobs: list) -> dict:
+        """
+        Chạy nền: xử lý cả khoá bằng vài request batch (trạng thái -> drive link -> enqueue)
+        thay vì 3 request cho mỗi video. Trả về {job_id: result} của các job đã xong;
+        job lỗi để BatchPipeline thử lại từng cái.
+        """
+        from core.api import enqueue_download_jobs, get_drive_links
+
+        by_video = {job["video_id"]: job for job in jobs}
+        resolved = {}
+        statuses = self.status_registry.get(list(by_video))
+        for vid, job in by_video.items():
+            status = (statuses.get(vid) or {}).get("status")
+            if status in ("queued", "in_progress"):
+                resolved[job["job_id"]] = {"status": status}
+            elif self.drive_links.get(vid):
+                resolved[job["job_id"]] = {"drive_link": self.drive_links.get(vid)["drive_link"]}
+        remaining = [vid for vid, job in by_video.items() if job["job_id"] not in resolved]
+        for vid, (ok, data) in get_drive_links(self.configuration, remaining).items():
+            if ok and (data or {}).get("drive_link"):
+                self.drive_links.put(vid, data)
+                # link mới -> hẹn cleanup file trên server như đường popup
+                self.cleanup_scheduler.schedule(vid)
+                resolved[by_video[vid]["job_id"]] = {"drive_link": data.get("drive_link")}
+        to_enqueue = [
+            {
+                "video_id": vid,
+                "video_url": job.get("url"),
+                "title": job.get("title"),
+                "lesson_id": job.get("lesson_id"),
+                "course_id": job.get("course_id"),
+            }
+            for vid, job in by_video.items()
+            if job["job_id"] not in resolved
+        ]
+        for vid, (ok, data) in enqueue_download_jobs(self.configuration, to_enqueue).items():
+            if ok and vid in by_video:
+                resolved[by_video[vid]["job_id"]] = data if isinstance(data, dict) else {}
+        if resolved:
+            self.status_registry.invalidate(list(by_video))
+        return resolved
+
+    def _process_batch_job(self, job: dict):
+        """Chạy trên thread của BatchPipeline, trả về (ok, result|error)."""
+        url = job.get("url") or ""
+        video_id = job.get("video_id") or ""
+        lesson_id, course_id = job.get("lesson_id"), job.get("course_id")
+        output_dir = os.path.join(
+            self.configuration.get("download_dir") or default_download_dir(),
+            safe_filename(job.get("course_title") or "", fallback="FlashStudy"),
+        )
+        restored = self._restore_from_library(video_id, job.get("title") or video_id, output_dir, lesson_id, course_id)
+        if restored:
+            return True, {"path": restored, "from_library": True}
+        if job.get("mode") == "local":
+            if urlsplit(url).path.lower().endswith(".mp4"):
+                path = os.path.join(output_dir, safe_filename(job.get("title") or video_id) + ".mp4")
+                ok, result = self._get_segmented_downloader().download(url, path)
+                if ok:
+                    self._add_to_library(video_id, result.get("path"), url, lesson_id, course_id, result.get("sha256"))
+                return ok, result
+            if not LocalVideoDownloader.available():
+                return False, "Chưa cài yt-dlp"
+            outcome = {}
+            output_path = self._get_downloader().submit(
+                url,
+                job.get("title") or video_id,
+                video_id,
+                on_done=lambda ok, res: outcome.update(res=res),
+                output_dir=output_dir,
+            ).result()
+            if output_path:
+                self._add_to_library(video_id, output_path, url, lesson_id, course_id)
+            return bool(output_path), output_path or outcome.get("res") or "Tải video thất bại"
+
+        status = (self.status_registry.get([video_id]).get(video_id) or {}).get("status")
+        if status in ("queued", "in_progress"):
+            # server đã nhận job này (từ popup hoặc lần chạy trước) -> không enqueue lại
+            return True, {"status": status}
+        cached = self.drive_links.get(video_id)
+        if cached:
+            return True, {"drive_link": cached["drive_link"]}
+        backend = self.backend_batcher
+        ok, data_or_err = backend.get_drive_link(video_id)
+        if ok and (data_or_err or {}).get("drive_link"):
+            self.drive_links.put(video_id, data_or_err)
+            self.cleanup_scheduler.schedule(video_id)
+            return True, {"drive_link": data_or_err.get("drive_link")}
+        return backend.enqueue_download_job(
+            video_id, url, title=job.get("title"), lesson_id=lesson_id, course_id=course_id
+        )
+
+    def _open_batch_window(self):
+        if self._batch_win is not None and self._batch_win.winfo_exists():
+            self._batch_win.lift()
+            self._on_batch_change(self.batch_queue.summary())
             return
-        messagebox.showinfo("Thông báo", "Đã đưa video vào hàng đợi tải. Vui lòng kiểm tra trạng thái.")
-        if download_btn and download_btn.winfo_exists():
-            download_btn.config(text="Đang chờ server xử lý ...", state="disabled")
+        win = tk.Toplevel(self.root)
+        win.title("Tiến trình tải cả khoá")
+        win.minsize(560, 320)
+        self._batch_win = win
+
+        container = ttk.Frame(win, padding=16)
+        container.pack(expand=True, fill="both")
+        self._batch_label = ttk.Label(container, text="", style="Label.TLabel")
+        self._batch_label.pack(anchor="w")
+        self._batch_bar = ttk.Progressbar(container, mode="determinate", maximum=100)
+        self._batch_bar.pack(fill="x", pady=(8, 12))
+
+        self._batch_tree = ttk.Treeview(container, columns=("done", "failed", "total"), show="tree headings", height=8)
+        self._batch_tree.heading("#0", text="Khoá học")
+        self._batch_tree.heading("done", text="Xong")
+        self._batch_tree.heading("failed", text="Lỗi")
+        self._batch_tree.heading("total", text="Tổng")
+        for col in ("done", "failed", "total"):
+            self._batch_tree.column(col, width=70, anchor="center")
+        self._batch_tree.pack(expand=True, fill="both")
+
+        btns = ttk.Frame(container)
+        btns.pack(fill="x", pady=(12, 0))
+        self._batch_pause_btn = ttk.Button(btns, text="Tạm dừng", command=self._toggle_batch_pause)
+        self._batch_pause_btn.pack(side="left")
+        ttk.Button(btns, text="Thử lại lỗi", command=self._retry_failed_batch).pack(side="left", padx=(8, 0))
+        ttk.Button(btns, text="Xoá job đã xong", command=self._clear_finished_batch).pack(side="left", padx=(8, 0))
+        ttk.Button(btns, text="Đóng", command=win.destroy).pack(side="right")
+        self._on_batch_change(self.batch_queue.summary())
+
+    def _retry_failed_batch(self):
+        self.batch_queue.retry_failed()
+        self.batch.start()
+        self.batch.wake()
+        self._on_batch_change(self.batch_queue.summary())
+
+    def _clear_finished_batch(self):
+        self.batch_queue.clear_finished()
+        self._on_batch_change(self.batch_queue.summary())
+
+    def _toggle_batch_pause(self):
+        if self.batch.paused:
+            self.batch.resume()
+        else:
+            self.batch.pause()
+
+    def _on_batch_change(self, summary: dict):
+        total = summary.get("total", 0)
+        done = summary.get(JOB_DONE, 0)
+        failed = summary.get(JOB_FAILED, 0)
+        running = summary.get(JOB_RUNNING, 0)
+        pending = summary.get(JOB_PENDING, 0)
+        if total and (running or pending):
+            self._set_status(f"Tải cả khoá: {done}/{total} xong, {failed} lỗi")
+        if self._batch_win is None or not self._batch_win.winfo_exists():
+            return
+        paused = " (tạm dừng)" if self.batch.paused else ""
+        self._batch_label.configure(
+            text=f"Xong {done}/{total} • Đang chạy {running} • Chờ {pending} • Lỗi {failed}{paused}"
+        )
+        self._batch_bar.configure(value=(done + failed) * 100 / total if total else 0)
+        self._batch_pause_btn.configure(text="Tiếp tục" if self.batch.paused else "Tạm dừng")
+        self._batch_tree.delete(*self._batch_tree.get_children())
+        for course_id, info in (summary.get("courses") or {}).items():
+            self._batch_tree.insert(
+                "",
+                "end",
+                text=info.get("course_title") or str(course_id),
+                values=(info.get(JOB_DONE, 0), info.get(JOB_FAILED, 0), info.get("total", 0)),
+            )
+
+    # ========== DIAGNOSTICS ==========
+
+    def _start_metrics_export(self):
+        port = int(self.configuration.get("metrics_port") or 0)
+        if not port:
+            return
+        try:
+            get_metrics().serve(port)
+        except OSError as e:
+            print("metrics server error:", e)
+
+    def _open_diagnostics(self):
+        from core.api import get_http_client
+
+        if self._diag_win is not None and self._diag_win.winfo_exists():
+            self._diag_win.lift()
+            return
+        win = tk.Toplevel(self.root)
+        win.title("Chẩn đoán kết nối")
+        win.minsize(760, 320)
+        self._diag_win = win
+
+        container = ttk.Frame(win, padding=16)
+        container.pack(expand=True, fill="both")
+        columns = ("count", "errors", "p50", "p95", "p99", "kb_in", "kb_out", "retries")
+        headings = ("Số call", "Lỗi %", "p50 (ms)", "p95 (ms)", "p99 (ms)", "KB nhận", "KB gửi", "Retry")
+        tree = ttk.Treeview(container, columns=columns, show="tree headings", height=12)
+        tree.heading("#0", text="Endpoint")
+        tree.column("#0", width=240)
+        for col, text in zip(columns, headings):
+            tree.heading(col, text=text)
+            tree.column(col, width=70, anchor="e")
+        tree.pack(expand=True, fill="both")
+
+        pool_label = ttk.Label(container, text="", style="Label.TLabel", foreground="#475569")
+        pool_label.pack(anchor="w", pady=(8, 0))
+
+        btns = ttk.Frame(container)
+        btns.pack(fill="x", pady=(12, 0))
+        ttk.Button(btns, text="Xuất Prometheus…", command=self._export_metrics_file).pack(side="left")
+        ttk.Button(btns, text="Đặt lại", command=get_metrics().reset).pack(side="left", padx=(8, 0))
+        ttk.Button(btns, text="Đóng", command=win.destroy).pack(side="right")
+
+        def _refresh():
+            if not win.winfo_exists():
+                return
+            tree.delete(*tree.get_children())
+            for name, stats in get_metrics().snapshot().items():
+                tree.insert(
+                    "",
+                    "end",
+                    text=name,
+                    values=(
+                        stats["count"],
+                        f"{stats['error_rate'] * 100:.1f}",
+                        f"{stats['p50'] * 1000:.0f}",
+                        f"{stats['p95'] * 1000:.0f}",
+                        f"{stats['p99'] * 1000:.0f}",
+                        f"{stats['bytes_in'] / 1024:.1f}",
+                        f"{stats['bytes_out'] / 1024:.1f}",
+                        stats["retries"],
+                    ),
+                )
+            http = get_http_client()
+            pools = http.connection_stats()
+            lines = [
+                "  •  ".join(
+                    f"{host}: {st['new_connections']} kết nối mới / {st['reused_connections']} tái sử dụng"
+                    for host, st in pools.items()
+                )
+            ]
+            if http.limiter is not None:
+                lines.extend(
+                    f"{host}: {st['state']}, {st['inflight']}/{st['limit']:g} đồng thời, {st['rate']:g} req/s"
+                    for host, st in http.limiter.snapshot().items()
+                )
+            pool_label.configure(text="\n".join(lines))
+            win.after(2000, _refresh)
+
+        _refresh()
+
+    def _export_metrics_file(self):
+        path = filedialog.asksaveasfilename(
+            title="Lưu metrics",
+            defaultextension=".prom",
+            initialfile="flashstudy.prom",
+            filetypes=[("Prometheus text", "*.prom"), ("Tất cả", "*.*")],
+        )
+        if not path:
+            return
+        try:
+            get_metrics().write_textfile(path)
+            self._set_status(f"Đã xuất metrics: {path}")
+        except OSError as e:
+            messagebox.showerror("Lỗi", f"Không ghi được file metrics: {e}")
 
     def _show_drive_link(self, link: str):
         if not link:
@@ -622,22 +1546,30 @@ class FlashStudyDownloaderApp:
             pass
 
     def _open_exam_link(self, lesson_id: str):
-        code, data = self._fetch_lesson_details(lesson_id)
-        if code != 0:
-            messagebox.showerror("Lỗi", data.get("message", "Không lấy được chi tiết bài học"))
-            return
+        def _on_loaded(result):
+            code, data = result
+            if code != 0:
+                messagebox.showerror("Lỗi", data.get("message", "Không lấy được chi tiết bài học"))
+                return
 
-        pdf_url = data.get("pdf_url") or ""
-        if not pdf_url:
-            messagebox.showinfo("Thông báo", "Không tìm thấy link đề")
-            return
-        self._open_in_chrome(pdf_url)
+            pdf_url = data.pdf_url
+            if not pdf_url:
+                messagebox.showinfo("Thông báo", "Không tìm thấy link đề")
+                return
+            if self.configuration.get("download_mode") == "local":
+                self._download_asset(pdf_url, data.lesson_name or f"De-thi-{lesson_id}")
+                return
+            self._open_in_chrome(pdf_url)
+
+        self.tasks.submit(self._fetch_lesson_details, lesson_id, on_success=_on_loaded, group="screen")
 
     def _open_in_chrome(self, url: str):
         if not url:
             messagebox.showwarning("Thiếu link", "Tài liệu chưa có đường dẫn tải.")
             return
         
+        import subprocess
+
         try:
             # Ưu tiên mở bằng Chrome theo hệ điều hành
             if sys.platform == "darwin":  # macOS
@@ -678,16 +1610,99 @@ class FlashStudyDownloaderApp:
         # Quay lại màn đăng nhập
         self.show_login_screen()
     
+    def _on_app_close(self):
+        http = None
+        if self.AppApi is not None:
+            from core.api import get_http_client
+
+            http = get_http_client()
+            for host, stats in http.connection_stats().items():
+                log_event("http_pool", "STATS", host=host, **stats)
+            self.AppApi.session.close()
+        metrics_file = self.configuration.get("metrics_textfile")
+        if metrics_file:
+            try:
+                get_metrics().write_textfile(metrics_file)
+            except OSError as e:
+                print("metrics export error:", e)
+        get_metrics().stop_server()
+        self._stop_prefetch()
+        if self.downloader is not None:
+            self.downloader.shutdown()
+        if self.segmented is not None:
+            self.segmented.shutdown()
+        self.batch.stop()
+        if self.status_watcher is not None:
+            self.status_watcher.stop()
+        if self.status_registry is not None:
+            self.status_registry.stop()
+        if self.backend_batcher is not None:
+            self.backend_batcher.stop()
+        if self.cleanup_scheduler is not None:
+            self.cleanup_scheduler.stop()
+        self._config_store.close()
+        if self.media_library is not None:
+            self.media_library.close()
+        if self.catalog is not None:
+            self.catalog.close()
+        self._temp_store.close()
+        if http is not None:
+            http.close()
+        self.tasks.shutdown()
+        self.root.destroy()
+
     # ========= HELPERS ==========
     def _go_back_to_course_selection(self):
         """Quay lại màn chọn khóa học."""
         self.show_course_selection()
     
-    def _switch_frame(self, new_frame: ttk.Frame):
-        if self.current_frame is not None:
-            self.current_frame.destroy()
+    def _switch_frame(self, new_frame: ttk.Frame, key=None) -> dict:
+        """Chuyển sang màn mới; có key thì màn được giữ lại để lần sau chỉ cần hiện lại."""
+        self._leave_current_screen()
+        screen = {"key": key, "frame": new_frame}
+        if key is not None:
+            self._screens[key] = screen
+            self._trim_screen_cache()
+        self._screen_key = key
         self.current_frame = new_frame
         self.current_frame.pack(expand=True, fill="both")
+        return screen
+
+    def _show_cached_screen(self, key) -> dict | None:
+        screen = self._screens.get(key)
+        if screen is None:
+            return None
+        self._screens.move_to_end(key)
+        if self._screen_key != key:
+            self._leave_current_screen()
+            self._screen_key = key
+            self.current_frame = screen["frame"]
+            self.current_frame.pack(expand=True, fill="both")
+        return screen
+
+    def _leave_current_screen(self):
+        # rời màn hình -> huỷ các request đang chờ của màn cũ
+        self.tasks.cancel_group("screen")
+        self._stop_prefetch()
+        if self.current_frame is None:
+            return
+        if self._screen_key is not None and self._screen_key in self._screens:
+            self.current_frame.pack_forget()
+        else:
+            self.current_frame.destroy()
+        self.current_frame = None
+
+    def _trim_screen_cache(self):
+        limit = max(1, int(self.configuration.get("screen_cache_size") or 4))
+        while len(self._screens) > limit:
+            _key, screen = self._screens.popitem(last=False)
+            screen["frame"].destroy()
+
+    def _drop_cached_screens(self):
+        for key, screen in list(self._screens.items()):
+            if key != self._screen_key:
+                screen["frame"].destroy()
+        self._screens.clear()
 
     def _toggle_password(self):
         self.password_entry.configure(show="" if self._show_password.get() else "*")
@@ -789,6 +1804,55 @@ class FlashStudyDownloaderApp:
         self.note_label.grid(row=0, column=1, sticky="e")
         self.note_label.grid_remove()  # Ẩn mặc định
 
+        # Host bị giới hạn tốc độ / tạm ngắt — mặc định ẩn
+        self.health_label = ttk.Label(bar, text="", anchor="e", padding=(0, 6, 12, 6), foreground="#B45309")
+        self.health_label.grid(row=0, column=2, sticky="e")
+        self.health_label.grid_remove()
+
+        # Chỉ báo request đang chạy nền — mặc định ẩn
+        self.busy_label = ttk.Label(bar, text="", anchor="e", padding=(0, 6), foreground="#475569")
+        self.busy_label.grid(row=0, column=3, sticky="e")
+        self.busy_bar = ttk.Progressbar(bar, mode="indeterminate", length=80)
+        self.busy_bar.grid(row=0, column=4, sticky="e", padx=(6, 12))
+        self.busy_label.grid_remove()
+        self.busy_bar.grid_remove()
+
+        # Mở bảng chẩn đoán (latency/lỗi/byte theo endpoint)
+        diag_btn = ttk.Label(bar, text="📊 Chẩn đoán", cursor="hand2", padding=(0, 6, 12, 6), foreground="#2563EB")
+        diag_btn.grid(row=0, column=5, sticky="e")
+        diag_btn.bind("<Button-1>", lambda _e: self._open_diagnostics())
+
+    def _on_busy_change(self, inflight: int):
+        if inflight > 0:
+            self.busy_label.configure(text=f"Đang xử lý ({inflight})")
+            self.busy_label.grid()
+            self.busy_bar.grid()
+            self.busy_bar.start(15)
+            self.root.config(cursor="watch")
+        else:
+            self.busy_bar.stop()
+            self.busy_label.grid_remove()
+            self.busy_bar.grid_remove()
+            self.root.config(cursor="")
+
+    def _on_host_health(self, host: str, state: dict):
+        if state.get("health") == "ok":
+            self._host_health.pop(host, None)
+        else:
+            self._host_health[host] = state
+        parts = []
+        for name, st in self._host_health.items():
+            name = urlsplit(name).netloc or name
+            if st.get("health") == "down":
+                parts.append(f"⛔ {name} tạm ngắt, đang dùng dữ liệu đã lưu")
+            else:
+                parts.append(f"🐢 {name} đang giảm tốc")
+        if parts:
+            self.health_label.configure(text=" | ".join(parts))
+            self.health_label.grid()
+        else:
+            self.health_label.grid_remove()
+
     def _set_status(self, text: str, show_note: bool = False):
         """Cập nhật message ở thanh trạng thái. Nếu show_note=True -> hiển thị ghi chú Video/Tệp."""
         self.status_var.set(text)
@@ -806,76 +1870,76 @@ class FlashStudyDownloaderApp:
         y = int((sh - h) / 2.4)
         self.root.geometry(f"{w}x{h}+{x}+{y}")
 
-    def _coerce_chapters(self, data):
-        """
-        Chuẩn hoá dữ liệu lessons về dạng {'lessons': [...]}
-        để TreeView luôn đọc được, dù API trả list hay bọc trong key khác.
-        """
-        try:
-            if isinstance(data, dict) and "lessons" in data and isinstance(data["lessons"], list):
-                return data
-            if isinstance(data, list):
-                return {"lessons": data}
-            if isinstance(data, dict) and "data" in data:
-                d = data["data"]
-                if isinstance(d, dict) and "lessons" in d:
-                    return {"lessons": d["lessons"]}
-                if isinstance(d, list):
-                    return {"lessons": d}
-            return {"lessons": []}
-        except Exception as e:
-            print("coerce lessons error:", e)
-            return {"lessons": []}
+    def _save_config(self):
+        # chỉ các key thay đổi được ghi, gộp trong 0.2s
+        self._config_store.update(self.configuration)
 
-    def _load_temp_store(self):
-        try:
-            with open(TEMP_FILE_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return data if isinstance(data, dict) else {}
-        except FileNotFoundError:
-            return {}
-        except Exception as e:
-            print("Load temp store error:", e)
-            return {}
+    def _open_temp_store(self):
+        if self.configuration.get("store_backend") == "sqlite":
+            return open_store(TEMP_DB_PATH, backend="sqlite")
+        return open_store(TEMP_FILE_PATH)
 
     def _save_temp_store(self, payload: dict):
-        try:
-            os.makedirs(RESOURCE_DIR, exist_ok=True)
-            self.temp.update(payload or {})
-            with open(TEMP_FILE_PATH, "w", encoding="utf-8") as f:
-                json.dump(self.temp, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print("Save temp store error:", e)
+        self.temp.update(payload or {})
+        self._temp_store.update(payload or {})
 
     def _clear_temp_store(self):
         self.temp = {}
-        try:
-            if os.path.exists(TEMP_FILE_PATH):
-                os.remove(TEMP_FILE_PATH)
-        except Exception as e:
-            print("Clear temp store error:", e)
+        self._temp_store.clear()
 
-    def _auto_resume_session(self) -> bool:
-        """Nếu có token trong .temp.data thì xác thực nhanh; hợp lệ -> set self.auth."""
+    def _check_saved_session(self):
+        """
+        Chạy nền: có token trong .temp.data thì kiểm tra hạn token (JWT exp) tại chỗ, chỉ gọi
+        mạng khi cần đăng nhập lại hoặc token không đọc được hạn.
+        Trả về True (token dùng được), False (token hỏng) hoặc None (không có token / lỗi mạng).
+        """
         token = self.temp.get("access_token")
         if not token:
-            return False
+            return None
         try:
-            # Gọi API nhẹ để kiểm tra token (thay bằng endpoint check nếu bạn có)
+            phone = self.temp.get("last_phone", "")
+            session = self.AppApi.session
             self.AppApi.token = token
-            code, courses = self.AppApi.get_my_courses()
-            if code == 0:
-                self.auth = {"access_token": token}
-                self._set_status(f"Đã khôi phục phiên cho {self.temp.get('last_phone','') or 'người dùng'}.")
+            self.AppApi.user_key = phone
+            session.set_credentials(phone, self.temp.get("last_password", ""))
+            expired = session.is_expired()
+            if expired is False:
                 return True
-            # token invalid -> xoá cache
-            self._clear_temp_store()
-            return False
+            if expired:
+                # hết hạn: có mật khẩu đã lưu thì đăng nhập lại, không thì phải đăng nhập tay
+                return session.refresh(token)
+            # token không phải JWT -> gọi API để kiểm tra, giữ kết quả cho màn danh sách khoá
+            result = self.AppApi.get_my_courses()
+            self._resume_courses = result
+            return result[0] == 0
         except Exception as e:
             print("Auto-resume error:", e)
-            return False
+            return None
+
+    def _on_token_refreshed(self, token: str):
+        if self.auth is not None:
+            self.auth["access_token"] = token
+        self._save_temp_store({"access_token": token, "login_at": time.time()})
+
+    def _auto_resume_session(self, session_valid) -> bool:
+        """Áp kết quả _check_saved_session trên thread UI; hợp lệ -> set self.auth."""
+        if session_valid:
+            self.auth = {"access_token": self.temp.get("access_token")}
+            self._set_status(f"Đã khôi phục phiên cho {self.temp.get('last_phone','') or 'người dùng'}.")
+            return True
+        if session_valid is False:
+            # token invalid -> xoá cache
+            self._clear_temp_store()
+        return False
 
     def _ensure_device_info(self):
+        # fingerprint đã lưu trong .conf.json -> không cần tính lại mỗi lần mở app
+        if all(self.configuration.get(k) for k in ("device_id", "device_name", "os")):
+            return {
+                "device_id": self.configuration.get("device_id"),
+                "device_name": self.configuration.get("device_name"),
+                "os": self.configuration.get("os"),
+            }
         info = get_device_info()
         updated = False
         if not self.configuration.get("device_id"):
@@ -888,14 +1952,34 @@ class FlashStudyDownloaderApp:
             self.configuration["os"] = info.get("os")
             updated = True
         if updated:
-            save_config(CONFIG_FILE_PATH, self.configuration)
+            self._save_config()
         return {
             "device_id": self.configuration.get("device_id"),
             "device_name": self.configuration.get("device_name"),
             "os": self.configuration.get("os"),
         }
 
-    def _verify_license_on_startup(self):
+    def _check_license_in_background(self):
+        """Chạy nền: kiểm license đã lưu (cache offline trước); None nếu thiếu/sai định dạng."""
+        license_key = ((self.configuration or {}).get("license_key") or "").strip()
+        if not license_key or not LICENSE_KEY_RE.fullmatch(license_key):
+            return None
+        return self.license_checker.check(self.configuration, self.device_info)
+
+    def _verify_license_now(self):
+        try:
+            return self.license_checker.verify_online(self.configuration, self.device_info)
+        except Exception as exc:
+            return False, f"Lỗi verify license: {exc}"
+
+    def _on_license_revoked(self, message: str):
+        messagebox.showerror("License không hợp lệ", message or "Vui lòng nhập license khác.")
+        self.configuration["license_key"] = ""
+        self._save_config()
+        if not self._verify_license_on_startup():
+            self._on_app_close()
+
+    def _verify_license_on_startup(self, prefetched=None):
         while True:
             license_key = (self.configuration or {}).get("license_key")
             if not license_key:
@@ -907,35 +1991,34 @@ class FlashStudyDownloaderApp:
                 if not new_key:
                     messagebox.showerror("Thiếu license", "Thiếu license key. App sẽ đóng.")
                     return False
-                if not re.fullmatch(
-                    r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}",
-                    new_key.strip(),
-                ):
+                if not LICENSE_KEY_RE.fullmatch(new_key.strip()):
                     messagebox.showerror("Cảnh báo", "License key không đúng định dạng.")
                     continue
                 self.configuration["license_key"] = new_key.strip()
-                save_config(CONFIG_FILE_PATH, self.configuration)
+                self._save_config()
                 license_key = self.configuration["license_key"]
             else:
-                if not re.fullmatch(
-                    r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}",
-                    license_key.strip(),
-                ):
+                if not LICENSE_KEY_RE.fullmatch(license_key.strip()):
                     messagebox.showerror("Cảnh báo", "License key không đúng định dạng.")
                     self.configuration["license_key"] = ""
-                    save_config(CONFIG_FILE_PATH, self.configuration)
+                    self._save_config()
                     continue
 
-            ok, data_or_err = verify_license(self.configuration, self.device_info)
+            if prefetched is not None:
+                # kết quả verify đã chạy nền lúc khởi động
+                ok, data_or_err = prefetched
+                prefetched = None
+            else:
+                ok, data_or_err = self._verify_license_now()
             if ok:
                 self._set_status("License hợp lệ.")
                 return True
 
             messagebox.showerror("License không hợp lệ", data_or_err or "Vui lòng nhập license khác.")
             self.configuration["license_key"] = ""
-            save_config(CONFIG_FILE_PATH, self.configuration)
+            self._save_config()
 
 if __name__ == "__main__":
     root = tk.Tk()
-    app = FlashStudyDownloaderApp(root)
+    app = FlashStudyDownloaderApp(root, startup_benchmark="--startup-benchmark" in sys.argv)
     root.mainloop()
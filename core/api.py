@@ -1,10 +1,45 @@
+import hashlib
 import json
-from typing import Any, Dict, Tuple
+import time
+from typing import Any, Callable, Dict, Iterable, Tuple
 
 import requests
 
+from core.cache import ResponseCache
+from core.http_client import HttpClient
+from core.json_stream import ArrayStreamParser, loads
+from core.metrics import instrument
+from core.models import Course, CourseDetail, Lesson, LessonDetail
+from core.rate_limit import is_host_failure
+from core.session import SessionManager
 from core.utils import get_device_info, log_event
 
+_http_client: HttpClient | None = None
+
+# dựng lại model từ JSON trong cache trên đĩa
+_CACHE_DECODERS = {
+    "my_courses": Course.list_from_dicts,
+    "course_detail": CourseDetail.from_dicts,
+    "lesson_detail": LessonDetail.from_dict,
+}
+
+
+def get_http_client() -> HttpClient:
+    global _http_client
+    if _http_client is None:
+        # from_config để có sẵn rate limiter/circuit breaker cho api.flashstudy.vn
+        _http_client = HttpClient.from_config({})
+    return _http_client
+
+
+def configure_http_client(config: Dict[str, Any]) -> HttpClient:
+    global _http_client
+    previous = _http_client
+    _http_client = HttpClient.from_config(config)
+    if previous is not None:
+        previous.close()
+    return _http_client
+
 
 def backend_headers(config: Dict[str, Any]) -> Dict[str, str]:
     device = {"device_id": config.get("device_id") or get_device_info().get("device_id")}
@@ -17,15 +52,36 @@ def backend_headers(config: Dict[str, Any]) -> Dict[str, str]:
     return {k: v for k, v in base_headers.items() if v}
 
 
-def verify_license(config: Dict[str, Any], device_info: Dict[str, Any]) -> Tuple[bool, Dict[str, Any] | str]:
+def _ext_fields(started: float, resp=None) -> Dict[str, Any]:
+    fields: Dict[str, Any] = {"latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+    if resp is not None:
+        fields["status_code"] = resp.status_code
+        try:
+            fields["bytes_in"] = len(resp.content or b"")
+            fields["bytes_out"] = len((resp.request.body if resp.request is not None else None) or b"")
+        except Exception:
+            pass
+    return fields
+
+
+@instrument("backend.verify_license")
+def verify_license(
+    config: Dict[str, Any], device_info: Dict[str, Any], raise_on_unreachable: bool = False
+) -> Tuple[bool, Dict[str, Any] | str]:
+    """
+    raise_on_unreachable=True: mất kết nối / timeout / backend 5xx được raise (requests.RequestException)
+    thay vì trả (False, msg), để phía gọi phân biệt "không liên lạc được" với "license bị từ chối".
+    """
     base = config.get("backend_base_url")
     if not base:
         return False, "Thiếu backend_base_url trong .conf.json"
     license_key = config.get("license_key")
     if not license_key:
         return False, "Thiếu license_key"
+    started = time.perf_counter()
+    resp = None
     try:
-        resp = requests.post(
+        resp = get_http_client().post(
             f"{base}/license/verify",
             json={
                 "license_key": license_key,
@@ -33,25 +89,32 @@ def verify_license(config: Dict[str, Any], device_info: Dict[str, Any]) -> Tuple
                 "os": device_info.get("os"),
             },
             headers=backend_headers(config),
-            timeout=20,
         )
         if resp.status_code != 200:
             try:
                 msg = (resp.json() or {}).get("message")
             except Exception:
                 msg = None
-            log_event("ext_verify_license", "FAIL", msg or f"status={resp.status_code}")
+            log_event("ext_verify_license", "FAIL", msg or f"status={resp.status_code}", **_ext_fields(started, resp))
+            if raise_on_unreachable and resp.status_code >= 500:
+                raise requests.HTTPError(f"License backend lỗi: status={resp.status_code}", response=resp)
             return False, msg or f"License verify thất bại: status={resp.status_code}"
         data = resp.json() or {}
         if data.get("code") != 0:
-            log_event("ext_verify_license", "FAIL", data.get("message") or "invalid")
+            log_event("ext_verify_license", "FAIL", data.get("message") or "invalid", **_ext_fields(started, resp))
             return False, data.get("message") or "License không hợp lệ"
-        log_event("ext_verify_license", "SUCCESS")
+        log_event("ext_verify_license", "SUCCESS", **_ext_fields(started, resp))
         return True, data.get("data") or {}
+    except requests.HTTPError:
+        raise
     except Exception as exc:
-        log_event("ext_verify_license", "FAIL", str(exc))
+        log_event("ext_verify_license", "FAIL", str(exc), **_ext_fields(started, resp))
+        # chỉ mất kết nối / timeout mới là "không liên lạc được"; body hỏng thì backend vẫn trả lời
+        if raise_on_unreachable and isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+            raise
         return False, f"Lỗi verify license: {exc}"
 
+@instrument("backend.enqueue_download_job")
 def enqueue_download_job(
     config: Dict[str, Any],
     video_id: str,
@@ -74,31 +137,33 @@ def enqueue_download_job(
         "course_id": course_id,
         "video_key_token": video_key_token or config.get("video_key_token"),
     }
+    started = time.perf_counter()
+    resp = None
     try:
-        resp = requests.post(
+        resp = get_http_client().post(
             f"{base}/flashstudy/download/enqueue",
             json=payload,
             headers=backend_headers(config),
-            timeout=20,
         )
         if resp.status_code != 200:
             try:
                 msg = (resp.json() or {}).get("message")
             except Exception:
                 msg = None
-            log_event("ext_enqueue_download", "FAIL", msg or f"status={resp.status_code}")
+            log_event("ext_enqueue_download", "FAIL", msg or f"status={resp.status_code}", **_ext_fields(started, resp))
             return False, msg or f"Enqueue thất bại: status={resp.status_code}"
         data = resp.json() or {}
         if data.get("code") != 0:
-            log_event("ext_enqueue_download", "FAIL", data.get("message") or "failed")
+            log_event("ext_enqueue_download", "FAIL", data.get("message") or "failed", **_ext_fields(started, resp))
             return False, data.get("message") or "Enqueue thất bại"
-        log_event("ext_enqueue_download", "SUCCESS")
+        log_event("ext_enqueue_download", "SUCCESS", **_ext_fields(started, resp))
         return True, data.get("data") or {}
     except Exception as exc:
-        log_event("ext_enqueue_download", "FAIL", str(exc))
+        log_event("ext_enqueue_download", "FAIL", str(exc), **_ext_fields(started, resp))
         return False, f"Lỗi enqueue download: {exc}"
 
 
+@instrument("backend.get_download_statuses")
 def get_download_statuses(
     config: Dict[str, Any], video_ids: list[str]
 ) -> Tuple[bool, Dict[str, Any] | str]:
@@ -107,102 +172,358 @@ def get_download_statuses(
         return False, "Thiếu backend_base_url trong .conf.json"
     if not video_ids:
         return True, {}
+    started = time.perf_counter()
+    resp = None
     try:
-        resp = requests.post(
+        resp = get_http_client().post(
             f"{base}/flashstudy/download/status-by-video",
             json={"video_ids": video_ids},
             headers=backend_headers(config),
-            timeout=20,
         )
         if resp.status_code != 200:
             try:
                 msg = (resp.json() or {}).get("message")
             except Exception:
                 msg = None
-            log_event("ext_get_status", "FAIL", msg or f"status={resp.status_code}")
+            log_event("ext_get_status", "FAIL", msg or f"status={resp.status_code}", **_ext_fields(started, resp))
             return False, msg or f"Lỗi lấy status: status={resp.status_code}"
         data = resp.json() or {}
         if data.get("code") != 0:
-            log_event("ext_get_status", "FAIL", data.get("message") or "failed")
+            log_event("ext_get_status", "FAIL", data.get("message") or "failed", **_ext_fields(started, resp))
             return False, data.get("message") or "Lỗi lấy status"
-        log_event("ext_get_status", "SUCCESS")
+        log_event("ext_get_status", "SUCCESS", **_ext_fields(started, resp))
         return True, data.get("data") or {}
     except Exception as exc:
-        log_event("ext_get_status", "FAIL", str(exc))
+        log_event("ext_get_status", "FAIL", str(exc), **_ext_fields(started, resp))
         return False, f"Lỗi lấy status: {exc}"
 
 
+@instrument("backend.get_drive_link")
 def get_drive_link(config: Dict[str, Any], video_id: str) -> Tuple[bool, Dict[str, Any] | str]:
     base = config.get("backend_base_url")
     if not base:
         return False, "Thiếu backend_base_url trong .conf.json"
     if not video_id:
         return False, "Thiếu video_id"
+    started = time.perf_counter()
+    resp = None
     try:
-        resp = requests.get(
+        resp = get_http_client().get(
             f"{base}/flashstudy/download/link/{video_id}",
             headers=backend_headers(config),
-            timeout=20,
         )
         if resp.status_code != 200:
             try:
                 msg = (resp.json() or {}).get("message")
             except Exception:
                 msg = None
-            log_event("ext_get_link", "FAIL", msg or f"status={resp.status_code}")
+            log_event("ext_get_link", "FAIL", msg or f"status={resp.status_code}", **_ext_fields(started, resp))
             return False, msg or f"Lỗi lấy link: status={resp.status_code}"
         data = resp.json() or {}
         if data.get("code") != 0:
-            log_event("ext_get_link", "FAIL", data.get("message") or "failed")
+            log_event("ext_get_link", "FAIL", data.get("message") or "failed", **_ext_fields(started, resp))
             return False, data.get("message") or "Lỗi lấy link"
-        log_event("ext_get_link", "SUCCESS")
+        log_event("ext_get_link", "SUCCESS", **_ext_fields(started, resp))
         return True, data.get("data") or {}
     except Exception as exc:
-        log_event("ext_get_link", "FAIL", str(exc))
+        log_event("ext_get_link", "FAIL", str(exc), **_ext_fields(started, resp))
         return False, f"Lỗi lấy link: {exc}"
 
 
+@instrument("backend.schedule_cleanup")
 def schedule_cleanup(config: Dict[str, Any], video_id: str) -> Tuple[bool, Dict[str, Any] | str]:
     base = config.get("backend_base_url")
     if not base:
         return False, "Thiếu backend_base_url trong .conf.json"
     if not video_id:
         return False, "Thiếu video_id"
+    started = time.perf_counter()
+    resp = None
     try:
-        resp = requests.post(
+        resp = get_http_client().post(
             f"{base}/flashstudy/download/schedule-cleanup",
             json={"video_id": video_id},
             headers=backend_headers(config),
-            timeout=20,
         )
         if resp.status_code != 200:
             try:
                 msg = (resp.json() or {}).get("message")
             except Exception:
                 msg = None
-            log_event("ext_schedule_cleanup", "FAIL", msg or f"status={resp.status_code}")
+            log_event("ext_schedule_cleanup", "FAIL", msg or f"status={resp.status_code}", **_ext_fields(started, resp))
             return False, msg or f"Lỗi schedule cleanup: status={resp.status_code}"
         data = resp.json() or {}
         if data.get("code") != 0:
-            log_event("ext_schedule_cleanup", "FAIL", data.get("message") or "failed")
+            log_event("ext_schedule_cleanup", "FAIL", data.get("message") or "failed", **_ext_fields(started, resp))
             return False, data.get("message") or "Lỗi schedule cleanup"
-        log_event("ext_schedule_cleanup", "SUCCESS")
+        log_event("ext_schedule_cleanup", "SUCCESS", **_ext_fields(started, resp))
         return True, data.get("data") or {}
     except Exception as exc:
-        log_event("ext_schedule_cleanup", "FAIL", str(exc))
+        log_event("ext_schedule_cleanup", "FAIL", str(exc), **_ext_fields(started, resp))
         return False, f"Lỗi schedule cleanup: {exc}"
 
 
+# ---- batch endpoints ----
+# Mỗi hàm trả về {video_id: (ok, data|error)} giống kết quả của hàm đơn tương ứng.
+# Backend chưa có endpoint batch (404/405/501) -> tự chuyển sang gọi từng video.
+
+BATCH_LIMIT = 100
+_unsupported_batch: set = set()
+
+
+def _post_batch(
+    config: Dict[str, Any],
+    path: str,
+    action: str,
+    payload_key: str,
+    items: Dict[str, Any],
+    single: Callable[[str, Any], Tuple[bool, Any]],
+    batch_limit: int = BATCH_LIMIT,
+) -> Dict[str, Tuple[bool, Any]]:
+    base = config.get("backend_base_url")
+    if not base:
+        return {vid: (False, "Thiếu backend_base_url trong .conf.json") for vid in items}
+    results: Dict[str, Tuple[bool, Any]] = {}
+    ids = [vid for vid in items if vid]
+    for start in range(0, len(ids), max(1, batch_limit)):
+        chunk = ids[start : start + batch_limit]
+        if path in _unsupported_batch:
+            results.update({vid: single(vid, items[vid]) for vid in chunk})
+            continue
+        started = time.perf_counter()
+        resp = None
+        try:
+            resp = get_http_client().post(
+                f"{base}{path}",
+                json={payload_key: [items[vid] for vid in chunk]},
+                headers=backend_headers(config),
+            )
+            if resp.status_code in (404, 405, 501):
+                _unsupported_batch.add(path)
+                log_event(action, "FALLBACK", f"status={resp.status_code}", **_ext_fields(started, resp))
+                results.update({vid: single(vid, items[vid]) for vid in chunk})
+                continue
+            if resp.status_code != 200:
+                try:
+                    msg = (resp.json() or {}).get("message")
+                except Exception:
+                    msg = None
+                msg = msg or f"status={resp.status_code}"
+                log_event(action, "FAIL", msg, items=len(chunk), **_ext_fields(started, resp))
+                results.update({vid: (False, msg) for vid in chunk})
+                continue
+            data = resp.json() or {}
+            if data.get("code") != 0:
+                msg = data.get("message") or "failed"
+                log_event(action, "FAIL", msg, items=len(chunk), **_ext_fields(started, resp))
+                results.update({vid: (False, msg) for vid in chunk})
+                continue
+            per_item = _batch_items(data.get("data"))
+            failed = 0
+            for vid in chunk:
+                result = per_item.get(vid, (False, "Backend không trả kết quả cho video này"))
+                failed += not result[0]
+                results[vid] = result
+            log_event(
+                action, "SUCCESS" if not failed else "PARTIAL", items=len(chunk), failed=failed, **_ext_fields(started, resp)
+            )
+        except Exception as exc:
+            log_event(action, "FAIL", str(exc), items=len(chunk), **_ext_fields(started, resp))
+            results.update({vid: (False, str(exc)) for vid in chunk})
+    return results
+
+
+def _batch_items(data: Any) -> Dict[str, Tuple[bool, Any]]:
+    """Chấp nhận {"results": [{"video_id", "code", "data", "message"}]} hoặc {video_id: item}."""
+    if isinstance(data, dict) and isinstance(data.get("results"), list):
+        items = {str(r.get("video_id")): r for r in data["results"] if isinstance(r, dict) and r.get("video_id")}
+    elif isinstance(data, dict):
+        items = {str(k): v for k, v in data.items()}
+    else:
+        return {}
+    results = {}
+    for vid, item in items.items():
+        if not isinstance(item, dict):
+            results[vid] = (bool(item), item)
+        elif item.get("code", 0) == 0 and item.get("ok", True):
+            results[vid] = (True, item.get("data", item))
+        else:
+            results[vid] = (False, item.get("message") or "failed")
+    return results
+
+
+@instrument("backend.enqueue_download_jobs")
+def enqueue_download_jobs(
+    config: Dict[str, Any], jobs: Iterable[Dict[str, Any]], batch_limit: int = BATCH_LIMIT
+) -> Dict[str, Tuple[bool, Any]]:
+    """jobs: dict có video_id, video_url và tuỳ chọn title/lesson_id/course_id."""
+    items: Dict[str, Any] = {}
+    results: Dict[str, Tuple[bool, Any]] = {}
+    for job in jobs:
+        vid = job.get("video_id")
+        if not vid or not job.get("video_url"):
+            results[vid or ""] = (False, "Thiếu video_id hoặc video_url")
+            continue
+        items[vid] = {
+            "video_id": vid,
+            "video_url": job.get("video_url"),
+            "title": job.get("title"),
+            "lesson_id": job.get("lesson_id"),
+            "course_id": job.get("course_id"),
+            "video_key_token": job.get("video_key_token") or config.get("video_key_token"),
+        }
+
+    def _single(vid, payload):
+        return enqueue_download_job(
+            config,
+            vid,
+            payload["video_url"],
+            title=payload.get("title"),
+            lesson_id=payload.get("lesson_id"),
+            course_id=payload.get("course_id"),
+            video_key_token=payload.get("video_key_token"),
+        )
+
+    results.update(
+        _post_batch(config, "/flashstudy/download/enqueue-batch", "ext_enqueue_download_batch", "jobs", items, _single, batch_limit)
+    )
+    return results
+
+
+@instrument("backend.get_drive_links")
+def get_drive_links(
+    config: Dict[str, Any], video_ids: Iterable[str], batch_limit: int = BATCH_LIMIT
+) -> Dict[str, Tuple[bool, Any]]:
+    items = {vid: vid for vid in dict.fromkeys(video_ids) if vid}
+    return _post_batch(
+        config,
+        "/flashstudy/download/links",
+        "ext_get_link_batch",
+        "video_ids",
+        items,
+        lambda vid, _item: get_drive_link(config, vid),
+        batch_limit,
+    )
+
+
+@instrument("backend.schedule_cleanups")
+def schedule_cleanups(
+    config: Dict[str, Any], video_ids: Iterable[str], batch_limit: int = BATCH_LIMIT
+) -> Dict[str, Tuple[bool, Any]]:
+    items = {vid: vid for vid in dict.fromkeys(video_ids) if vid}
+    return _post_batch(
+        config,
+        "/flashstudy/download/schedule-cleanup-batch",
+        "ext_schedule_cleanup_batch",
+        "video_ids",
+        items,
+        lambda vid, _item: schedule_cleanup(config, vid),
+        batch_limit,
+    )
+
+
+class BackendBatcher:
+    """
+    Cùng chữ ký với get_drive_link / enqueue_download_job / schedule_cleanup (bỏ tham số config),
+    nhưng các call tới trong vài ms (popup, nhiều worker tải cả khoá) được gom thành một request batch.
+    """
+
+    def __init__(self, config: Dict[str, Any], window: float = 0.005, batch_limit: int = BATCH_LIMIT):
+        from core.coalesce import Coalescer
+
+        missing = (False, "Không có kết quả")
+        self.links = Coalescer(
+            lambda items: get_drive_links(config, items, batch_limit),
+            window=window,
+            max_batch=batch_limit,
+            missing=missing,
+            name="drive-links",
+        )
+        self.enqueues = Coalescer(
+            lambda items: enqueue_download_jobs(config, items.values(), batch_limit),
+            window=window,
+            max_batch=batch_limit,
+            missing=missing,
+            name="enqueue",
+        )
+        self.cleanups = Coalescer(
+            lambda items: schedule_cleanups(config, items, batch_limit),
+            window=window,
+            max_batch=batch_limit,
+            missing=missing,
+            name="cleanups",
+        )
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "BackendBatcher":
+        config = config or {}
+        return cls(
+            config,
+            window=float(config.get("backend_batch_window_ms") or 5) / 1000.0,
+            batch_limit=int(config.get("backend_batch_limit") or BATCH_LIMIT),
+        )
+
+    def get_drive_link(self, video_id: str) -> Tuple[bool, Any]:
+        return self._call(self.links, video_id, video_id)
+
+    def enqueue_download_job(
+        self,
+        video_id: str,
+        video_url: str,
+        title: str | None = None,
+        lesson_id: str | None = None,
+        course_id: str | None = None,
+    ) -> Tuple[bool, Any]:
+        job = {"video_id": video_id, "video_url": video_url, "title": title, "lesson_id": lesson_id, "course_id": course_id}
+        return self._call(self.enqueues, video_id, job)
+
+    def schedule_cleanup(self, video_id: str) -> Tuple[bool, Any]:
+        return self._call(self.cleanups, video_id, video_id)
+
+    def stop(self) -> None:
+        for coalescer in (self.links, self.enqueues, self.cleanups):
+            coalescer.stop()
+
+    @staticmethod
+    def _call(coalescer, key: str, item: Any) -> Tuple[bool, Any]:
+        if not key:
+            return False, "Thiếu video_id"
+        try:
+            return coalescer.call(key, item)
+        except Exception as exc:
+            return False, str(exc)
+
+
 class FlashStudyAPI:
-    def __init__(self):
-        self.token = ""
+    def __init__(self, client: HttpClient | None = None, cache: ResponseCache | None = None, catalog=None):
+        self.session = SessionManager(login=self.login)
+        self.user_key = ""
+        self.cache = cache
+        # CatalogIndex (tuỳ chọn): dữ liệu mới tải về được đánh chỉ mục để tìm kiếm offline
+        self.catalog = catalog
+        # (user, endpoint, key) đã kiểm tra có trong catalogue khi phục vụ từ cache
+        self._catalog_checked: set = set()
+        self._client = client
+
+    @property
+    def token(self) -> str:
+        return self.session.token
+
+    @token.setter
+    def token(self, value: str) -> None:
+        self.session.token = value
 
+    @property
+    def http(self) -> HttpClient:
+        return self._client or get_http_client()
+
+    @instrument("flashstudy.login")
     def login(self, phone: str, password: str):
         url = "https://api.flashstudy.vn/api/v1/client/auth/login"
         payload = {"phone": phone, "password": password}
         headers = {"Content-Type": "application/json"}
         try:
-            resp = requests.post(url, headers=headers, json=payload, timeout=20)
+            resp = self.http.post(url, headers=headers, json=payload)
             resp.raise_for_status()
             data = resp.json()
             status = (data or {}).get("status") or {}
@@ -210,6 +531,8 @@ class FlashStudyAPI:
                 token = ((data or {}).get("data") or {}).get("access_token")
                 if token:
                     self.token = token
+                    self.user_key = phone
+                    self.session.set_credentials(phone, password)
                     return 0, token
                 return -1, {
                     "status_code": status.get("code", resp.status_code),
@@ -224,115 +547,238 @@ class FlashStudyAPI:
         except json.JSONDecodeError:
             return -1, {"status_code": -1, "message": "Invalid JSON response"}
         
-    def get_my_courses(self):
-        url = "https://api.flashstudy.vn/api/v1/client/my-course"
-        headers = {"Authorization": f"Bearer {self.token}"}
+    def _user_key(self) -> str:
+        if self.user_key:
+            return str(self.user_key)
+        return hashlib.sha256((self.token or "").encode("utf-8")).hexdigest()[:16]
+
+    def _cached_get(
+        self, endpoint: str, key: Any, url: str, parse, failure_message: str, on_fetched=None, is_indexed=None
+    ):
+        """
+        on_fetched(result) đánh chỉ mục dữ liệu mới tải. Khi trả bản cache (còn hạn / 304 / host lỗi)
+        mà is_indexed() cho biết catalogue chưa có, bản cache cũng được đánh chỉ mục (một lần mỗi phiên).
+        """
+        cache = self.cache
+        user = self._user_key()
+        entry = cache.get(user, endpoint, key, decode=_CACHE_DECODERS.get(endpoint)) if cache is not None else None
+        if entry is not None and entry.is_fresh(cache.ttl_for(endpoint)):
+            self._backfill_catalog(endpoint, key, entry.data, on_fetched, is_indexed)
+            return 0, entry.data
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
         try:
-            resp = requests.get(url, headers=headers, timeout=20)
+            resp, data = self._authorized_get(url, headers)
+            if resp.status_code == 304 and entry is not None:
+                cache.touch(user, endpoint, key, entry)
+                self._backfill_catalog(endpoint, key, entry.data, on_fetched, is_indexed)
+                return 0, entry.data
             resp.raise_for_status()
-            data = resp.json()
             status = (data or {}).get("status") or {}
             if status.get("code") == 200:
-                courses = ((data or {}).get("data") or {}).get("courses", []) or []
-                results = []
-                for course in courses:
-                    teachers = course.get("teachers") or []
-                    teacher_name = ""
-                    if teachers and isinstance(teachers, list):
-                        teacher_name = teachers[0].get("name") or ""
-                    results.append(
-                        {
-                            "course_id": course.get("id"),
-                            "course_name": course.get("name") or "",
-                            "teacher_name": teacher_name,
-                            "expired_time": course.get("expired_time") or "",
-                        }
+                result = parse((data or {}).get("data") or {})
+                if cache is not None:
+                    cache.put(
+                        user,
+                        endpoint,
+                        key,
+                        result,
+                        etag=resp.headers.get("ETag"),
+                        last_modified=resp.headers.get("Last-Modified"),
                     )
-                return 0, results
+                if on_fetched is not None:
+                    self._notify_fetched(on_fetched, result)
+                return 0, result
             return -1, {
                 "status_code": status.get("code", resp.status_code),
-                "message": status.get("message", "Fetch courses failed"),
+                "message": status.get("message", failure_message),
             }
         except requests.RequestException as e:
+            if entry is not None and is_host_failure(e):
+                # host đang lỗi/bị chặn (circuit mở) -> dùng tạm bản cache cũ
+                self._backfill_catalog(endpoint, key, entry.data, on_fetched, is_indexed)
+                return 0, entry.data
             return -1, {"status_code": -1, "message": str(e)}
         except json.JSONDecodeError:
             return -1, {"status_code": -1, "message": "Invalid JSON response"}
 
+    def _backfill_catalog(self, endpoint: str, key: Any, data: Any, on_fetched, is_indexed) -> None:
+        # bản cache có từ trước khi có catalogue (hoặc luôn được phục vụ từ cache/304) chưa từng được đánh chỉ mục
+        if on_fetched is None or is_indexed is None:
+            return
+        marker = (self._user_key(), endpoint, str(key))
+        if marker in self._catalog_checked:
+            return
+        self._catalog_checked.add(marker)
+        try:
+            indexed = is_indexed()
+        except Exception as e:
+            print("catalog index error:", e)
+            return
+        if not indexed:
+            self._notify_fetched(on_fetched, data)
+
+    def _authorized_get(self, url: str, headers: Dict[str, str]):
+        """GET kèm Bearer token; 401 (HTTP hoặc status.code trong body) -> refresh một lần rồi thử lại."""
+        self.session.ensure_fresh()
+        for attempt in range(2):
+            token = self.token
+            resp = self.http.get(url, headers={**headers, "Authorization": f"Bearer {token}"})
+            data = None
+            if resp.status_code not in (304, 401) and resp.ok:
+                data = loads(resp.content)
+            unauthorized = resp.status_code == 401 or ((data or {}).get("status") or {}).get("code") == 401
+            if not unauthorized or attempt or not self.session.refresh(token):
+                return resp, data
+        return resp, data
+
+    @instrument("flashstudy.get_my_courses")
+    def get_my_courses(self):
+        url = "https://api.flashstudy.vn/api/v1/client/my-course"
+        on_fetched = is_indexed = None
+        if self.catalog is not None:
+            user = self.user_key
+            on_fetched = lambda courses: self.catalog.index_courses(user, courses)
+            is_indexed = lambda: self.catalog.has_courses(user)
+        return self._cached_get(
+            "my_courses", "", url, self._parse_courses, "Fetch courses failed", on_fetched, is_indexed
+        )
+
+    @instrument("flashstudy.get_course_detail")
     def get_course_detail(self, course_id: int):
+        return self._fetch_course_detail(course_id)
+
+    def _fetch_course_detail(self, course_id: int):
         url = f"https://api.flashstudy.vn/api/v1/client/my-course/detail-lesson-in-course/{course_id}"
-        headers = {"Authorization": f"Bearer {self.token}"}
+        on_fetched, is_indexed = self._course_detail_indexers(course_id)
+        return self._cached_get(
+            "course_detail",
+            course_id,
+            url,
+            self._parse_course_detail,
+            "Fetch course detail failed",
+            on_fetched,
+            is_indexed,
+        )
+
+    def _course_detail_indexers(self, course_id: int):
+        if self.catalog is None:
+            return None, None
+        return (
+            lambda lessons: self.catalog.index_course_detail(course_id, lessons),
+            lambda: self.catalog.has_course_detail(course_id),
+        )
+
+    @instrument("flashstudy.stream_course_detail")
+    def stream_course_detail(
+        self, course_id: int, on_lessons: Callable[[list], None] | None = None, interval: float = 0.05
+    ):
+        """
+        Như get_course_detail nhưng đọc body theo luồng: mỗi chương được parse ngay khi tải xong
+        và on_lessons(lessons_đã_có) được gọi tối đa mỗi `interval` giây, để UI vẽ các chương
+        đầu trước khi body tải hết. Cache/ETag/catalog giống get_course_detail.
+        """
+        cache = self.cache
+        user = self._user_key()
+        on_fetched, is_indexed = self._course_detail_indexers(course_id)
+        entry = cache.get(user, "course_detail", course_id, decode=CourseDetail.from_dicts) if cache is not None else None
+        if entry is not None and entry.is_fresh(cache.ttl_for("course_detail")):
+            self._backfill_catalog("course_detail", course_id, entry.data, on_fetched, is_indexed)
+            return 0, entry.data
+
+        url = f"https://api.flashstudy.vn/api/v1/client/my-course/detail-lesson-in-course/{course_id}"
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        self.session.ensure_fresh()
+        headers["Authorization"] = f"Bearer {self.token}"
+        parser = ArrayStreamParser(("data", "lessons"), capture_paths=[("status",)])
+        lessons: list = []
         try:
-            resp = requests.get(url, headers=headers, timeout=20)
-            resp.raise_for_status()
-            data = resp.json()
-            status = (data or {}).get("status") or {}
-            if status.get("code") == 200:
-                lessons = ((data or {}).get("data") or {}).get("lessons", []) or []
-                results = []
-                for lesson in lessons:
-                    children = lesson.get("children") or []
-                    child_items = []
-                    if isinstance(children, list):
-                        for child in children:
-                            child_items.append(
-                                {
-                                    "lesson_id": child.get("id"),
-                                    "lesson_name": child.get("name") or "",
-                                    "type": child.get("type"),
-                                }
-                            )
-                    results.append(
-                        {
-                            "lesson_id": lesson.get("id"),
-                            "lesson_name": lesson.get("name") or "",
-                            "type": lesson.get("type"),
-                            "children": child_items,
-                        }
-                    )
-                return 0, results
-            return -1, {
-                "status_code": status.get("code", resp.status_code),
-                "message": status.get("message", "Fetch course detail failed"),
-            }
+            with self.http.get(url, headers=headers, stream=True) as resp:
+                if resp.status_code == 304 and entry is not None:
+                    cache.touch(user, "course_detail", course_id, entry)
+                    self._backfill_catalog("course_detail", course_id, entry.data, on_fetched, is_indexed)
+                    return 0, entry.data
+                if resp.status_code == 401:
+                    # token hỏng -> đi đường thường (refresh + thử lại)
+                    return self._fetch_course_detail(course_id)
+                resp.raise_for_status()
+                last_emit = time.monotonic()
+                for chunk in resp.iter_content(chunk_size=16 * 1024):
+                    for raw in parser.feed(chunk):
+                        lessons.append(Lesson.from_api(raw))
+                    if on_lessons is not None and lessons and time.monotonic() - last_emit >= interval:
+                        on_lessons(CourseDetail(list(lessons)))
+                        last_emit = time.monotonic()
+                parser.close()
+                etag, last_modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
         except requests.RequestException as e:
+            if entry is not None and is_host_failure(e):
+                self._backfill_catalog("course_detail", course_id, entry.data, on_fetched, is_indexed)
+                return 0, entry.data
             return -1, {"status_code": -1, "message": str(e)}
-        except json.JSONDecodeError:
+        except ValueError:
             return -1, {"status_code": -1, "message": "Invalid JSON response"}
 
+        status = parser.captured.get(("status",)) or {}
+        if status.get("code") == 401:
+            return self._fetch_course_detail(course_id)
+        if status.get("code") != 200:
+            return -1, {
+                "status_code": status.get("code", -1),
+                "message": status.get("message", "Fetch course detail failed"),
+            }
+        detail = CourseDetail(lessons)
+        if cache is not None:
+            cache.put(user, "course_detail", course_id, detail, etag=etag, last_modified=last_modified)
+        if on_fetched is not None:
+            self._notify_fetched(on_fetched, detail)
+        if on_lessons is not None:
+            on_lessons(detail)
+        return 0, detail
+
+    @instrument("flashstudy.get_lesson_detail")
     def get_lesson_detail(self, lesson_id: int):
         url = f"https://api.flashstudy.vn/api/v1/client/my-course/lesson/{lesson_id}"
-        headers = {"Authorization": f"Bearer {self.token}"}
+        on_fetched = is_indexed = None
+        if self.catalog is not None:
+            on_fetched = self.catalog.index_lesson_detail
+            is_indexed = lambda: self.catalog.has_lesson_assets(lesson_id)
+        return self._cached_get(
+            "lesson_detail",
+            lesson_id,
+            url,
+            self._parse_lesson_detail,
+            "Fetch lesson detail failed",
+            on_fetched,
+            is_indexed,
+        )
+
+    @staticmethod
+    def _notify_fetched(callback, result) -> None:
+        # lỗi đánh chỉ mục không được làm hỏng call API
         try:
-            resp = requests.get(url, headers=headers, timeout=20)
-            resp.raise_for_status()
-            data = resp.json()
-            status = (data or {}).get("status") or {}
-            if status.get("code") == 200:
-                lesson = ((data or {}).get("data") or {}).get("lesson") or {}
-                lesson_type = lesson.get("type")
-                if lesson_type == 5:
-                    return 0, {
-                        "lesson_id": lesson.get("id"),
-                        "lesson_name": lesson.get("name") or "",
-                        "pdf_url": lesson.get("pdf_url") or "",
-                    }
-                video_urls = []
-                for v in lesson.get("video_url") or []:
-                    if v.get("type") == "vn" and v.get("url"):
-                        video_urls.append(v.get("url"))
-                result = {
-                    "lesson_id": lesson.get("id"),
-                    "lesson_name": lesson.get("name") or "",
-                    "video_url": video_urls,
-                    "document_url": lesson.get("document_url") or "",
-                    "document_answer_url": lesson.get("document_answer_url") or "",
-                }
-                return 0, result
-            return -1, {
-                "status_code": status.get("code", resp.status_code),
-                "message": status.get("message", "Fetch lesson detail failed"),
-            }
-        except requests.RequestException as e:
-            return -1, {"status_code": -1, "message": str(e)}
-        except json.JSONDecodeError:
-            return -1, {"status_code": -1, "message": "Invalid JSON response"}
+            callback(result)
+        except Exception as e:
+            print("catalog index error:", e)
+
+    @staticmethod
+    def _parse_courses(payload: Dict[str, Any]) -> list:
+        return [Course.from_api(course) for course in payload.get("courses", []) or []]
+
+    @staticmethod
+    def _parse_course_detail(payload: Dict[str, Any]) -> CourseDetail:
+        return CourseDetail.from_api(payload.get("lessons", []) or [])
+
+    @staticmethod
+    def _parse_lesson_detail(payload: Dict[str, Any]) -> LessonDetail:
+        return LessonDetail.from_api(payload.get("lesson") or {})
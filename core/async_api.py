@@ -0,0 +1,166 @@
+import asyncio
+import functools
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+from core import api
+from core.http_client import host_key
+
+FLASHSTUDY_BASE = "https://api.flashstudy.vn"
+
+
+class ConcurrencyLimiter:
+    """
+    Giới hạn số request đồng thời (tổng + theo host) cho các coroutine.
+    Request thực chạy trên executor riêng, dùng lại pool keep-alive của HttpClient.
+    """
+
+    def __init__(self, max_concurrency: int = 16, per_host: int = 8):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.per_host = max(1, int(per_host))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="flashstudy-async"
+        )
+        self._loop_state: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]" = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ConcurrencyLimiter":
+        config = config or {}
+        return cls(
+            max_concurrency=int(config.get("async_max_concurrency") or 16),
+            per_host=int(config.get("async_per_host") or 8),
+        )
+
+    def _semaphores(self, host: str) -> Tuple[asyncio.Semaphore, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        state = self._loop_state.get(loop)
+        if state is None:
+            state = (asyncio.Semaphore(self.max_concurrency), {})
+            self._loop_state[loop] = state
+        total, hosts = state
+        if host not in hosts:
+            hosts[host] = asyncio.Semaphore(self.per_host)
+        return total, hosts[host]
+
+    async def run(self, host: str, fn: Callable, *args, **kwargs):
+        total, per_host = self._semaphores(host)
+        async with total:
+            async with per_host:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_default_limiter: ConcurrencyLimiter | None = None
+
+
+def get_default_limiter() -> ConcurrencyLimiter:
+    global _default_limiter
+    if _default_limiter is None:
+        _default_limiter = ConcurrencyLimiter()
+    return _default_limiter
+
+
+def _backend_host(config: Dict[str, Any]) -> str:
+    return host_key(config.get("backend_base_url") or "")
+
+
+async def enqueue_download_job(
+    config: Dict[str, Any],
+    video_id: str,
+    video_url: str,
+    title: str | None = None,
+    lesson_id: str | None = None,
+    course_id: str | None = None,
+    video_key_token: str | None = None,
+    limiter: ConcurrencyLimiter | None = None,
+) -> Tuple[bool, Dict[str, Any] | str]:
+    return await (limiter or get_default_limiter()).run(
+        _backend_host(config),
+        api.enqueue_download_job,
+        config,
+        video_id,
+        video_url,
+        title=title,
+        lesson_id=lesson_id,
+        course_id=course_id,
+        video_key_token=video_key_token,
+    )
+
+
+async def get_download_statuses(
+    config: Dict[str, Any], video_ids: list[str], limiter: ConcurrencyLimiter | None = None
+) -> Tuple[bool, Dict[str, Any] | str]:
+    return await (limiter or get_default_limiter()).run(
+        _backend_host(config), api.get_download_statuses, config, video_ids
+    )
+
+
+async def get_drive_link(
+    config: Dict[str, Any], video_id: str, limiter: ConcurrencyLimiter | None = None
+) -> Tuple[bool, Dict[str, Any] | str]:
+    return await (limiter or get_default_limiter()).run(
+        _backend_host(config), api.get_drive_link, config, video_id
+    )
+
+
+async def schedule_cleanup(
+    config: Dict[str, Any], video_id: str, limiter: ConcurrencyLimiter | None = None
+) -> Tuple[bool, Dict[str, Any] | str]:
+    return await (limiter or get_default_limiter()).run(
+        _backend_host(config), api.schedule_cleanup, config, video_id
+    )
+
+
+async def gather_drive_links(
+    config: Dict[str, Any], video_ids: Iterable[str], limiter: ConcurrencyLimiter | None = None
+) -> Dict[str, Tuple[bool, Dict[str, Any] | str]]:
+    """Lấy drive link cho nhiều video cùng lúc, trả về {video_id: (ok, data)}."""
+    ids = list(dict.fromkeys(v for v in video_ids if v))
+    results = await asyncio.gather(*(get_drive_link(config, vid, limiter=limiter) for vid in ids))
+    return dict(zip(ids, results))
+
+
+class AsyncFlashStudyAPI:
+    """Bản async của FlashStudyAPI, trả về cùng dạng (code, data)."""
+
+    def __init__(self, sync_api: api.FlashStudyAPI | None = None, limiter: ConcurrencyLimiter | None = None):
+        self.sync_api = sync_api or api.FlashStudyAPI()
+        self.limiter = limiter or get_default_limiter()
+
+    @property
+    def token(self) -> str:
+        return self.sync_api.token
+
+    @token.setter
+    def token(self, value: str) -> None:
+        self.sync_api.token = value
+
+    async def _run(self, fn: Callable, *args):
+        return await self.limiter.run(FLASHSTUDY_BASE, fn, *args)
+
+    async def login(self, phone: str, password: str):
+        return await self._run(self.sync_api.login, phone, password)
+
+    async def get_my_courses(self):
+        return await self._run(self.sync_api.get_my_courses)
+
+    async def get_course_detail(self, course_id: int):
+        return await self._run(self.sync_api.get_course_detail, course_id)
+
+    async def get_lesson_detail(self, lesson_id: int):
+        return await self._run(self.sync_api.get_lesson_detail, lesson_id)
+
+    async def gather_lesson_details(self, lesson_ids: Iterable[int]) -> Dict[Any, Tuple[int, Any]]:
+        """Lấy chi tiết nhiều bài học song song, trả về {lesson_id: (code, data)}."""
+        ids = list(dict.fromkeys(lid for lid in lesson_ids if lid is not None))
+        results = await asyncio.gather(*(self.get_lesson_detail(lid) for lid in ids))
+        return dict(zip(ids, results))
+
+    async def gather_course_details(self, course_ids: Iterable[int]) -> Dict[Any, Tuple[int, Any]]:
+        ids = list(dict.fromkeys(cid for cid in course_ids if cid is not None))
+        results = await asyncio.gather(*(self.get_course_detail(cid) for cid in ids))
+        return dict(zip(ids, results))
@@ -0,0 +1,262 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class BatchJobQueue:
+    """
+    Hàng đợi job tải cả khoá, lưu trên đĩa (app_resource/.batch_queue.json)
+    để tiếp tục được sau khi tắt app hoặc crash.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print("Load batch queue error:", e)
+            return
+        for job in (data or {}).get("jobs", []) if isinstance(data, dict) else []:
+            if not isinstance(job, dict) or not job.get("job_id"):
+                continue
+            # job đang chạy dở lúc app tắt -> chạy lại
+            if job.get("status") == JOB_RUNNING:
+                job["status"] = JOB_PENDING
+            self._jobs[job["job_id"]] = job
+
+    def save(self) -> None:
+        with self._lock:
+            payload = {"jobs": list(self._jobs.values())}
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(payload, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                print("Save batch queue error:", e)
+
+    def add(self, jobs: Iterable[Dict[str, Any]], done: Dict[str, Any] | None = None) -> int:
+        """done: {job_id: result} cho các job đã xử lý xong trước khi vào hàng đợi."""
+        added = 0
+        now = time.time()
+        with self._lock:
+            for job in jobs:
+                job_id = job.get("job_id")
+                if not job_id:
+                    continue
+                existing = self._jobs.get(job_id)
+                if existing is not None and existing.get("status") in (JOB_PENDING, JOB_RUNNING, JOB_DONE):
+                    continue
+                record = {
+                    "status": JOB_PENDING,
+                    "priority": 100,
+                    "attempts": 0,
+                    "error": "",
+                    "result": None,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                record.update(job)
+                record["status"] = JOB_PENDING
+                if done and job_id in done:
+                    record["status"] = JOB_DONE
+                    record["result"] = done[job_id]
+                self._jobs[job_id] = record
+                added += 1
+            if added:
+                self.save()
+        return added
+
+    def claim_next(self) -> Dict[str, Any] | None:
+        with self._lock:
+            pending = [j for j in self._jobs.values() if j.get("status") == JOB_PENDING]
+            if not pending:
+                return None
+            job = min(pending, key=lambda j: (j.get("priority", 100), j.get("created_at", 0), j.get("order", 0)))
+            job["status"] = JOB_RUNNING
+            job["attempts"] = int(job.get("attempts") or 0) + 1
+            job["updated_at"] = time.time()
+            self.save()
+            return dict(job)
+
+    def mark(self, job_id: str, status: str, error: str = "", result: Any = None) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job["status"] = status
+            job["error"] = error or ""
+            job["result"] = result
+            job["updated_at"] = time.time()
+            self.save()
+
+    def retry_failed(self) -> int:
+        with self._lock:
+            count = 0
+            for job in self._jobs.values():
+                if job.get("status") == JOB_FAILED:
+                    job["status"] = JOB_PENDING
+                    job["attempts"] = 0
+                    count += 1
+            if count:
+                self.save()
+            return count
+
+    def clear_finished(self) -> None:
+        with self._lock:
+            self._jobs = {k: v for k, v in self._jobs.items() if v.get("status") not in (JOB_DONE,)}
+            self.save()
+
+    def has_pending(self) -> bool:
+        with self._lock:
+            return any(j.get("status") == JOB_PENDING for j in self._jobs.values())
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {JOB_PENDING: 0, JOB_RUNNING: 0, JOB_DONE: 0, JOB_FAILED: 0}
+            courses: Dict[Any, Dict[str, Any]] = {}
+            for job in self._jobs.values():
+                status = job.get("status", JOB_PENDING)
+                counts[status] = counts.get(status, 0) + 1
+                course = courses.setdefault(
+                    job.get("course_id"),
+                    {"course_title": job.get("course_title") or "", "total": 0, JOB_DONE: 0, JOB_FAILED: 0},
+                )
+                course["total"] += 1
+                if status in (JOB_DONE, JOB_FAILED):
+                    course[status] += 1
+            counts["total"] = len(self._jobs)
+            counts["courses"] = courses
+            return counts
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(j) for j in self._jobs.values()]
+
+
+class BatchPipeline:
+    """
+    Chạy các job trong BatchJobQueue: tối đa `max_concurrent` job cùng lúc,
+    cách nhau ít nhất `min_interval` giây, retry tối đa `max_attempts` lần.
+    """
+
+    def __init__(
+        self,
+        queue: BatchJobQueue,
+        handler: Callable[[Dict[str, Any]], Tuple[bool, Any]],
+        max_concurrent: int = 2,
+        min_interval: float = 1.0,
+        max_attempts: int = 3,
+        on_change: Callable[[Dict[str, Any]], None] | None = None,
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.min_interval = max(0.0, float(min_interval))
+        self.max_attempts = max(1, int(max_attempts))
+        self.on_change = on_change
+        self._cond = threading.Condition()
+        self._paused = False
+        self._stopped = False
+        self._last_start = 0.0
+        self._threads: list[threading.Thread] = []
+
+    @classmethod
+    def from_config(cls, queue, handler, config: Dict[str, Any], on_change=None) -> "BatchPipeline":
+        config = config or {}
+        return cls(
+            queue,
+            handler,
+            max_concurrent=int(config.get("batch_max_concurrent") or 2),
+            min_interval=float(config.get("batch_min_interval", 1.0)),
+            max_attempts=int(config.get("batch_max_attempts") or 3),
+            on_change=on_change,
+        )
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    def start(self) -> None:
+        with self._cond:
+            self._stopped = False
+            self._cond.notify_all()
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.max_concurrent:
+            t = threading.Thread(target=self._worker, name=f"flashstudy-batch-{len(self._threads)}", daemon=True)
+            self._threads.append(t)
+            t.start()
+
+    def wake(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
+
+    def pause(self) -> None:
+        with self._cond:
+            self._paused = True
+        self._notify()
+
+    def resume(self) -> None:
+        with self._cond:
+            self._paused = False
+            self._cond.notify_all()
+        self._notify()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def _notify(self) -> None:
+        if self.on_change:
+            try:
+                self.on_change(self.queue.summary())
+            except Exception as e:
+                print("batch progress error:", e)
+
+    def _wait_turn(self) -> bool:
+        with self._cond:
+            while True:
+                if self._stopped:
+                    return False
+                if not self._paused and self.queue.has_pending():
+                    wait = self._last_start + self.min_interval - time.monotonic()
+                    if wait <= 0:
+                        self._last_start = time.monotonic()
+                        return True
+                    self._cond.wait(wait)
+                    continue
+                self._cond.wait(1.0)
+
+    def _worker(self) -> None:
+        while self._wait_turn():
+            job = self.queue.claim_next()
+            if job is None:
+                continue
+            self._notify()
+            try:
+                ok, result = self.handler(job)
+            except Exception as exc:
+                ok, result = False, str(exc)
+            if ok:
+                self.queue.mark(job["job_id"], JOB_DONE, result=result if isinstance(result, (dict, str)) else None)
+            elif job.get("attempts", 1) < self.max_attempts:
+                self.queue.mark(job["job_id"], JOB_PENDING, error=str(result))
+            else:
+                self.queue.mark(job["job_id"], JOB_FAILED, error=str(result))
+            self._notify()
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+
+DEFAULT_TTLS = {
+    "my_courses": 10 * 60,
+    "course_detail": 30 * 60,
+    "lesson_detail": 60 * 60,
+}
+
+
+class CacheEntry:
+    def __init__(self, data: Any, stored_at: float, etag: str | None = None, last_modified: str | None = None):
+        self.data = data
+        self.stored_at = stored_at
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def is_fresh(self, ttl: float) -> bool:
+        return ttl > 0 and (time.time() - self.stored_at) < ttl
+
+
+class ResponseCache:
+    """
+    Cache response của FlashStudyAPI trên đĩa (app_resource/.cache),
+    key theo user + endpoint, TTL theo endpoint, xoá theo LRU khi vượt dung lượng.
+
+    `max_live` entry dùng gần nhất được giữ cả trong RAM: get() trả lại đúng object đã put()
+    (model đã parse), không đọc/parse lại file. Object có to_dict() được serialize qua đó.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_bytes: int = 50 * 1024 * 1024,
+        ttls: Dict[str, float] | None = None,
+        max_live: int = 64,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+        self._lock = threading.Lock()
+        self._index: Dict[str, list] = {}
+        self.max_live = max(0, int(max_live))
+        self._live: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    @classmethod
+    def from_config(cls, cache_dir: str, config: Dict[str, Any]) -> "ResponseCache":
+        config = config or {}
+        max_mb = float(config.get("cache_max_mb") or 50)
+        ttls = config.get("cache_ttls") if isinstance(config.get("cache_ttls"), dict) else None
+        return cls(cache_dir, max_bytes=int(max_mb * 1024 * 1024), ttls=ttls)
+
+    def ttl_for(self, endpoint: str) -> float:
+        return float(self.ttls.get(endpoint, 0))
+
+    def _file_name(self, user: str, endpoint: str, key: Any) -> str:
+        raw = f"{user}\x00{endpoint}\x00{key}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest() + ".json"
+
+    def _load_index(self) -> None:
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+                self._index[name] = [st.st_size, st.st_mtime]
+            except OSError:
+                continue
+
+    def get(
+        self, user: str, endpoint: str, key: Any = "", decode: Callable[[Any], Any] | None = None
+    ) -> CacheEntry | None:
+        """decode: dựng lại model từ JSON trên đĩa (chỉ khi entry chưa có trong RAM)."""
+        name = self._file_name(user, endpoint, key)
+        path = os.path.join(self.cache_dir, name)
+        with self._lock:
+            if name not in self._index:
+                return None
+            entry = self._live.get(name)
+            if entry is None:
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        raw = json.load(f)
+                    data = raw.get("data")
+                    if decode is not None:
+                        data = decode(data)
+                except Exception:
+                    self._drop(name)
+                    return None
+                entry = CacheEntry(data, raw.get("stored_at") or 0, raw.get("etag"), raw.get("last_modified"))
+                self._remember(name, entry)
+            else:
+                self._live.move_to_end(name)
+            now = time.time()
+            self._index[name][1] = now
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+        return entry
+
+    def put(
+        self,
+        user: str,
+        endpoint: str,
+        key: Any,
+        data: Any,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        stored_at: float | None = None,
+    ) -> None:
+        name = self._file_name(user, endpoint, key)
+        path = os.path.join(self.cache_dir, name)
+        payload = {
+            "user": user,
+            "endpoint": endpoint,
+            "key": str(key),
+            "stored_at": stored_at if stored_at is not None else time.time(),
+            "etag": etag,
+            "last_modified": last_modified,
+            "data": data,
+        }
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=_encode)
+        with self._lock:
+            try:
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(body)
+                os.replace(tmp_path, path)
+                self._index[name] = [os.path.getsize(path), time.time()]
+            except Exception as e:
+                print("cache write error:", e)
+                return
+            self._remember(name, CacheEntry(data, payload["stored_at"], etag, last_modified))
+            self._evict()
+
+    def touch(self, user: str, endpoint: str, key: Any, entry: CacheEntry) -> None:
+        """Response 304: dữ liệu cũ vẫn đúng -> làm mới thời điểm lưu."""
+        self.put(user, endpoint, key, entry.data, etag=entry.etag, last_modified=entry.last_modified)
+
+    def invalidate(self, user: str, endpoint: str, key: Any = "") -> None:
+        with self._lock:
+            self._drop(self._file_name(user, endpoint, key))
+
+    def clear(self) -> None:
+        with self._lock:
+            for name in list(self._index):
+                self._drop(name)
+
+    def _remember(self, name: str, entry: CacheEntry) -> None:
+        if self.max_live <= 0:
+            return
+        self._live[name] = entry
+        self._live.move_to_end(name)
+        while len(self._live) > self.max_live:
+            self._live.popitem(last=False)
+
+    def _drop(self, name: str) -> None:
+        self._index.pop(name, None)
+        self._live.pop(name, None)
+        try:
+            os.remove(os.path.join(self.cache_dir, name))
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        total = sum(size for size, _ in self._index.values())
+        if total <= self.max_bytes:
+            return
+        for name, (size, _used) in sorted(self._index.items(), key=lambda kv: kv[1][1]):
+            self._drop(name)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+def _encode(value: Any) -> Any:
+    to_dict = getattr(value, "to_dict", None)
+    if to_dict is None:
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    return to_dict()
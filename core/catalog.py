@@ -0,0 +1,259 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List
+
+from core.models import Course, CourseDetail, LessonDetail
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    course_id INTEGER PRIMARY KEY,
+    course_name TEXT NOT NULL DEFAULT '',
+    teacher_name TEXT NOT NULL DEFAULT '',
+    expired_time TEXT NOT NULL DEFAULT '',
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ownership (
+    user_key TEXT NOT NULL,
+    course_id INTEGER NOT NULL,
+    PRIMARY KEY (user_key, course_id)
+);
+CREATE TABLE IF NOT EXISTS lessons (
+    lesson_id INTEGER PRIMARY KEY,
+    course_id INTEGER NOT NULL,
+    parent_id INTEGER,
+    position INTEGER NOT NULL DEFAULT 0,
+    lesson_name TEXT NOT NULL DEFAULT '',
+    type INTEGER,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lessons_course ON lessons (course_id, position);
+CREATE TABLE IF NOT EXISTS assets (
+    lesson_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    url TEXT NOT NULL,
+    PRIMARY KEY (lesson_id, kind, url)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS catalog_fts USING fts5(
+    course_name, lesson_name, teacher_name,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_FOLD_TABLE = str.maketrans({"đ": "d", "Đ": "D"})
+
+
+class CatalogIndex:
+    """
+    Chỉ mục SQLite (app_resource/.catalog.db) của khoá học, cây bài học và URL tài liệu,
+    được điền dần khi FlashStudyAPI tải dữ liệu mới. Bảng FTS5 trên tên khoá/bài/giáo viên
+    (bỏ dấu tiếng Việt) cho phép tìm bài học trong mọi khoá đã mua mà không cần gọi mạng.
+
+    Dòng FTS của bài học dùng rowid = lesson_id, của khoá học dùng rowid = -course_id,
+    nên cập nhật lại một khoá chỉ đụng đến các dòng thực sự thay đổi.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    # ----- ghi -----
+
+    def index_courses(self, user_key: str, courses: Iterable[Course]) -> None:
+        """Kết quả get_my_courses: cập nhật khoá học và danh sách khoá của user."""
+        now = time.time()
+        with self._lock, self._conn:
+            owned = []
+            for course in courses or []:
+                course_id = _int(course.course_id)
+                if course_id is None:
+                    continue
+                owned.append(course_id)
+                name = course.course_name
+                teacher = course.teacher_name
+                row = self._conn.execute(
+                    "SELECT course_name, teacher_name FROM courses WHERE course_id = ?", (course_id,)
+                ).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO courses (course_id, course_name, teacher_name, expired_time, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (course_id, name, teacher, course.expired_time, now),
+                )
+                if row is not None and (row["course_name"], row["teacher_name"]) == (name, teacher):
+                    continue
+                # tên khoá/giáo viên nằm trong dòng FTS của từng bài -> đổi thì đánh lại cả khoá
+                self._replace_fts(-course_id, name, "", teacher)
+                for lesson in self._conn.execute(
+                    "SELECT lesson_id, lesson_name FROM lessons WHERE course_id = ?", (course_id,)
+                ).fetchall():
+                    self._replace_fts(lesson["lesson_id"], name, lesson["lesson_name"], teacher)
+            self._conn.execute("DELETE FROM ownership WHERE user_key = ?", (user_key or "",))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO ownership (user_key, course_id) VALUES (?, ?)",
+                [(user_key or "", course_id) for course_id in owned],
+            )
+
+    def index_course_detail(self, course_id: Any, lessons: CourseDetail) -> int:
+        """Kết quả get_course_detail: chỉ ghi bài mới/đổi, xoá bài không còn. Trả về số dòng đã đổi."""
+        course_id = _int(course_id)
+        if course_id is None:
+            return 0
+        rows = []
+        for lesson in lessons or []:
+            lesson_id = _int(lesson.lesson_id)
+            if lesson_id is None:
+                continue
+            rows.append((lesson_id, None, len(rows), lesson.lesson_name, _int(lesson.type)))
+            for child in lesson.children:
+                child_id = _int(child.lesson_id)
+                if child_id is not None:
+                    rows.append((child_id, lesson_id, len(rows), child.lesson_name, _int(child.type)))
+
+        now = time.time()
+        changed = 0
+        with self._lock, self._conn:
+            course = self._conn.execute(
+                "SELECT course_name, teacher_name FROM courses WHERE course_id = ?", (course_id,)
+            ).fetchone()
+            course_name = course["course_name"] if course is not None else ""
+            teacher = course["teacher_name"] if course is not None else ""
+            existing = {
+                row["lesson_id"]: (row["parent_id"], row["position"], row["lesson_name"], row["type"])
+                for row in self._conn.execute(
+                    "SELECT lesson_id, parent_id, position, lesson_name, type FROM lessons WHERE course_id = ?",
+                    (course_id,),
+                )
+            }
+            for lesson_id, parent_id, position, name, lesson_type in rows:
+                old = existing.pop(lesson_id, None)
+                if old == (parent_id, position, name, lesson_type):
+                    continue
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO lessons (lesson_id, course_id, parent_id, position, lesson_name, type, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (lesson_id, course_id, parent_id, position, name, lesson_type, now),
+                )
+                if old is None or old[2] != name:
+                    self._replace_fts(lesson_id, course_name, name, teacher)
+                changed += 1
+            for lesson_id in existing:
+                self._conn.execute("DELETE FROM lessons WHERE lesson_id = ?", (lesson_id,))
+                self._conn.execute("DELETE FROM catalog_fts WHERE rowid = ?", (lesson_id,))
+                self._conn.execute("DELETE FROM assets WHERE lesson_id = ?", (lesson_id,))
+                changed += 1
+        return changed
+
+    def index_lesson_detail(self, detail: LessonDetail) -> None:
+        """Kết quả get_lesson_detail: lưu URL video/tài liệu/đề thi của bài."""
+        lesson_id = _int(detail.lesson_id) if detail is not None else None
+        if lesson_id is None:
+            return
+        assets = [("video", video.source_url) for video in detail.videos]
+        assets.extend((doc.kind, doc.url) for doc in detail.documents)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM assets WHERE lesson_id = ?", (lesson_id,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO assets (lesson_id, kind, url) VALUES (?, ?, ?)",
+                [(lesson_id, kind, url) for kind, url in assets],
+            )
+
+    # ----- đọc -----
+
+    def search(self, query: str, user_key: str | None = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Tìm theo tiền tố từng từ (không phân biệt dấu). Mỗi kết quả có course_id, course_name,
+        lesson_id (None nếu khớp tên khoá), lesson_name, type, parent_name.
+        """
+        match = _fts_query(query)
+        if not match:
+            return []
+        sql = (
+            "SELECT f.rowid AS rid, bm25(catalog_fts) AS rank,"
+            " l.lesson_id, l.lesson_name, l.type, p.lesson_name AS parent_name,"
+            " c.course_id, c.course_name, c.teacher_name"
+            " FROM catalog_fts f"
+            " LEFT JOIN lessons l ON f.rowid > 0 AND l.lesson_id = f.rowid"
+            " LEFT JOIN lessons p ON p.lesson_id = l.parent_id"
+            " JOIN courses c ON c.course_id = CASE WHEN f.rowid > 0 THEN l.course_id ELSE -f.rowid END"
+            " WHERE catalog_fts MATCH ?"
+        )
+        params: list = [match]
+        if user_key is not None:
+            sql += " AND c.course_id IN (SELECT course_id FROM ownership WHERE user_key = ?)"
+            params.append(user_key)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(int(limit))
+        with self._lock:
+            try:
+                rows = self._conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as e:
+                print("catalog search error:", e)
+                return []
+        return [
+            {
+                "course_id": row["course_id"],
+                "course_name": row["course_name"],
+                "teacher_name": row["teacher_name"],
+                "lesson_id": row["lesson_id"],
+                "lesson_name": row["lesson_name"] or "",
+                "type": row["type"],
+                "parent_name": row["parent_name"] or "",
+            }
+            for row in rows
+        ]
+
+    def has_courses(self, user_key: str) -> bool:
+        return self._exists("SELECT 1 FROM ownership WHERE user_key = ? LIMIT 1", (user_key or "",))
+
+    def has_course_detail(self, course_id: Any) -> bool:
+        return self._exists("SELECT 1 FROM lessons WHERE course_id = ? LIMIT 1", (_int(course_id),))
+
+    def has_lesson_assets(self, lesson_id: Any) -> bool:
+        return self._exists("SELECT 1 FROM assets WHERE lesson_id = ? LIMIT 1", (_int(lesson_id),))
+
+    def lesson_assets(self, lesson_id: Any) -> Dict[str, List[str]]:
+        result: Dict[str, List[str]] = {}
+        with self._lock:
+            for row in self._conn.execute("SELECT kind, url FROM assets WHERE lesson_id = ?", (_int(lesson_id),)):
+                result.setdefault(row["kind"], []).append(row["url"])
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _exists(self, sql: str, params: tuple) -> bool:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone() is not None
+
+    def _replace_fts(self, rowid: int, course_name: str, lesson_name: str, teacher: str) -> None:
+        self._conn.execute("DELETE FROM catalog_fts WHERE rowid = ?", (rowid,))
+        self._conn.execute(
+            "INSERT INTO catalog_fts (rowid, course_name, lesson_name, teacher_name) VALUES (?, ?, ?, ?)",
+            (rowid, _fold(course_name), _fold(lesson_name), _fold(teacher)),
+        )
+
+
+def _fts_query(text: str) -> str:
+    # mỗi từ thành một prefix query có ngoặc kép -> ký tự đặc biệt của FTS5 không làm lỗi cú pháp
+    return " ".join(f'"{token}"*' for token in _TOKEN_RE.findall(_fold(text or "")))
+
+
+def _fold(text: str) -> str:
+    # unicode61 bỏ dấu thanh nhưng "đ" là chữ riêng, không phải d + dấu
+    return text.translate(_FOLD_TABLE)
+
+
+def _int(value: Any) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
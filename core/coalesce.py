@@ -0,0 +1,90 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class Coalescer:
+    """
+    Micro-batching: các call submit(key, item) tới trong cùng `window` giây được gom thành
+    một lần batch_fn({key: item}) -> {key: result}. Key trùng dùng chung một Future;
+    lô vượt max_batch được gửi ngay không chờ hết window.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[Dict[Hashable, Any]], Dict[Hashable, Any]],
+        window: float = 0.005,
+        max_batch: int = 100,
+        missing: Any = None,
+        name: str = "coalescer",
+    ):
+        self.batch_fn = batch_fn
+        self.window = max(0.0, float(window))
+        self.max_batch = max(1, int(max_batch))
+        self.missing = missing
+        self.name = name
+        self._pending: Dict[Hashable, Tuple[Any, Future]] = {}
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread: threading.Thread | None = None
+        self.batches_sent = 0
+
+    def submit(self, key: Hashable, item: Any = None) -> Future:
+        with self._cond:
+            pending = self._pending.get(key)
+            if pending is not None:
+                return pending[1]
+            future: Future = Future()
+            self._pending[key] = (item, future)
+            self._cond.notify_all()
+        self._ensure_thread()
+        return future
+
+    def call(self, key: Hashable, item: Any = None, timeout: float | None = 60) -> Any:
+        return self.submit(key, item).result(timeout=timeout)
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def _ensure_thread(self) -> None:
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name=f"flashstudy-{self.name}", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    pending, self._pending = self._pending, {}
+                    for _item, future in pending.values():
+                        future.set_result(self.missing)
+                    return
+                # gom thêm các call tới trong window (hoặc tới khi đủ max_batch)
+                deadline = time.monotonic() + self.window
+                while len(self._pending) < self.max_batch and not self._stopped:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                keys = list(self._pending)[: self.max_batch]
+                batch = {key: self._pending.pop(key) for key in keys}
+            self._flush(batch)
+
+    def _flush(self, batch: Dict[Hashable, Tuple[Any, Future]]) -> None:
+        self.batches_sent += 1
+        try:
+            results = self.batch_fn({key: item for key, (item, _future) in batch.items()}) or {}
+        except Exception as exc:
+            for _item, future in batch.values():
+                future.set_exception(exc)
+            return
+        for key, (_item, future) in batch.items():
+            future.set_result(results.get(key, self.missing))
@@ -0,0 +1,174 @@
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from core.utils import append_download_log
+
+
+def default_download_dir() -> str:
+    return os.path.join(os.path.expanduser("~"), "Downloads", "FlashStudy")
+
+
+def safe_filename(name: str, fallback: str = "video") -> str:
+    cleaned = re.sub(r'[\\/:*?"<>|\r\n\t]+', " ", name or "").strip().strip(".")
+    cleaned = re.sub(r"\s+", " ", cleaned)
+    return cleaned[:150] or fallback
+
+
+class LocalVideoDownloader:
+    """
+    Tải video trực tiếp bằng yt-dlp (không qua hàng đợi backend):
+    tải song song fragment HLS/DASH, giới hạn số video tải cùng lúc, tiếp tục từ file .part.
+    """
+
+    def __init__(self, output_dir: str, max_downloads: int = 2, fragment_concurrency: int = 8):
+        self.output_dir = output_dir
+        self.fragment_concurrency = max(1, int(fragment_concurrency))
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_downloads)), thread_name_prefix="flashstudy-dl")
+        self._cancelled: set[str] = set()
+        self._active: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "LocalVideoDownloader":
+        config = config or {}
+        return cls(
+            output_dir=config.get("download_dir") or default_download_dir(),
+            max_downloads=int(config.get("max_parallel_downloads") or 2),
+            fragment_concurrency=int(config.get("fragment_concurrency") or 8),
+        )
+
+    @staticmethod
+    def available() -> bool:
+        try:
+            import yt_dlp  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def is_active(self, video_id: str) -> bool:
+        with self._lock:
+            return video_id in self._active
+
+    def submit(
+        self,
+        url: str,
+        title: str,
+        video_id: str,
+        on_progress: Callable[[float | None, str], None] | None = None,
+        on_done: Callable[[bool, str], None] | None = None,
+        output_dir: str | None = None,
+    ) -> Future:
+        """
+        on_progress(fraction, text) và on_done(ok, output_path_or_error) được gọi
+        từ thread tải — phía UI cần tự chuyển về thread Tk.
+        """
+        with self._lock:
+            existing = self._active.get(video_id)
+            if existing is not None:
+                return existing
+            self._cancelled.discard(video_id)
+            future = self._executor.submit(
+                self._download, url, title, video_id, on_progress, on_done, output_dir or self.output_dir
+            )
+            self._active[video_id] = future
+        future.add_done_callback(lambda _f: self._forget(video_id))
+        return future
+
+    def cancel(self, video_id: str) -> None:
+        with self._lock:
+            self._cancelled.add(video_id)
+            future = self._active.get(video_id)
+        if future is not None:
+            future.cancel()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._cancelled.update(self._active)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _forget(self, video_id: str) -> None:
+        with self._lock:
+            self._active.pop(video_id, None)
+
+    def _download(self, url, title, video_id, on_progress, on_done, output_dir) -> str:
+        output_path = ""
+        try:
+            import yt_dlp
+        except ImportError:
+            error = "Chưa cài yt-dlp, không thể tải trực tiếp"
+            append_download_log("FAIL", url, output_path, error)
+            if on_done:
+                on_done(False, error)
+            return ""
+
+        os.makedirs(output_dir, exist_ok=True)
+        base_name = safe_filename(title, fallback=video_id or "video")
+        state = {"filename": "", "bytes": 0}
+        started = time.perf_counter()
+
+        def _hook(d):
+            if video_id in self._cancelled:
+                raise yt_dlp.utils.DownloadCancelled("cancelled")
+            if d.get("filename"):
+                state["filename"] = d["filename"]
+            if d.get("downloaded_bytes"):
+                state["bytes"] = d["downloaded_bytes"]
+            if not on_progress:
+                return
+            if d.get("status") == "downloading":
+                total = d.get("total_bytes") or d.get("total_bytes_estimate")
+                done = d.get("downloaded_bytes") or 0
+                if total:
+                    on_progress(min(done / total, 1.0), f"{int(done * 100 / total)}%")
+                else:
+                    frag, frags = d.get("fragment_index"), d.get("fragment_count")
+                    if frag and frags:
+                        on_progress(min(frag / frags, 1.0), f"{int(frag * 100 / frags)}%")
+                    else:
+                        on_progress(None, f"{done // (1024 * 1024)} MB")
+            elif d.get("status") == "finished":
+                on_progress(1.0, "100%")
+
+        ydl_opts = {
+            "outtmpl": os.path.join(output_dir, f"{base_name}.%(ext)s"),
+            "concurrent_fragment_downloads": self.fragment_concurrency,
+            "continuedl": True,
+            "nopart": False,
+            "retries": 10,
+            "fragment_retries": 10,
+            "noprogress": True,
+            "quiet": True,
+            "no_warnings": True,
+            "progress_hooks": [_hook],
+        }
+        try:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=True)
+                output_path = state["filename"] or ydl.prepare_filename(info or {})
+            append_download_log(
+                "SUCCESS", url, output_path, "", bytes=state["bytes"], latency_ms=_elapsed_ms(started)
+            )
+            if on_done:
+                on_done(True, output_path)
+            return output_path
+        except Exception as exc:
+            error = "Đã huỷ" if video_id in self._cancelled else str(exc)
+            append_download_log(
+                "FAIL",
+                url,
+                state["filename"] or output_path,
+                error,
+                bytes=state["bytes"],
+                latency_ms=_elapsed_ms(started),
+            )
+            if on_done:
+                on_done(False, error)
+            return ""
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
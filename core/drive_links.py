@@ -0,0 +1,185 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+from core.store import KeyValueStore
+from core.utils import parse_timestamp
+
+DONE_STATUSES = ("done", "completed", "success", "finished")
+_EXPIRY_FIELDS = ("expires_at", "expired_at", "link_expires_at", "cleanup_at")
+
+
+class DriveLinkCache:
+    """
+    Cache drive link theo video_id, lưu qua KeyValueStore để mở lại app vẫn dùng được.
+    Hạn của link lấy từ response (expires_at / cleanup_at / expires_in), không có thì
+    dùng default_ttl; link bị coi là hết hạn sớm hơn `safety_margin` giây.
+    Trạng thái "done" kèm drive_link (từ StatusRegistry) được nạp sẵn vào cache.
+    """
+
+    def __init__(self, store: KeyValueStore | None = None, default_ttl: float = 3600.0, safety_margin: float = 120.0):
+        self.store = store
+        self.default_ttl = max(0.0, float(default_ttl))
+        self.safety_margin = max(0.0, float(safety_margin))
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        if store is not None:
+            now = time.time()
+            expired = []
+            for vid, entry in store.snapshot().items():
+                if isinstance(entry, dict) and float(entry.get("expires_at") or 0) > now:
+                    self._entries[vid] = entry
+                else:
+                    expired.append(vid)
+            store.delete(expired)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], store: KeyValueStore | None = None) -> "DriveLinkCache":
+        config = config or {}
+        return cls(
+            store,
+            default_ttl=float(config.get("drive_link_ttl") or 3600),
+            safety_margin=float(config.get("drive_link_safety_margin", 120)),
+        )
+
+    def get(self, video_id: str) -> Dict[str, Any] | None:
+        """data (có drive_link) nếu còn hạn, ngược lại None."""
+        with self._lock:
+            entry = self._entries.get(video_id)
+            if entry is not None and time.time() < entry["expires_at"] - self.safety_margin:
+                self.hits += 1
+                return entry["data"]
+            self.misses += 1
+        if entry is not None:
+            self.invalidate([video_id])
+        return None
+
+    def put(self, video_id: str, data: Dict[str, Any]) -> None:
+        """Lưu/gộp data của link; các trường hạn mới (vd. cleanup_at sau schedule_cleanup) được áp lại."""
+        if not video_id or not isinstance(data, dict):
+            return
+        with self._lock:
+            previous = self._entries.get(video_id)
+            merged = dict(previous["data"]) if previous else {}
+            merged.update({k: v for k, v in data.items() if v not in (None, "")})
+            if not merged.get("drive_link") or (previous is not None and previous["data"] == merged):
+                return
+            entry = {"data": merged, "expires_at": self._expires_at(merged)}
+            self._entries[video_id] = entry
+        if self.store is not None:
+            self.store.set(video_id, entry)
+
+    def update_from_statuses(self, statuses: Dict[str, Any]) -> None:
+        for vid, info in (statuses or {}).items():
+            if isinstance(info, dict) and info.get("status") in DONE_STATUSES and info.get("drive_link"):
+                self.put(vid, info)
+
+    def invalidate(self, video_ids: Iterable[str]) -> None:
+        video_ids = list(video_ids)
+        with self._lock:
+            for vid in video_ids:
+                self._entries.pop(vid, None)
+        if self.store is not None:
+            self.store.delete(video_ids)
+
+    def _expires_at(self, data: Dict[str, Any]) -> float:
+        now = time.time()
+        candidates = [t for t in (parse_timestamp(data.get(f)) for f in _EXPIRY_FIELDS) if t]
+        try:
+            if data.get("expires_in"):
+                candidates.append(now + float(data["expires_in"]))
+        except (TypeError, ValueError):
+            pass
+        return min(candidates) if candidates else now + self.default_ttl
+
+
+class CleanupScheduler:
+    """
+    Hàng đợi schedule_cleanup chạy nền (fire-and-forget): schedule() không block,
+    các video đến hạn được gửi chung một lần send_batch(ids) -> {id: (ok, data)},
+    video lỗi được thử lại với backoff luỹ thừa tới max_attempts lần.
+    """
+
+    def __init__(
+        self,
+        send_batch: Callable[[list], Dict[str, Tuple[bool, Any]]],
+        on_scheduled: Callable[[str, Any], None] | None = None,
+        max_attempts: int = 5,
+        backoff: float = 2.0,
+        max_backoff: float = 300.0,
+    ):
+        self.send_batch = send_batch
+        self.on_scheduled = on_scheduled
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff = max(0.1, float(backoff))
+        self.max_backoff = max(self.backoff, float(max_backoff))
+        self._due: Dict[str, Tuple[float, int]] = {}
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread: threading.Thread | None = None
+        self.failed = 0
+
+    def schedule(self, video_id: str) -> None:
+        if not video_id:
+            return
+        with self._cond:
+            if video_id not in self._due:
+                self._due[video_id] = (0.0, 0)
+            self._cond.notify_all()
+        self._ensure_thread()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._due)
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def _ensure_thread(self) -> None:
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="flashstudy-cleanup", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    now = time.monotonic()
+                    ready = [vid for vid, (due, _n) in self._due.items() if due <= now]
+                    if ready:
+                        break
+                    next_due = min((due for due, _n in self._due.values()), default=None)
+                    self._cond.wait(None if next_due is None else next_due - now)
+                if self._stopped:
+                    return
+                attempts = {vid: self._due[vid][1] for vid in ready}
+            try:
+                results = self.send_batch(ready) or {}
+            except Exception as exc:
+                results = {vid: (False, str(exc)) for vid in ready}
+            with self._cond:
+                now = time.monotonic()
+                for vid in ready:
+                    ok, data = results.get(vid, (False, "no result"))
+                    if ok:
+                        self._due.pop(vid, None)
+                        if self.on_scheduled:
+                            try:
+                                self.on_scheduled(vid, data)
+                            except Exception as e:
+                                print("cleanup callback error:", e)
+                        continue
+                    n = attempts[vid] + 1
+                    if n >= self.max_attempts:
+                        self._due.pop(vid, None)
+                        self.failed += 1
+                        print(f"schedule cleanup failed for {vid}:", data)
+                    else:
+                        self._due[vid] = (now + min(self.max_backoff, self.backoff**n), n)
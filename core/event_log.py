@@ -0,0 +1,196 @@
+import atexit
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from typing import Any, Dict
+
+_FLUSH = object()
+_CLOSE = object()
+
+
+def default_log_path() -> str:
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    return os.path.join(base_dir, "app_resource", ".log")
+
+
+class EventLogger:
+    """
+    Ghi log sự kiện dạng JSON lines từ một thread nền: giữ file mở, gom ghi theo
+    dung lượng hoặc thời gian, xoay vòng + nén gzip khi file vượt max_bytes.
+    Phía gọi chỉ tốn một lần put vào queue (đầy thì bỏ bản ghi và đếm `dropped`).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_queue: int = 10000,
+        flush_bytes: int = 64 * 1024,
+        flush_interval: float = 1.0,
+        max_bytes: int = 5 * 1024 * 1024,
+        backups: int = 5,
+    ):
+        self.path = path
+        self.flush_bytes = max(1, int(flush_bytes))
+        self.flush_interval = max(0.01, float(flush_interval))
+        self.max_bytes = max(1024, int(max_bytes))
+        self.backups = max(0, int(backups))
+        self.dropped = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._file = None
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], path: str | None = None) -> "EventLogger":
+        config = config or {}
+        return cls(
+            path or default_log_path(),
+            flush_interval=float(config.get("log_flush_interval") or 1.0),
+            max_bytes=int(float(config.get("log_max_mb") or 5) * 1024 * 1024),
+            backups=int(config.get("log_backups", 5)),
+        )
+
+    def log(self, action: str, status: str, message: str = "", **fields: Any) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait((time.time(), action, status, message, fields))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float = 2.0) -> None:
+        if self._thread is None:
+            return
+        done = threading.Event()
+        try:
+            self._queue.put((_FLUSH, done), timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def close(self, timeout: float = 2.0) -> None:
+        thread = self._thread
+        if thread is None:
+            return
+        try:
+            self._queue.put((_CLOSE, None), timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="flashstudy-event-log", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        buffer: list[bytes] = []
+        size = 0
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is not None and item[0] in (_FLUSH, _CLOSE):
+                self._write(buffer)
+                buffer, size = [], 0
+                if item[0] is _CLOSE:
+                    self._close_file()
+                    return
+                item[1].set()
+                deadline = time.monotonic() + self.flush_interval
+                continue
+            if item is not None:
+                line = self._encode(item)
+                buffer.append(line)
+                size += len(line)
+            if size >= self.flush_bytes or time.monotonic() >= deadline:
+                self._write(buffer)
+                buffer, size = [], 0
+                deadline = time.monotonic() + self.flush_interval
+
+    @staticmethod
+    def _encode(item) -> bytes:
+        ts, action, status, message, fields = item
+        record = {
+            "ts": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)) + f".{int(ts * 1000) % 1000:03d}",
+            "action": action,
+            "status": status,
+        }
+        if message:
+            record["message"] = message
+        record.update(fields)
+        return (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+    def _write(self, buffer: list[bytes]) -> None:
+        if not buffer:
+            return
+        try:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._file = open(self.path, "ab")
+            self._file.write(b"".join(buffer))
+            self._file.flush()
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+        except Exception:
+            self._close_file()
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
+
+    def _rotate(self) -> None:
+        self._close_file()
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}.gz"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}.gz")
+        with open(self.path, "rb") as src, gzip.open(f"{self.path}.1.gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(self.path)
+
+
+_event_logger: EventLogger | None = None
+_logger_lock = threading.Lock()
+
+
+def get_event_logger() -> EventLogger:
+    global _event_logger
+    if _event_logger is None:
+        with _logger_lock:
+            if _event_logger is None:
+                _event_logger = EventLogger(default_log_path())
+                atexit.register(_close_default)
+    return _event_logger
+
+
+def configure_event_logger(config: Dict[str, Any]) -> EventLogger:
+    global _event_logger
+    with _logger_lock:
+        previous = _event_logger
+        _event_logger = EventLogger.from_config(config)
+        if previous is None:
+            atexit.register(_close_default)
+    if previous is not None:
+        previous.close()
+    return _event_logger
+
+
+def _close_default() -> None:
+    if _event_logger is not None:
+        _event_logger.close()
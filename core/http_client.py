@@ -0,0 +1,162 @@
+import threading
+import time
+from typing import Any, Dict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from core.metrics import get_metrics
+
+DEFAULT_TIMEOUT = 20
+
+
+def host_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class HttpClient:
+    """
+    Giữ một requests.Session (keep-alive + connection pool) cho mỗi host,
+    để các call tới api.flashstudy.vn / backend không phải bắt tay TCP/TLS lại.
+    Có `limiter` thì mọi request tới host có policy đi qua rate limiter + circuit breaker của host đó.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 4,
+        pool_maxsize: int = 16,
+        retries: int = 2,
+        backoff_factor: float = 0.3,
+        status_forcelist: tuple = (502, 503, 504),
+        timeout: float = DEFAULT_TIMEOUT,
+        limiter: "HostRateLimiter | None" = None,
+    ):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.status_forcelist = tuple(status_forcelist)
+        self.timeout = timeout
+        self.limiter = limiter
+        self._sessions: Dict[str, requests.Session] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._seen_conns: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "HttpClient":
+        from core.rate_limit import HostRateLimiter
+
+        config = config or {}
+        return cls(
+            pool_connections=int(config.get("http_pool_connections") or 4),
+            pool_maxsize=int(config.get("http_pool_maxsize") or 16),
+            retries=int(config.get("http_retries", 2)),
+            backoff_factor=float(config.get("http_backoff_factor", 0.3)),
+            timeout=float(config.get("http_timeout") or DEFAULT_TIMEOUT),
+            limiter=HostRateLimiter.from_config(config) if config.get("rate_limit_enabled", True) else None,
+        )
+
+    def _build_session(self) -> requests.Session:
+        retry = Retry(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            status=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=self.status_forcelist,
+            raise_on_status=False,
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=retry,
+            pool_block=False,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"Connection": "keep-alive"})
+        return session
+
+    def session_for(self, url: str) -> requests.Session:
+        key = host_key(url)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._build_session()
+                self._sessions[key] = session
+                self._stats[key] = {"requests": 0, "new_connections": 0, "reused_connections": 0}
+            return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        guard = self.limiter.guard_for(url) if self.limiter is not None else None
+        # circuit mở -> HostUnavailable ngay tại đây, không tốn kết nối
+        acquired = guard.acquire() if guard is not None else None
+        session = self.session_for(url)
+        kwargs.setdefault("timeout", self.timeout)
+        started = time.perf_counter()
+        resp = None
+        error = None
+        try:
+            resp = session.request(method, url, **kwargs)
+            return resp
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            if guard is not None:
+                guard.release(acquired, resp, error)
+            self._record(session, url)
+            get_metrics().record_http(url, time.perf_counter() - started, resp, error=resp is None)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def _record(self, session: requests.Session, url: str) -> None:
+        key = host_key(url)
+        created = self._created_connections(session, url)
+        with self._lock:
+            stats = self._stats.setdefault(key, {"requests": 0, "new_connections": 0, "reused_connections": 0})
+            stats["requests"] += 1
+            last_created = self._seen_conns.get(key, 0)
+            stats["new_connections"] += max(created - last_created, 0)
+            stats["reused_connections"] = max(stats["requests"] - stats["new_connections"], 0)
+            self._seen_conns[key] = max(created, last_created)
+
+    @staticmethod
+    def _created_connections(session: requests.Session, url: str) -> int:
+        parts = urlsplit(url)
+        try:
+            pools = session.get_adapter(url).poolmanager.pools
+            total = 0
+            for pool_key in pools.keys():
+                if pool_key.key_scheme == parts.scheme and pool_key.key_host == parts.hostname:
+                    pool = pools.get(pool_key)
+                    total += getattr(pool, "num_connections", 0) if pool is not None else 0
+            return total
+        except Exception:
+            return 0
+
+    def connection_stats(self) -> Dict[str, Dict[str, int]]:
+        """Số request / kết nối mới / kết nối tái sử dụng theo từng host."""
+        with self._lock:
+            return {k: dict(v) for k, v in self._stats.items()}
+
+    def close(self) -> None:
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            self._seen_conns.clear()
+        for session in sessions:
+            try:
+                session.close()
+            except Exception:
+                pass
@@ -0,0 +1,141 @@
+import codecs
+import json
+import re
+from typing import Any, Dict, Iterable, List, Tuple
+
+_SPECIAL = re.compile(r'[{}\[\]":,]')
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_SKIP = re.compile(r"[\s,]*")
+_decoder = json.JSONDecoder()
+
+_loads = None
+
+
+def loads(data: bytes | str) -> Any:
+    """json.loads, dùng orjson nếu đã cài (nhanh hơn nhiều với payload lớn)."""
+    global _loads
+    if _loads is None:
+        try:
+            import orjson
+
+            _loads = orjson.loads
+        except ImportError:
+            _loads = json.loads
+    return _loads(data)
+
+
+class ArrayStreamParser:
+    """
+    Parse JSON theo luồng byte: mỗi phần tử của mảng tại `array_path` được decode ngay khi
+    đã nhận đủ, không cần chờ cả body. Giá trị object/array tại `capture_paths`
+    (vd. ("status",)) được giữ trong `captured`. Buffer chỉ giữ phần chưa xử lý.
+
+    Phần ngoài mảng được quét token để biết đường dẫn key; phần tử mảng và giá trị capture
+    được decode nguyên khối bằng JSONDecoder.raw_decode (C scanner), chưa đủ byte thì chờ chunk sau.
+    path là tuple key tính từ gốc, phần tử mảng trung gian ghi là "*".
+    """
+
+    def __init__(self, array_path: Tuple[str, ...], capture_paths: Iterable[Tuple[str, ...]] = ()):
+        self.array_path = tuple(array_path)
+        self.capture_paths = {tuple(p) for p in capture_paths}
+        self.captured: Dict[Tuple[str, ...], Any] = {}
+        self.found_array = False
+        self.done = False
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        # mỗi frame: [kind, path, key hiện tại, đang chờ key]
+        self._stack: List[list] = []
+        self._in_array = False
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """Nạp thêm byte, trả về các phần tử mảng đã hoàn chỉnh."""
+        self._buf = self._buf[self._pos :] + self._utf8.decode(chunk)
+        self._pos = 0
+        items: List[Any] = []
+        while not self.done:
+            if self._in_array:
+                if not self._read_items(items):
+                    break
+            elif not self._scan():
+                break
+        return items
+
+    def close(self) -> None:
+        """Hết body: báo lỗi nếu mảng chưa đóng (payload bị cắt)."""
+        self._buf = self._buf[self._pos :] + self._utf8.decode(b"", final=True)
+        self._pos = 0
+        if self._in_array:
+            raise ValueError("JSON stream ended inside target array")
+
+    def _read_items(self, items: List[Any]) -> bool:
+        buf = self._buf
+        pos = _SKIP.match(buf, self._pos).end()
+        while pos < len(buf):
+            if buf[pos] == "]":
+                self._in_array = False
+                self._stack.pop()
+                self._pos = pos + 1
+                return True
+            try:
+                value, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # phần tử chưa nhận đủ
+            if end == len(buf) and buf[pos] not in '{["':
+                # số sát cuối buffer có thể còn chữ số ở chunk sau (b"[1" + b"23]") -> chờ dấu phân cách
+                break
+            items.append(value)
+            pos = _SKIP.match(buf, end).end()
+        self._pos = pos
+        return False
+
+    def _scan(self) -> bool:
+        buf = self._buf
+        m = _SPECIAL.search(buf, self._pos)
+        if m is None:
+            self._pos = len(buf)
+            return False
+        i = m.start()
+        ch = buf[i]
+        frame = self._stack[-1] if self._stack else None
+        if ch == '"':
+            s = _STRING.match(buf, i)
+            if s is None:
+                self._pos = i
+                return False
+            if frame is not None and frame[0] == "obj" and frame[3]:
+                frame[2] = json.loads(s.group())
+            self._pos = s.end()
+        elif ch == ":":
+            if frame is not None:
+                frame[3] = False
+            self._pos = i + 1
+        elif ch == ",":
+            if frame is not None and frame[0] == "obj":
+                frame[3] = True
+            self._pos = i + 1
+        elif ch in "{[":
+            if frame is None:
+                path: Tuple[str, ...] = ()
+            elif frame[0] == "obj":
+                path = frame[1] + (frame[2],)
+            else:
+                path = frame[1] + ("*",)
+            if path in self.capture_paths:
+                try:
+                    self.captured[path], self._pos = _decoder.raw_decode(buf, i)
+                except json.JSONDecodeError:
+                    self._pos = i
+                    return False
+                return True
+            self._stack.append(["obj" if ch == "{" else "arr", path, None, ch == "{"])
+            self._pos = i + 1
+            if ch == "[" and path == self.array_path:
+                self.found_array = self._in_array = True
+        else:
+            if self._stack:
+                self._stack.pop()
+            self._pos = i + 1
+            if not self._stack:
+                self.done = True
+        return True
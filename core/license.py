@@ -0,0 +1,223 @@
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+from core.utils import parse_timestamp
+
+LICENSE_VALID = "valid"
+LICENSE_GRACE = "grace"
+LICENSE_EXPIRED = "expired"
+LICENSE_MISSING = "missing"
+
+
+class LicenseCache:
+    """
+    Lưu kết quả verify license (app_resource/.license_cache.json) gắn với device_id.
+    Seal HMAC (khoá suy ra từ license_key + device_id) chỉ để phát hiện file hỏng/ghi dở: ai có
+    .conf.json trên máy đều tính lại được seal, nên nó không chống sửa tay. Chống sửa là chữ ký
+    Ed25519 của server trên "license_key|device_id|expires_at" (license_public_key, base64):
+    mặc định bắt buộc, bản ghi không có chữ ký hợp lệ thì không được tin khi offline.
+    Hạn dùng offline lấy từ expires_at đã ký, giới hạn thêm `ttl` kể từ lần verify gần nhất.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        device_id: str,
+        ttl: float = 24 * 3600,
+        grace: float = 3 * 24 * 3600,
+        refresh_margin: float = 0.2,
+        public_key: str | None = None,
+        require_signature: bool = True,
+    ):
+        self.path = path
+        self.device_id = device_id or ""
+        self.ttl = max(60.0, float(ttl))
+        self.grace = max(0.0, float(grace))
+        self.refresh_margin = min(max(float(refresh_margin), 0.0), 1.0)
+        self.public_key = public_key or None
+        self.require_signature = bool(require_signature)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, path: str, config: Dict[str, Any], device_id: str) -> "LicenseCache":
+        config = config or {}
+        return cls(
+            path,
+            device_id,
+            ttl=float(config.get("license_cache_ttl") or 24 * 3600),
+            grace=float(config.get("license_grace_period", 3 * 24 * 3600)),
+            public_key=config.get("license_public_key"),
+            require_signature=config.get("license_require_signature", True),
+        )
+
+    def load(self, license_key: str) -> Dict[str, Any] | None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print("Load license cache error:", e)
+            return None
+        if not isinstance(record, dict):
+            return None
+        if record.get("device_id") != self.device_id or record.get("key_id") != _key_id(license_key):
+            return None
+        seal = record.pop("seal", "")
+        if not hmac.compare_digest(seal, self._seal(license_key, record)):
+            return None
+        if (self.require_signature or self.public_key) and not self._verify_signature(license_key, record):
+            return None
+        return record
+
+    def expires_at(self, record: Dict[str, Any]) -> float:
+        """Hạn tin cache: expires_at server đã ký, nhưng không quá verified_at + ttl."""
+        verified_at = float(record.get("verified_at") or 0)
+        signed = parse_timestamp((record.get("data") or {}).get("expires_at"))
+        local = verified_at + self.ttl
+        return min(signed, local) if signed is not None else local
+
+    def status(self, record: Dict[str, Any] | None, now: float | None = None) -> str:
+        if not record:
+            return LICENSE_MISSING
+        now = time.time() if now is None else now
+        expires_at = self.expires_at(record)
+        if now < expires_at:
+            return LICENSE_VALID
+        if now < expires_at + self.grace:
+            return LICENSE_GRACE
+        return LICENSE_EXPIRED
+
+    def needs_refresh(self, record: Dict[str, Any] | None, now: float | None = None) -> bool:
+        if not record:
+            return True
+        now = time.time() if now is None else now
+        verified_at = float(record.get("verified_at") or 0)
+        expires_at = self.expires_at(record)
+        return now >= expires_at - (expires_at - verified_at) * self.refresh_margin
+
+    def store(self, license_key: str, data: Dict[str, Any], now: float | None = None) -> Dict[str, Any]:
+        now = time.time() if now is None else now
+        data = data if isinstance(data, dict) else {}
+        record = {
+            "key_id": _key_id(license_key),
+            "device_id": self.device_id,
+            "verified_at": now,
+            "signature": data.get("signature") or "",
+            "data": data,
+        }
+        payload = dict(record, seal=self._seal(license_key, record))
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(payload, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                print("Save license cache error:", e)
+        return record
+
+    def clear(self) -> None:
+        with self._lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print("Clear license cache error:", e)
+
+    def _seal(self, license_key: str, record: Dict[str, Any]) -> str:
+        key = hashlib.sha256(f"{license_key}\0{self.device_id}".encode("utf-8")).digest()
+        body = json.dumps(record, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return hmac.new(key, body, hashlib.sha256).hexdigest()
+
+    def _verify_signature(self, license_key: str, record: Dict[str, Any]) -> bool:
+        signature = record.get("signature")
+        if not signature or not self.public_key:
+            return False
+        try:
+            import base64
+
+            from cryptography.exceptions import InvalidSignature
+            from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+        except ImportError:
+            # không kiểm được chữ ký -> không tin cache, verify online
+            return False
+        raw_exp = (record.get("data") or {}).get("expires_at")
+        message = f"{license_key}|{self.device_id}|{raw_exp}".encode("utf-8")
+        try:
+            key = Ed25519PublicKey.from_public_bytes(base64.b64decode(self.public_key))
+            key.verify(base64.b64decode(signature), message)
+            return True
+        except (InvalidSignature, ValueError):
+            return False
+
+
+class LicenseChecker:
+    """
+    Kiểm tra license khi mở app: cache còn hạn -> dùng ngay (không gọi mạng) và refresh nền
+    khi đã vào cửa sổ refresh; hết hạn nhưng backend không liên lạc được -> cho dùng trong
+    thời gian grace. Backend từ chối (khi refresh) -> xoá cache và gọi on_revoked.
+    """
+
+    def __init__(
+        self,
+        cache: LicenseCache,
+        verify: Callable[..., Tuple[bool, Any]],
+        on_revoked: Callable[[str], None] | None = None,
+    ):
+        self.cache = cache
+        self.verify = verify
+        self.on_revoked = on_revoked
+        self._refreshing = threading.Lock()
+
+    def check(self, config: Dict[str, Any], device_info: Dict[str, Any]) -> Tuple[bool, Any]:
+        license_key = (config.get("license_key") or "").strip()
+        record = self.cache.load(license_key)
+        state = self.cache.status(record)
+        if state == LICENSE_VALID:
+            if self.cache.needs_refresh(record):
+                self.refresh_async(config, device_info)
+            return True, record.get("data") or {}
+        try:
+            return self.verify_online(config, device_info)
+        except Exception as exc:
+            if state == LICENSE_GRACE:
+                print("License backend unreachable, using grace period:", exc)
+                return True, record.get("data") or {}
+            return False, f"Không kết nối được máy chủ license: {exc}"
+
+    def verify_online(self, config: Dict[str, Any], device_info: Dict[str, Any]) -> Tuple[bool, Any]:
+        """Gọi backend; lỗi mạng được raise để check() áp dụng grace."""
+        license_key = (config.get("license_key") or "").strip()
+        ok, data_or_err = self.verify(config, device_info, raise_on_unreachable=True)
+        if ok:
+            self.cache.store(license_key, data_or_err)
+        else:
+            self.cache.clear()
+        return ok, data_or_err
+
+    def refresh_async(self, config: Dict[str, Any], device_info: Dict[str, Any]) -> None:
+        if not self._refreshing.acquire(blocking=False):
+            return
+
+        def _run():
+            try:
+                ok, data_or_err = self.verify_online(dict(config), device_info)
+                if not ok and self.on_revoked:
+                    self.on_revoked(str(data_or_err or "License không hợp lệ"))
+            except Exception as exc:
+                print("License refresh error:", exc)
+            finally:
+                self._refreshing.release()
+
+        threading.Thread(target=_run, name="flashstudy-license-refresh", daemon=True).start()
+
+
+def _key_id(license_key: str) -> str:
+    return hashlib.sha256((license_key or "").strip().encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,196 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, List
+
+from core.store import open_store
+
+
+class MediaLibrary:
+    """
+    Kho media cục bộ đánh địa chỉ theo video_id (sha256 của URL đã chuẩn hoá).
+    Mỗi video chỉ có một bản trong `objects/`; file người dùng thấy trong thư mục tải là
+    hard link tới bản đó (khác ổ đĩa thì copy). Manifest (SQLite) ghi size, sha256, URL nguồn,
+    các lesson/course dùng video và các đường dẫn đã link ra.
+
+    GC theo quota: bản không còn file người dùng nào trỏ tới (st_nlink == 1) bị xoá trước,
+    sau đó tới bản ít dùng gần đây nhất.
+    """
+
+    def __init__(self, root_dir: str, max_bytes: int = 50 * 1024 * 1024 * 1024):
+        self.root_dir = root_dir
+        self.max_bytes = max(0, int(max_bytes))
+        self._objects = os.path.join(root_dir, "objects")
+        os.makedirs(self._objects, exist_ok=True)
+        self._manifest = open_store(os.path.join(root_dir, "manifest.db"), backend="sqlite", debounce=1.0)
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], download_dir: str) -> "MediaLibrary":
+        config = config or {}
+        # mặc định nằm trong thư mục tải để hard link cùng ổ đĩa
+        root_dir = config.get("media_library_dir") or os.path.join(download_dir, ".library")
+        max_gb = float(config.get("media_library_max_gb") or 50)
+        return cls(root_dir, max_bytes=int(max_gb * 1024 * 1024 * 1024))
+
+    # ----- tra cứu -----
+
+    def lookup(self, video_id: str) -> Dict[str, Any] | None:
+        """Bản ghi manifest nếu file còn nguyên trên đĩa; bản ghi hỏng/mất file bị gỡ."""
+        if not video_id:
+            return None
+        with self._lock:
+            entry = self._manifest.get(video_id)
+            if not entry:
+                return None
+            path = os.path.join(self.root_dir, entry["path"])
+            try:
+                if os.path.getsize(path) == entry.get("size"):
+                    return dict(entry, abs_path=path)
+            except OSError:
+                pass
+            self._manifest.delete([video_id])
+            return None
+
+    def materialize(self, video_id: str, dest_path: str, lesson_id: Any = None, course_id: Any = None) -> str | None:
+        """Đặt video đã có vào dest_path (hard link, không tải lại). None nếu chưa có trong kho."""
+        with self._lock:
+            entry = self.lookup(video_id)
+            if entry is None:
+                return None
+            if not _same_file(entry["abs_path"], dest_path):
+                os.makedirs(os.path.dirname(os.path.abspath(dest_path)) or ".", exist_ok=True)
+                _link_or_copy(entry["abs_path"], dest_path)
+            self._touch(video_id, entry, dest_path, lesson_id, course_id)
+            return dest_path
+
+    # ----- ghi -----
+
+    def add(
+        self,
+        video_id: str,
+        file_path: str,
+        source_url: str = "",
+        lesson_id: Any = None,
+        course_id: Any = None,
+        sha256: str | None = None,
+    ) -> Dict[str, Any] | None:
+        """Nhập file vừa tải vào kho (link file vào objects/, không di chuyển file người dùng)."""
+        if not video_id or not file_path or not os.path.isfile(file_path):
+            return None
+        with self._lock:
+            existing = self.lookup(video_id)
+            if existing is not None:
+                if not _same_file(existing["abs_path"], file_path):
+                    # đã có bản khác nội dung giống hệt -> thay file mới tải bằng hard link để tiết kiệm đĩa
+                    _replace_with_link(existing["abs_path"], file_path)
+                self._touch(video_id, existing, file_path, lesson_id, course_id)
+                return existing
+            ext = os.path.splitext(file_path)[1].lower() or ".bin"
+            rel_path = os.path.join("objects", video_id[:2], video_id + ext)
+            blob = os.path.join(self.root_dir, rel_path)
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            if not os.path.exists(blob):
+                _link_or_copy(file_path, blob)
+            now = time.time()
+            entry = {
+                "path": rel_path,
+                "size": os.path.getsize(blob),
+                "sha256": sha256 or _file_sha256(blob),
+                "source_url": source_url,
+                "lessons": [],
+                "courses": [],
+                "links": [],
+                "added_at": now,
+                "last_used": now,
+            }
+            self._touch(video_id, entry, file_path, lesson_id, course_id)
+        self.gc()
+        return entry
+
+    def gc(self) -> int:
+        """Xoá bớt object cho tới khi tổng dung lượng <= max_bytes. Trả về số byte đã xoá khỏi kho."""
+        with self._lock:
+            entries = []
+            total = 0
+            for video_id, entry in self._manifest.snapshot().items():
+                path = os.path.join(self.root_dir, entry.get("path", ""))
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    self._manifest.delete([video_id])
+                    continue
+                total += st.st_size
+                # orphan (không còn link ngoài kho) xếp trước, rồi theo last_used
+                entries.append((st.st_nlink > 1, entry.get("last_used") or 0, video_id, path, st.st_size))
+            removed = 0
+            for _linked, _used, video_id, path, size in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print("media library gc error:", e)
+                    continue
+                self._manifest.delete([video_id])
+                total -= size
+                removed += size
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._manifest.snapshot()
+        return {"videos": len(entries), "bytes": sum(int(e.get("size") or 0) for e in entries.values())}
+
+    def close(self) -> None:
+        self._manifest.close()
+
+    def _touch(self, video_id: str, entry: Dict[str, Any], path: str, lesson_id: Any, course_id: Any) -> None:
+        entry = {k: v for k, v in entry.items() if k != "abs_path"}
+        entry["last_used"] = time.time()
+        entry["links"] = _append_unique(entry.get("links"), os.path.abspath(path))
+        entry["lessons"] = _append_unique(entry.get("lessons"), lesson_id)
+        entry["courses"] = _append_unique(entry.get("courses"), course_id)
+        self._manifest.set(video_id, entry)
+
+
+def _append_unique(values: List[Any] | None, value: Any) -> List[Any]:
+    values = list(values or [])
+    if value not in (None, "") and value not in values:
+        values.append(value)
+    return values
+
+
+def _same_file(a: str, b: str) -> bool:
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    tmp_path = f"{dst}.{os.getpid()}.link"
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        # khác ổ đĩa / filesystem không hỗ trợ hard link
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+def _replace_with_link(src: str, dst: str) -> None:
+    tmp_path = f"{dst}.{os.getpid()}.link"
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        return
+    os.replace(tmp_path, dst)
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,263 @@
+import functools
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict
+from urllib.parse import urlsplit
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class EndpointStats:
+    """Histogram (bucket kiểu Prometheus + mẫu gần nhất để tính p50/p95/p99) cho một endpoint."""
+
+    def __init__(self, sample_size: int = 1024):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.samples: deque = deque(maxlen=sample_size)
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.retries = 0
+
+    def observe(self, seconds: float, ok: bool, bytes_in: int, bytes_out: int, retries: int) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.samples.append(seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        if not ok:
+            self.errors += 1
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+        self.retries += retries
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "error_rate": self.errors / self.count if self.count else 0.0,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "retries": self.retries,
+        }
+
+
+class _CallContext:
+    __slots__ = ("bytes_in", "bytes_out", "retries", "http_error")
+
+    def __init__(self):
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.retries = 0
+        self.http_error = False
+
+
+class MetricsRegistry:
+    """
+    Đo thời gian, tỉ lệ lỗi, số byte và số lần retry theo endpoint.
+    Các hàm API bọc bằng `instrument`; HttpClient cộng byte/retry vào call đang chạy
+    (request không thuộc endpoint nào được tính theo host).
+    """
+
+    def __init__(self):
+        self._stats: Dict[str, EndpointStats] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._server = None
+
+    def observe(
+        self, endpoint: str, seconds: float, ok: bool = True, bytes_in: int = 0, bytes_out: int = 0, retries: int = 0
+    ) -> None:
+        with self._lock:
+            stats = self._stats.get(endpoint)
+            if stats is None:
+                stats = self._stats[endpoint] = EndpointStats()
+            stats.observe(seconds, ok, bytes_in, bytes_out, retries)
+
+    def record_http(self, url: str, seconds: float, resp=None, error: bool = False) -> None:
+        """Gọi từ HttpClient sau mỗi request."""
+        bytes_in, bytes_out, retries = _response_sizes(resp)
+        ctx = getattr(self._local, "ctx", None)
+        if ctx is not None:
+            ctx.bytes_in += bytes_in
+            ctx.bytes_out += bytes_out
+            ctx.retries += retries
+            ctx.http_error = ctx.http_error or error or (resp is not None and resp.status_code >= 500)
+            return
+        ok = not error and (resp is None or resp.status_code < 400)
+        self.observe(f"http {urlsplit(url).netloc}", seconds, ok, bytes_in, bytes_out, retries)
+
+    def instrument(self, endpoint: str, ok: Callable[[Any], bool] | None = None):
+        """Decorator: đo toàn bộ call; `ok(result)` quyết định call có tính là lỗi hay không."""
+        is_ok = ok or _backend_ok
+
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                outer = getattr(self._local, "ctx", None)
+                ctx = self._local.ctx = _CallContext()
+                started = time.perf_counter()
+                result = None
+                failed = True
+                try:
+                    result = fn(*args, **kwargs)
+                    failed = ctx.http_error or not is_ok(result)
+                    return result
+                finally:
+                    self._local.ctx = outer
+                    self.observe(
+                        endpoint,
+                        time.perf_counter() - started,
+                        not failed,
+                        ctx.bytes_in,
+                        ctx.bytes_out,
+                        ctx.retries,
+                    )
+
+            return wrapper
+
+        return decorator
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: stats.snapshot() for name, stats in sorted(self._stats.items())}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def render_prometheus(self) -> str:
+        lines = [
+            "# HELP flashstudy_request_duration_seconds Thời gian call API theo endpoint.",
+            "# TYPE flashstudy_request_duration_seconds histogram",
+        ]
+        counters = {"errors": [], "bytes": [], "retries": []}
+        with self._lock:
+            items = sorted(self._stats.items())
+            for name, stats in items:
+                label = _label(name)
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS, stats.buckets):
+                    cumulative += n
+                    lines.append(f'flashstudy_request_duration_seconds_bucket{{endpoint="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'flashstudy_request_duration_seconds_bucket{{endpoint="{label}",le="+Inf"}} {stats.count}')
+                lines.append(f'flashstudy_request_duration_seconds_sum{{endpoint="{label}"}} {stats.total_seconds:.6f}')
+                lines.append(f'flashstudy_request_duration_seconds_count{{endpoint="{label}"}} {stats.count}')
+                counters["errors"].append(f'flashstudy_request_errors_total{{endpoint="{label}"}} {stats.errors}')
+                counters["bytes"].append(f'flashstudy_request_bytes_total{{endpoint="{label}",direction="in"}} {stats.bytes_in}')
+                counters["bytes"].append(f'flashstudy_request_bytes_total{{endpoint="{label}",direction="out"}} {stats.bytes_out}')
+                counters["retries"].append(f'flashstudy_request_retries_total{{endpoint="{label}"}} {stats.retries}')
+        lines += ["# HELP flashstudy_request_errors_total Số call lỗi.", "# TYPE flashstudy_request_errors_total counter"]
+        lines += counters["errors"]
+        lines += ["# HELP flashstudy_request_bytes_total Số byte gửi/nhận.", "# TYPE flashstudy_request_bytes_total counter"]
+        lines += counters["bytes"]
+        lines += ["# HELP flashstudy_request_retries_total Số lần retry ở tầng HTTP.", "# TYPE flashstudy_request_retries_total counter"]
+        lines += counters["retries"]
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """Ghi file .prom (ghi tmp rồi replace để node_exporter không đọc file dở)."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> int:
+        """Mở endpoint GET /metrics trên thread nền; trả về port thực tế."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        if self._server is not None:
+            return self._server.server_address[1]
+        registry = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, int(port)), _Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="flashstudy-metrics", daemon=True).start()
+        return self._server.server_address[1]
+
+    def stop_server(self) -> None:
+        server, self._server = self._server, None
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+def _backend_ok(result: Any) -> bool:
+    # backend helper trả (ok, data); FlashStudyAPI trả (code, data) với code == 0 là thành công
+    if isinstance(result, tuple) and result:
+        head = result[0]
+        if isinstance(head, bool):
+            return head
+        return head == 0
+    return result is not None
+
+
+def _response_sizes(resp) -> tuple:
+    if resp is None:
+        return 0, 0, 0
+    bytes_in = 0
+    try:
+        if resp._content_consumed:
+            bytes_in = len(resp.content or b"")
+        else:
+            length = resp.headers.get("Content-Length")
+            bytes_in = int(length) if length and length.isdigit() else 0
+    except Exception:
+        pass
+    try:
+        body = resp.request.body if resp.request is not None else None
+        bytes_out = len(body or b"")
+    except Exception:
+        bytes_out = 0
+    retries = 0
+    try:
+        history = getattr(getattr(resp.raw, "retries", None), "history", None)
+        retries = len(history or ())
+    except Exception:
+        pass
+    return bytes_in, bytes_out, retries
+
+
+def _label(name: str) -> str:
+    return name.replace("\\", "\\\\").replace('"', '\\"')
+
+
+_metrics = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    return _metrics
+
+
+def instrument(endpoint: str, ok: Callable[[Any], bool] | None = None):
+    return _metrics.instrument(endpoint, ok=ok)
@@ -0,0 +1,346 @@
+from enum import IntEnum
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+
+class LessonType(IntEnum):
+    VIDEO = 1  # bài video kèm đề bài/đáp án
+    DOCUMENT = 3  # bài chỉ có tài liệu, app không mở
+    EXAM = 5  # đề thi thử (pdf)
+
+
+OPENABLE_TYPES = (LessonType.VIDEO, LessonType.EXAM)
+
+
+def lesson_type(value: Any) -> LessonType | int | None:
+    """Type từ API -> LessonType; type lạ giữ nguyên số để không mất dữ liệu."""
+    if value is None or value == "":
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    try:
+        return LessonType(value)
+    except ValueError:
+        return value
+
+
+def normalize_video_url(url: str) -> str:
+    if not url:
+        return ""
+    return url.replace("/Data/", "/DataNew/", 1)
+
+
+def video_id_for(url: str) -> str:
+    """video_id = sha256 của URL đã chuẩn hoá (16 ký tự đầu)."""
+    import hashlib
+
+    if not url:
+        return ""
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+
+
+class _Model:
+    """
+    Bản ghi gọn dùng __slots__, coi như bất biến sau khi parse: cache, UI và downloader dùng chung
+    một object thay vì mỗi nơi dựng lại dict riêng. `_fields` là các slot so sánh/serialize.
+    """
+
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self._fields)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        args = ", ".join(f"{f}={getattr(self, f)!r}" for f in self._fields)
+        return f"{type(self).__name__}({args})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {f: _plain(getattr(self, f)) for f in self._fields}
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, _Model):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    if isinstance(value, IntEnum):
+        return int(value)
+    return value
+
+
+class Course(_Model):
+    __slots__ = ("course_id", "course_name", "teacher_name", "expired_time")
+    _fields = __slots__
+
+    def __init__(self, course_id: Any, course_name: str = "", teacher_name: str = "", expired_time: str = ""):
+        self.course_id = course_id
+        self.course_name = course_name
+        self.teacher_name = teacher_name
+        self.expired_time = expired_time
+
+    @classmethod
+    def from_api(cls, raw: Dict[str, Any]) -> "Course":
+        teachers = raw.get("teachers") or []
+        teacher_name = ""
+        if teachers and isinstance(teachers, list):
+            teacher_name = teachers[0].get("name") or ""
+        return cls(raw.get("id"), raw.get("name") or "", teacher_name, raw.get("expired_time") or "")
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Course":
+        return cls(d.get("course_id"), d.get("course_name") or "", d.get("teacher_name") or "", d.get("expired_time") or "")
+
+    @classmethod
+    def list_from_dicts(cls, items: Iterable[Dict[str, Any]] | None) -> List["Course"]:
+        return [cls.from_dict(d) for d in items or [] if isinstance(d, dict)]
+
+
+class LessonChild(_Model):
+    """Bài học trong một chương (hàng có nút mở trong cây khoá học)."""
+
+    __slots__ = ("lesson_id", "lesson_name", "type")
+    _fields = __slots__
+
+    def __init__(self, lesson_id: Any, lesson_name: str = "", type: LessonType | int | None = None):
+        self.lesson_id = lesson_id
+        self.lesson_name = lesson_name
+        self.type = type
+
+    @property
+    def openable(self) -> bool:
+        return self.type in OPENABLE_TYPES
+
+    @classmethod
+    def from_api(cls, raw: Dict[str, Any]) -> "LessonChild":
+        return cls(raw.get("id"), (raw.get("name") or "").strip(), lesson_type(raw.get("type")))
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "LessonChild":
+        return cls(d.get("lesson_id"), (d.get("lesson_name") or "").strip(), lesson_type(d.get("type")))
+
+
+class Lesson(_Model):
+    """Chương (lesson cấp 1) của khoá học và các bài con."""
+
+    __slots__ = ("lesson_id", "lesson_name", "type", "children")
+    _fields = __slots__
+
+    def __init__(
+        self,
+        lesson_id: Any,
+        lesson_name: str = "",
+        type: LessonType | int | None = None,
+        children: List[LessonChild] | None = None,
+    ):
+        self.lesson_id = lesson_id
+        self.lesson_name = lesson_name
+        self.type = type
+        self.children = children or []
+
+    @classmethod
+    def from_api(cls, raw: Dict[str, Any]) -> "Lesson":
+        # chỉ giữ các trường app dùng, object gốc bỏ ngay sau khi parse
+        children = raw.get("children") or []
+        return cls(
+            raw.get("id"),
+            (raw.get("name") or "").strip(),
+            lesson_type(raw.get("type")),
+            [LessonChild.from_api(c) for c in children if isinstance(c, dict)] if isinstance(children, list) else [],
+        )
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Lesson":
+        return cls(
+            d.get("lesson_id"),
+            (d.get("lesson_name") or "").strip(),
+            lesson_type(d.get("type")),
+            [LessonChild.from_dict(c) for c in d.get("children") or [] if isinstance(c, dict)],
+        )
+
+
+class CourseDetail(_Model):
+    """Cây bài học của một khoá, tra cứu lesson_id -> chương/bài con (index dựng khi cần)."""
+
+    __slots__ = ("lessons", "_index")
+    _fields = ("lessons",)
+
+    def __init__(self, lessons: List[Lesson] | None = None):
+        self.lessons = lessons or []
+        self._index: Dict[Any, Lesson | LessonChild] | None = None
+
+    def __iter__(self) -> Iterator[Lesson]:
+        return iter(self.lessons)
+
+    def __len__(self) -> int:
+        return len(self.lessons)
+
+    def find(self, lesson_id: Any) -> Lesson | LessonChild | None:
+        if self._index is None:
+            index: Dict[Any, Lesson | LessonChild] = {}
+            for lesson in self.lessons:
+                index.setdefault(lesson.lesson_id, lesson)
+                for child in lesson.children:
+                    index.setdefault(child.lesson_id, child)
+            self._index = index
+        return self._index.get(lesson_id)
+
+    def iter_children(self, types: Iterable[Any] | None = None) -> Iterator[Tuple[int, LessonChild]]:
+        """(thứ tự chương, bài con), lọc theo type nếu có."""
+        types = tuple(types) if types is not None else None
+        for chapter_idx, lesson in enumerate(self.lessons):
+            for child in lesson.children:
+                if types is None or child.type in types:
+                    yield chapter_idx, child
+
+    def to_dict(self) -> List[Dict[str, Any]]:  # type: ignore[override]
+        # cache lưu thẳng danh sách chương như response cũ
+        return [lesson.to_dict() for lesson in self.lessons]
+
+    @classmethod
+    def from_api(cls, lessons: Iterable[Dict[str, Any]] | None) -> "CourseDetail":
+        return cls([Lesson.from_api(raw) for raw in lessons or [] if isinstance(raw, dict)])
+
+    @classmethod
+    def from_dicts(cls, lessons: Iterable[Dict[str, Any]] | None) -> "CourseDetail":
+        return cls([Lesson.from_dict(d) for d in lessons or [] if isinstance(d, dict)])
+
+    @classmethod
+    def coerce(cls, data: Any) -> "CourseDetail":
+        """CourseDetail / list chương (model hoặc dict) / {'lessons': [...]} -> CourseDetail."""
+        if isinstance(data, CourseDetail):
+            return data
+        if isinstance(data, dict):
+            inner = data.get("data")
+            data = data.get("lessons", inner.get("lessons") if isinstance(inner, dict) else inner)
+        if not isinstance(data, list):
+            return cls()
+        if all(isinstance(lesson, Lesson) for lesson in data):
+            return cls(data)
+        return cls.from_dicts(data)
+
+
+class VideoAsset(_Model):
+    """Video của bài học: URL đã chuẩn hoá và video_id tính một lần lúc parse."""
+
+    __slots__ = ("index", "source_url", "url", "video_id")
+    _fields = __slots__
+
+    def __init__(self, index: int, source_url: str):
+        self.index = index
+        self.source_url = source_url
+        self.url = normalize_video_url(source_url)
+        self.video_id = video_id_for(self.url)
+
+
+class DocumentAsset(_Model):
+    """Tài liệu của bài học; kind là "document" (đề bài), "document_answer" (đáp án) hoặc "pdf" (đề thi)."""
+
+    __slots__ = ("kind", "url")
+    _fields = __slots__
+
+    def __init__(self, kind: str, url: str):
+        self.kind = kind
+        self.url = url
+
+
+_DOCUMENT_KINDS = ("document", "document_answer", "pdf")
+
+
+class LessonDetail(_Model):
+    """Chi tiết một bài: video (tra theo video_id) và tài liệu."""
+
+    __slots__ = ("lesson_id", "lesson_name", "type", "videos", "documents", "_videos_by_id")
+    _fields = ("lesson_id", "lesson_name", "type", "videos", "documents")
+
+    def __init__(
+        self,
+        lesson_id: Any,
+        lesson_name: str = "",
+        type: LessonType | int | None = None,
+        videos: List[VideoAsset] | None = None,
+        documents: List[DocumentAsset] | None = None,
+    ):
+        self.lesson_id = lesson_id
+        self.lesson_name = lesson_name
+        self.type = type
+        self.videos = videos or []
+        self.documents = documents or []
+        self._videos_by_id: Dict[str, VideoAsset] | None = None
+
+    @property
+    def video_ids(self) -> List[str]:
+        return [v.video_id for v in self.videos if v.video_id]
+
+    def video(self, video_id: str) -> VideoAsset | None:
+        if self._videos_by_id is None:
+            self._videos_by_id = {v.video_id: v for v in reversed(self.videos) if v.video_id}
+        return self._videos_by_id.get(video_id)
+
+    def document(self, kind: str) -> DocumentAsset | None:
+        for doc in self.documents:
+            if doc.kind == kind:
+                return doc
+        return None
+
+    @property
+    def document_url(self) -> str:
+        doc = self.document("document")
+        return doc.url if doc else ""
+
+    @property
+    def document_answer_url(self) -> str:
+        doc = self.document("document_answer")
+        return doc.url if doc else ""
+
+    @property
+    def pdf_url(self) -> str:
+        doc = self.document("pdf")
+        return doc.url if doc else ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        # cùng dạng với response đã rút gọn trước đây -> cache cũ vẫn đọc được
+        result = {
+            "lesson_id": self.lesson_id,
+            "lesson_name": self.lesson_name,
+            "type": _plain(self.type),
+            "video_url": [v.source_url for v in self.videos],
+        }
+        for doc in self.documents:
+            result[f"{doc.kind}_url"] = doc.url
+        return result
+
+    @classmethod
+    def from_api(cls, raw: Dict[str, Any]) -> "LessonDetail":
+        kind = lesson_type(raw.get("type"))
+        if kind == LessonType.EXAM:
+            # đề thi chỉ có pdf
+            return cls(raw.get("id"), raw.get("name") or "", kind, documents=_documents(raw, ("pdf",)))
+        urls = [v.get("url") for v in raw.get("video_url") or [] if isinstance(v, dict) and v.get("type") == "vn" and v.get("url")]
+        return cls(
+            raw.get("id"),
+            raw.get("name") or "",
+            kind,
+            [VideoAsset(idx, url) for idx, url in enumerate(urls, start=1)],
+            _documents(raw, ("document", "document_answer")),
+        )
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "LessonDetail":
+        urls = [url for url in d.get("video_url") or [] if url]
+        return cls(
+            d.get("lesson_id"),
+            d.get("lesson_name") or "",
+            lesson_type(d.get("type")),
+            [VideoAsset(idx, url) for idx, url in enumerate(urls, start=1)],
+            _documents(d, _DOCUMENT_KINDS),
+        )
+
+
+def _documents(raw: Dict[str, Any], kinds: Iterable[str]) -> List[DocumentAsset]:
+    return [DocumentAsset(kind, raw[f"{kind}_url"]) for kind in kinds if raw.get(f"{kind}_url")]
@@ -0,0 +1,141 @@
+import heapq
+import itertools
+import threading
+from concurrent.futures import CancelledError, Future
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+PRIORITY_CLICKED = 0
+PRIORITY_VISIBLE = 1
+PRIORITY_BACKGROUND = 2
+
+
+class LessonPrefetcher:
+    """
+    Tải trước chi tiết các bài học của một khoá song song (giới hạn số luồng).
+    Thứ tự: bài được click > bài đang hiển thị trên màn hình > các bài còn lại.
+    """
+
+    def __init__(self, fetch: Callable[[Any], Tuple[int, Any]], max_workers: int = 6):
+        self._fetch = fetch
+        self.max_workers = max(1, int(max_workers))
+        self._heap: list = []
+        self._seq = itertools.count()
+        self._order: Dict[Any, int] = {}
+        self._best: Dict[Any, tuple] = {}
+        self._results: Dict[Any, Tuple[int, Any]] = {}
+        self._inflight: Dict[Any, Future] = {}
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._threads: list[threading.Thread] = []
+
+    def start(self, lesson_ids: Iterable[Any]) -> None:
+        with self._cond:
+            for lesson_id in lesson_ids:
+                if lesson_id is None or lesson_id in self._order:
+                    continue
+                self._order[lesson_id] = len(self._order)
+                self._push(lesson_id, PRIORITY_BACKGROUND)
+            self._cond.notify_all()
+        while len(self._threads) < self.max_workers:
+            t = threading.Thread(target=self._worker, name=f"flashstudy-prefetch-{len(self._threads)}", daemon=True)
+            self._threads.append(t)
+            t.start()
+
+    def prioritize(self, lesson_ids: Iterable[Any], priority: int = PRIORITY_VISIBLE) -> None:
+        with self._cond:
+            for lesson_id in lesson_ids:
+                if lesson_id is None or lesson_id in self._results or lesson_id in self._inflight:
+                    continue
+                self._order.setdefault(lesson_id, len(self._order))
+                self._push(lesson_id, priority)
+            self._cond.notify_all()
+
+    def get(self, lesson_id: Any) -> Tuple[int, Any] | None:
+        with self._cond:
+            return self._results.get(lesson_id)
+
+    def fetch(self, lesson_id: Any, timeout: float | None = None) -> Tuple[int, Any]:
+        """Trả kết quả đã tải trước; nếu chưa có thì ưu tiên cao nhất và chờ."""
+        with self._cond:
+            cached = self._results.get(lesson_id)
+            if cached is not None:
+                return cached
+            future = None
+            if not self._stopped:
+                future = self._inflight.get(lesson_id)
+                if future is None:
+                    future = Future()
+                    self._inflight[lesson_id] = future
+                if not future.running():
+                    self._order.setdefault(lesson_id, len(self._order))
+                    self._push(lesson_id, PRIORITY_CLICKED)
+                    self._cond.notify_all()
+        if future is None:
+            return self._run(lesson_id)
+        try:
+            return future.result(timeout=timeout)
+        except CancelledError:
+            return self._run(lesson_id)
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._heap.clear()
+            pending = [f for f in self._inflight.values() if not f.running() and not f.done()]
+            self._cond.notify_all()
+        for future in pending:
+            future.cancel()
+
+    @property
+    def progress(self) -> Tuple[int, int]:
+        with self._cond:
+            return len(self._results), len(self._order)
+
+    def _push(self, lesson_id: Any, priority: int) -> None:
+        key = (priority, self._order[lesson_id])
+        best = self._best.get(lesson_id)
+        if best is not None and best <= key:
+            return
+        self._best[lesson_id] = key
+        heapq.heappush(self._heap, (key, next(self._seq), lesson_id))
+
+    def _next(self) -> Tuple[Any, Future] | None:
+        with self._cond:
+            while True:
+                if self._stopped:
+                    return None
+                while self._heap:
+                    key, _seq, lesson_id = heapq.heappop(self._heap)
+                    if self._best.get(lesson_id) != key or lesson_id in self._results:
+                        continue
+                    self._best.pop(lesson_id, None)
+                    future = self._inflight.get(lesson_id)
+                    if future is None:
+                        future = Future()
+                        self._inflight[lesson_id] = future
+                    elif future.running():
+                        continue
+                    if not future.set_running_or_notify_cancel():
+                        self._inflight.pop(lesson_id, None)
+                        continue
+                    return lesson_id, future
+                self._cond.wait()
+
+    def _run(self, lesson_id: Any) -> Tuple[int, Any]:
+        try:
+            return self._fetch(lesson_id)
+        except Exception as e:
+            return -1, {"message": str(e)}
+
+    def _worker(self) -> None:
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            lesson_id, future = item
+            result = self._run(lesson_id)
+            with self._cond:
+                self._inflight.pop(lesson_id, None)
+                if result and result[0] == 0:
+                    self._results[lesson_id] = result
+            future.set_result(result)
@@ -0,0 +1,316 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List
+
+import requests
+
+from core.http_client import host_key
+
+FLASHSTUDY_HOST = "https://api.flashstudy.vn"
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# mặc định theo loại host; ghi đè bằng config "rate_limits": {"https://host": {...}}
+FLASHSTUDY_POLICY = {"rate": 10.0, "burst": 20, "concurrency": 6, "max_concurrency": 16}
+BACKEND_POLICY = {"rate": 5.0, "burst": 10, "concurrency": 4, "max_concurrency": 8}
+_POLICY_KEYS = (
+    "rate",
+    "burst",
+    "concurrency",
+    "min_concurrency",
+    "max_concurrency",
+    "latency_target",
+    "failure_threshold",
+    "reset_timeout",
+    "max_wait",
+)
+
+
+class HostUnavailable(requests.ConnectionError):
+    """Circuit của host đang mở (hoặc host bắt chờ quá lâu): request bị chặn ngay, không gửi đi."""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"{host} tạm thời không khả dụng, thử lại sau {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class TokenBucket:
+    """Token bucket kiểu đặt chỗ: reserve() trả về số giây phải chờ trước khi gửi (0 nếu còn token)."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = max(0.01, float(rate))
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+
+    def reserve(self) -> float:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+        self._tokens -= 1
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class CircuitBreaker:
+    """
+    closed -> open sau `failure_threshold` lỗi liên tiếp; open -> half_open sau `reset_timeout` giây,
+    lúc đó chỉ một request thăm dò được đi, thành công thì closed, lỗi thì open lại.
+    Không tự khoá, HostGuard gọi dưới lock của nó.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = max(0.1, float(reset_timeout))
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> float:
+        """0 nếu được gửi, ngược lại số giây tới lần thăm dò tiếp theo."""
+        if self.state == CLOSED:
+            return 0.0
+        now = time.monotonic()
+        if self.state == OPEN:
+            remaining = self._opened_at + self.reset_timeout - now
+            if remaining > 0:
+                return remaining
+            self.state = HALF_OPEN
+            self._probing = False
+        if self._probing:
+            return self.reset_timeout
+        self._probing = True
+        return 0.0
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def cancel_probe(self) -> None:
+        """Request thăm dò không tới được host -> nhường lượt thăm dò cho request sau."""
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+
+    def retry_in(self) -> float:
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+
+class HostGuard:
+    """
+    Giới hạn request tới một host: token bucket (rate/burst) + số request đồng thời điều chỉnh kiểu AIMD
+    (thành công nhanh -> +1/limit, chậm hơn `latency_target` / 429 / 5xx -> chia đôi, tối đa một lần
+    mỗi `latency_target` giây) + circuit breaker. 429/503 có Retry-After thì dừng gửi tới hết hạn đó,
+    hạn dài hơn `max_wait` thì fail fast bằng HostUnavailable thay vì chặn thread.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        rate: float = 10.0,
+        burst: float = 20,
+        concurrency: float = 4,
+        min_concurrency: float = 1,
+        max_concurrency: float = 16,
+        latency_target: float = 2.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        max_wait: float = 10.0,
+        on_change: Callable[[str, Dict[str, Any]], None] | None = None,
+    ):
+        self.host = host
+        self.base_rate = max(0.01, float(rate))
+        self.bucket = TokenBucket(rate, burst)
+        self.min_concurrency = max(1.0, float(min_concurrency))
+        self.max_concurrency = max(self.min_concurrency, float(max_concurrency))
+        self.limit = min(self.max_concurrency, max(self.min_concurrency, float(concurrency)))
+        self.latency_target = max(0.05, float(latency_target))
+        self.max_wait = max(0.0, float(max_wait))
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.on_change = on_change
+        self._cond = threading.Condition()
+        self._inflight = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._health = "ok"
+
+    def acquire(self) -> float:
+        """Chờ tới lượt gửi; trả về thời điểm bắt đầu để truyền lại cho release()."""
+        with self._cond:
+            retry_in = self.breaker.allow()
+            if retry_in:
+                raise HostUnavailable(self.host, retry_in)
+            while True:
+                paused = self._paused_until - time.monotonic()
+                if paused > self.max_wait:
+                    self.breaker.cancel_probe()
+                    raise HostUnavailable(self.host, paused)
+                if paused > 0:
+                    self._cond.wait(paused)
+                elif self._inflight >= int(self.limit):
+                    self._cond.wait(1.0)
+                else:
+                    break
+            self._inflight += 1
+            delay = self.bucket.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return time.monotonic()
+
+    def release(self, started: float, resp: requests.Response | None = None, error: BaseException | None = None) -> None:
+        latency = time.monotonic() - started
+        status = resp.status_code if resp is not None else None
+        with self._cond:
+            self._inflight = max(0, self._inflight - 1)
+            retry_after = _retry_after(resp) if status in (429, 503) else None
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            if status == 429:
+                # host còn sống nhưng đang chặn -> giảm tốc, không tính lỗi cho breaker
+                self.breaker.record_success()
+                self._decrease(throttled=True)
+            elif isinstance(error, (requests.ConnectionError, requests.Timeout)) or _server_error(status):
+                self.breaker.record_failure()
+                self._decrease(throttled=status == 503)
+            elif error is not None:
+                self.breaker.cancel_probe()
+            else:
+                self.breaker.record_success()
+                if latency > self.latency_target:
+                    self._decrease()
+                else:
+                    self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+                    self.bucket.rate = min(self.base_rate, self.bucket.rate + self.base_rate * 0.05)
+            self._cond.notify_all()
+            changed = self._update_health()
+        if changed and self.on_change is not None:
+            try:
+                self.on_change(self.host, self.snapshot())
+            except Exception as e:
+                print("rate limit listener error:", e)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "health": self._health,
+                "state": self.breaker.state,
+                "retry_in": round(max(self.breaker.retry_in(), self._paused_until - time.monotonic(), 0.0), 1),
+                "limit": round(self.limit, 2),
+                "inflight": self._inflight,
+                "rate": round(self.bucket.rate, 2),
+            }
+
+    def _decrease(self, throttled: bool = False) -> None:
+        now = time.monotonic()
+        if throttled:
+            self.bucket.rate = max(self.base_rate / 8, self.bucket.rate / 2)
+        # nhiều response chậm/lỗi cùng một đợt chỉ tính một lần giảm
+        if now - self._last_decrease < self.latency_target:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_concurrency, self.limit / 2)
+
+    def _update_health(self) -> bool:
+        if self.breaker.state != CLOSED:
+            health = "down"
+        elif self._paused_until > time.monotonic() or self.bucket.rate < self.base_rate * 0.75:
+            health = "throttled"
+        else:
+            health = "ok"
+        changed, self._health = health != self._health, health
+        return changed
+
+
+class HostRateLimiter:
+    """Giữ một HostGuard cho mỗi host có policy (api.flashstudy.vn, backend); host khác không bị giới hạn."""
+
+    def __init__(self, policies: Dict[str, Dict[str, Any]] | None = None, **defaults):
+        self.policies = {host_key(url): dict(policy) for url, policy in (policies or {}).items() if url}
+        self.defaults = defaults
+        self._guards: Dict[str, HostGuard] = {}
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "HostRateLimiter":
+        config = config or {}
+        policies = {FLASHSTUDY_HOST: dict(FLASHSTUDY_POLICY)}
+        if config.get("backend_base_url"):
+            policies[config["backend_base_url"]] = dict(BACKEND_POLICY)
+        for url, policy in (config.get("rate_limits") or {}).items():
+            if isinstance(policy, dict):
+                merged = policies.get(url) or policies.get(host_key(url)) or {}
+                policies[url] = {**merged, **policy}
+        return cls(
+            policies,
+            latency_target=float(config.get("rate_limit_latency_target") or 2.0),
+            failure_threshold=int(config.get("circuit_failure_threshold") or 5),
+            reset_timeout=float(config.get("circuit_reset_seconds") or 30),
+            max_wait=float(config.get("rate_limit_max_wait", 10)),
+        )
+
+    def guard_for(self, url: str) -> HostGuard | None:
+        key = host_key(url)
+        with self._lock:
+            guard = self._guards.get(key)
+            if guard is None and key in self.policies:
+                policy = {k: v for k, v in {**self.defaults, **self.policies[key]}.items() if k in _POLICY_KEYS}
+                guard = HostGuard(key, **policy, on_change=self._notify)
+                self._guards[key] = guard
+            return guard
+
+    def add_listener(self, listener: Callable[[str, Dict[str, Any]], None]) -> None:
+        """listener(host, snapshot) được gọi khi host chuyển ok / throttled / down."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            guards = list(self._guards.values())
+        return {guard.host: guard.snapshot() for guard in guards}
+
+    def _notify(self, host: str, snapshot: Dict[str, Any]) -> None:
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(host, snapshot)
+            except Exception as e:
+                print("rate limit listener error:", e)
+
+
+def _retry_after(resp: requests.Response | None) -> float | None:
+    value = resp.headers.get("Retry-After") if resp is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _server_error(status: int | None) -> bool:
+    # 501 = endpoint chưa hỗ trợ (vd. batch), không phải host hỏng
+    return status is not None and status >= 500 and status != 501
+
+
+def is_host_failure(exc: BaseException) -> bool:
+    """Lỗi do host (mất kết nối, timeout, circuit mở, 429/5xx) -> được dùng dữ liệu cache cũ thay thế."""
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    resp = getattr(exc, "response", None)
+    return resp is not None and (resp.status_code == 429 or _server_error(resp.status_code))
@@ -0,0 +1,284 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Tuple
+
+from core.http_client import HttpClient
+from core.utils import append_download_log
+
+_CONTENT_RANGE = re.compile(r"bytes\s+\d+-\d+/(\d+)")
+
+
+class DownloadCancelled(Exception):
+    pass
+
+
+class _PositionalWriter:
+    """Ghi theo offset vào file đã cấp phát sẵn; dùng os.pwrite nếu có (POSIX)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | getattr(os, "O_BINARY", 0))
+        self._local = threading.local()
+        self._handles = []
+        self._lock = threading.Lock()
+
+    def write(self, offset: int, data: bytes) -> None:
+        if hasattr(os, "pwrite"):
+            view = memoryview(data)
+            while view:
+                written = os.pwrite(self._fd, view, offset)
+                view = view[written:]
+                offset += written
+            return
+        # Windows: mỗi thread một handle riêng, seek + write
+        f = getattr(self._local, "f", None)
+        if f is None:
+            f = open(self.path, "r+b")
+            self._local.f = f
+            with self._lock:
+                self._handles.append(f)
+        f.seek(offset)
+        f.write(data)
+        f.flush()
+
+    def close(self) -> None:
+        for f in self._handles:
+            try:
+                f.close()
+            except OSError:
+                pass
+        try:
+            os.close(self._fd)
+        except OSError:
+            pass
+
+
+class SegmentedDownloader:
+    """
+    Tải file lớn (MP4/PDF) bằng nhiều kết nối song song theo HTTP Range,
+    ghi thẳng vào file đã cấp phát sẵn; server không hỗ trợ Range thì tải một luồng.
+    """
+
+    def __init__(
+        self,
+        http: HttpClient | None = None,
+        connections: int = 4,
+        min_segment_size: int = 1024 * 1024,
+        chunk_size: int = 256 * 1024,
+        max_files: int = 2,
+        retries: int = 3,
+    ):
+        self._http = http
+        self.connections = max(1, int(connections))
+        self.min_segment_size = max(64 * 1024, int(min_segment_size))
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_files)), thread_name_prefix="flashstudy-seg")
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], http: HttpClient | None = None) -> "SegmentedDownloader":
+        config = config or {}
+        return cls(
+            http=http,
+            connections=int(config.get("segment_connections") or 4),
+            max_files=int(config.get("max_parallel_downloads") or 2),
+        )
+
+    @property
+    def http(self) -> HttpClient:
+        if self._http is None:
+            from core.api import get_http_client
+
+            return get_http_client()
+        return self._http
+
+    def submit(
+        self,
+        url: str,
+        output_path: str,
+        expected_sha256: str | None = None,
+        on_progress: Callable[[int, int | None], None] | None = None,
+        on_done: Callable[[bool, Dict[str, Any] | str], None] | None = None,
+        cancel_event: threading.Event | None = None,
+    ) -> Future:
+        def _job():
+            ok, result = self.download(url, output_path, expected_sha256, on_progress, cancel_event)
+            if on_done:
+                on_done(ok, result)
+            return ok, result
+
+        return self._executor.submit(_job)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def download(
+        self,
+        url: str,
+        output_path: str,
+        expected_sha256: str | None = None,
+        on_progress: Callable[[int, int | None], None] | None = None,
+        cancel_event: threading.Event | None = None,
+    ) -> Tuple[bool, Dict[str, Any] | str]:
+        if not url:
+            return False, "Thiếu đường dẫn tải"
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        part_path = f"{output_path}.part"
+        progress = _Progress(on_progress)
+        started = time.perf_counter()
+        try:
+            total, probe, ranged = self._probe(url)
+            if ranged and total >= self.min_segment_size * 2 and self.connections > 1:
+                probe.close()
+                self._download_segments(url, part_path, total, progress, cancel_event)
+            else:
+                self._download_single(probe, part_path, progress, cancel_event, total)
+                if not total:
+                    total = os.path.getsize(part_path)
+
+            size = os.path.getsize(part_path)
+            if size != total:
+                raise IOError(f"Sai kích thước file: {size}/{total} bytes")
+            checksum = _sha256_file(part_path)
+            if expected_sha256 and checksum.lower() != expected_sha256.lower():
+                raise IOError("Checksum không khớp")
+            os.replace(part_path, output_path)
+            append_download_log("SUCCESS", url, output_path, "", bytes=size, latency_ms=_elapsed_ms(started))
+            return True, {"path": output_path, "size": size, "sha256": checksum}
+        except DownloadCancelled:
+            append_download_log(
+                "FAIL", url, output_path, "cancelled", bytes=progress.done, latency_ms=_elapsed_ms(started)
+            )
+            return False, "Đã huỷ"
+        except Exception as exc:
+            append_download_log(
+                "FAIL", url, output_path, str(exc), bytes=progress.done, latency_ms=_elapsed_ms(started)
+            )
+            return False, f"Lỗi tải file: {exc}"
+
+    def _probe(self, url: str):
+        """GET bytes=0-0: 206 -> biết tổng dung lượng và hỗ trợ Range; 200 -> dùng luôn response đó."""
+        resp = self.http.get(url, headers={"Range": "bytes=0-0"}, stream=True)
+        if resp.status_code == 206:
+            match = _CONTENT_RANGE.search(resp.headers.get("Content-Range", ""))
+            if match:
+                total = int(match.group(1))
+                resp.close()
+                # mở lại stream đầy đủ cho trường hợp file quá nhỏ để chia đoạn
+                return total, _LazyStream(self, url), True
+        resp.raise_for_status()
+        length = resp.headers.get("Content-Length")
+        return (int(length) if length and length.isdigit() else None), resp, False
+
+    def _download_single(self, resp, part_path: str, progress: "_Progress", cancel_event, total: int | None) -> None:
+        if isinstance(resp, _LazyStream):
+            resp = resp.open()
+        try:
+            resp.raise_for_status()
+            with open(part_path, "wb") as f:
+                for chunk in resp.iter_content(chunk_size=self.chunk_size):
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise DownloadCancelled()
+                    if chunk:
+                        f.write(chunk)
+                        progress.add(len(chunk), total)
+        finally:
+            resp.close()
+
+    def _download_segments(self, url: str, part_path: str, total: int, progress: "_Progress", cancel_event) -> None:
+        with open(part_path, "wb") as f:
+            f.truncate(total)
+        count = min(self.connections, max(1, total // self.min_segment_size))
+        size = total // count
+        ranges = [(i * size, total - 1 if i == count - 1 else (i + 1) * size - 1) for i in range(count)]
+        writer = _PositionalWriter(part_path)
+        failed = threading.Event()
+        try:
+            with ThreadPoolExecutor(max_workers=count, thread_name_prefix="flashstudy-range") as pool:
+                futures = [
+                    pool.submit(self._fetch_range, url, start, end, writer, total, progress, cancel_event, failed)
+                    for start, end in ranges
+                ]
+                for future in futures:
+                    future.result()
+        finally:
+            writer.close()
+
+    def _fetch_range(self, url, start, end, writer, total, progress, cancel_event, failed) -> None:
+        offset = start
+        attempt = 0
+        while offset <= end:
+            if failed.is_set():
+                return
+            try:
+                resp = self.http.get(url, headers={"Range": f"bytes={offset}-{end}"}, stream=True)
+                try:
+                    if resp.status_code != 206:
+                        raise IOError(f"Server không trả 206 cho Range (status={resp.status_code})")
+                    for chunk in resp.iter_content(chunk_size=self.chunk_size):
+                        if cancel_event is not None and cancel_event.is_set():
+                            raise DownloadCancelled()
+                        if not chunk:
+                            continue
+                        chunk = chunk[: end - offset + 1]
+                        writer.write(offset, chunk)
+                        offset += len(chunk)
+                        progress.add(len(chunk), total)
+                finally:
+                    resp.close()
+                if offset <= end:
+                    raise IOError("Kết nối bị ngắt giữa chừng")
+            except DownloadCancelled:
+                failed.set()
+                raise
+            except Exception:
+                attempt += 1
+                if attempt > self.retries:
+                    failed.set()
+                    raise
+
+
+class _LazyStream:
+    def __init__(self, downloader: SegmentedDownloader, url: str):
+        self._downloader = downloader
+        self._url = url
+
+    def open(self):
+        return self._downloader.http.get(self._url, stream=True)
+
+    def close(self) -> None:
+        pass
+
+
+class _Progress:
+    def __init__(self, callback: Callable[[int, int | None], None] | None):
+        self._callback = callback
+        self._done = 0
+        self._lock = threading.Lock()
+
+    def add(self, n: int, total: int | None) -> None:
+        with self._lock:
+            self._done += n
+            done = self._done
+        if self._callback:
+            self._callback(done, total)
+
+    @property
+    def done(self) -> int:
+        return self._done
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def _sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
@@ -0,0 +1,118 @@
+import base64
+import json
+import threading
+import time
+from typing import Callable, Tuple
+
+
+def decode_jwt_exp(token: str) -> float | None:
+    """Đọc claim exp từ JWT (không kiểm chữ ký); token không phải JWT -> None."""
+    parts = (token or "").split(".")
+    if len(parts) != 3:
+        return None
+    try:
+        payload = parts[1] + "=" * (-len(parts[1]) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload.encode("ascii")))
+        exp = claims.get("exp") if isinstance(claims, dict) else None
+        return float(exp) if exp is not None else None
+    except (ValueError, TypeError):
+        return None
+
+
+class SessionManager:
+    """
+    Giữ access token của FlashStudyAPI: biết hạn token (JWT exp) mà không cần gọi mạng,
+    đăng nhập lại trước khi hết hạn nếu có thông tin đăng nhập, và gộp các lần refresh
+    đồng thời thành một (single-flight).
+    """
+
+    def __init__(
+        self,
+        login: Callable[[str, str], Tuple[int, object]] | None = None,
+        refresh_margin: float = 300.0,
+        on_token_changed: Callable[[str], None] | None = None,
+    ):
+        self._login = login
+        self.refresh_margin = max(0.0, float(refresh_margin))
+        self.on_token_changed = on_token_changed
+        self._token = ""
+        self._expires_at: float | None = None
+        self._credentials: Tuple[str, str] | None = None
+        self._lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+
+    @property
+    def token(self) -> str:
+        return self._token
+
+    @token.setter
+    def token(self, value: str) -> None:
+        self._token = value or ""
+        self._expires_at = decode_jwt_exp(self._token)
+        self._schedule_refresh()
+
+    @property
+    def expires_at(self) -> float | None:
+        return self._expires_at
+
+    def set_credentials(self, phone: str, password: str) -> None:
+        self._credentials = (phone, password) if phone and password else None
+        self._schedule_refresh()
+
+    def is_expired(self, skew: float = 30.0) -> bool | None:
+        """True/False nếu token là JWT có exp; None nếu không biết hạn."""
+        if not self._token:
+            return True
+        if self._expires_at is None:
+            return None
+        return time.time() >= self._expires_at - skew
+
+    def ensure_fresh(self) -> None:
+        """Gọi trước mỗi request: token sắp hết hạn thì đăng nhập lại trước."""
+        if self._expires_at is None or self._credentials is None:
+            return
+        if time.time() >= self._expires_at - self.refresh_margin:
+            self.refresh(self._token)
+
+    def refresh(self, stale_token: str) -> bool:
+        """
+        Đăng nhập lại để thay stale_token. Caller khác đã refresh xong trong lúc chờ khoá
+        -> dùng luôn token mới, không gọi login lần nữa.
+        """
+        with self._lock:
+            if self._token and self._token != stale_token:
+                return True
+            if self._login is None or self._credentials is None:
+                return False
+            phone, password = self._credentials
+            try:
+                code, token = self._login(phone, password)
+            except Exception as e:
+                print("session refresh error:", e)
+                return False
+            if code != 0 or not token:
+                return False
+            self.token = token
+        if self.on_token_changed:
+            try:
+                self.on_token_changed(token)
+            except Exception as e:
+                print("session token callback error:", e)
+        return True
+
+    def close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _schedule_refresh(self) -> None:
+        self.close()
+        if self._expires_at is None or self._credentials is None:
+            return
+        delay = self._expires_at - self.refresh_margin - time.time()
+        if delay <= 0:
+            return
+        token = self._token
+        self._timer = threading.Timer(delay, self.refresh, args=(token,))
+        self._timer.daemon = True
+        self._timer.start()
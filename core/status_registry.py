@@ -0,0 +1,193 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from core.api import get_download_statuses
+
+
+class StatusRegistry:
+    """
+    Gom mọi yêu cầu tra trạng thái video (popup, tải cả khoá, prefetch) trong một tick
+    thành một request status-by-video: bỏ trùng id, tách lô theo batch_limit,
+    cache kết quả trong thời gian ngắn (ttl).
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        fetch: Callable[[Dict[str, Any], list], Tuple[bool, Any]] = get_download_statuses,
+        tick: float = 0.05,
+        batch_limit: int = 100,
+        ttl: float = 5.0,
+    ):
+        self.config = config
+        self.fetch = fetch
+        self.tick = max(0.0, float(tick))
+        self.batch_limit = max(1, int(batch_limit))
+        self.ttl = float(ttl)
+        self._cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._pending: List[Tuple[Tuple[str, ...], float, Future]] = []
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread: threading.Thread | None = None
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self.requests_sent = 0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], **kwargs) -> "StatusRegistry":
+        config = config or {}
+        return cls(
+            config,
+            tick=float(config.get("status_tick_ms") or 50) / 1000.0,
+            batch_limit=int(config.get("status_batch_limit") or 100),
+            ttl=float(config.get("status_cache_ttl") or 5.0),
+            **kwargs,
+        )
+
+    def lookup(self, video_ids: Iterable[str], max_age: float | None = None) -> Future:
+        """Không block: trả về Future -> {video_id: info}."""
+        ids = tuple(dict.fromkeys(v for v in video_ids if v))
+        max_age = self.ttl if max_age is None else max_age
+        future: Future = Future()
+        cached = self._fresh(ids, max_age)
+        if cached is not None:
+            future.set_result(cached)
+            return future
+        with self._cond:
+            self._pending.append((ids, max_age, future))
+            self._cond.notify_all()
+        self._ensure_thread()
+        return future
+
+    def get(self, video_ids: Iterable[str], max_age: float | None = None, timeout: float | None = 30) -> Dict[str, Any]:
+        try:
+            return self.lookup(video_ids, max_age=max_age).result(timeout=timeout)
+        except Exception:
+            return {}
+
+    def as_fetcher(self, max_age: float = 0.0) -> Callable[[Dict[str, Any], list], Tuple[bool, Any]]:
+        """Adapter cùng chữ ký get_download_statuses để các service khác đi qua registry."""
+
+        def _fetch(_config, video_ids):
+            # lỗi / thiếu id phải trả False để phía gọi (StatusWatcher) còn backoff;
+            # _flush lỗi vẫn trả entry cũ trong cache nên kiểm tra cả thời điểm lấy
+            started = time.time()
+            try:
+                result = self.lookup(video_ids, max_age=max_age).result(timeout=30)
+            except Exception as e:
+                return False, f"Lỗi lấy status: {e}"
+            with self._cond:
+                missing = [
+                    vid
+                    for vid in video_ids
+                    if vid and (vid not in result or self._cache.get(vid, (0.0,))[0] < started - max_age)
+                ]
+            if missing:
+                return False, f"Lỗi lấy status: thiếu {len(missing)} video"
+            return True, result
+
+        return _fetch
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """listener({video_id: info}) được gọi (trên thread nền) mỗi khi có trạng thái mới."""
+        self._listeners.append(listener)
+
+    def update(self, statuses: Dict[str, Any]) -> None:
+        """Trạng thái từ nguồn khác (SSE); entry giống hệt bản đang giữ thì bỏ qua, không báo lại listener."""
+        now = time.time()
+        changed = {}
+        with self._cond:
+            for vid, info in (statuses or {}).items():
+                info = info if isinstance(info, dict) else {"status": info}
+                entry = self._cache.get(vid)
+                if entry is not None and entry[1] == info:
+                    continue
+                self._cache[vid] = (now, info)
+                changed[vid] = info
+        if changed:
+            self._notify(changed)
+
+    def _notify(self, statuses: Dict[str, Any]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(statuses or {})
+            except Exception as e:
+                print("status listener error:", e)
+
+    def invalidate(self, video_ids: Iterable[str]) -> None:
+        with self._cond:
+            for vid in video_ids:
+                self._cache.pop(vid, None)
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def _fresh(self, ids: Tuple[str, ...], max_age: float) -> Dict[str, Any] | None:
+        now = time.time()
+        result = {}
+        with self._cond:
+            for vid in ids:
+                entry = self._cache.get(vid)
+                if entry is None or now - entry[0] > max_age:
+                    return None
+                result[vid] = entry[1]
+        return result
+
+    def _ensure_thread(self) -> None:
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="flashstudy-status-registry", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    pending, self._pending = self._pending, []
+                    for _ids, _age, future in pending:
+                        future.set_result({})
+                    return
+            # gom thêm các yêu cầu tới trong cùng tick
+            if self.tick:
+                time.sleep(self.tick)
+            with self._cond:
+                pending, self._pending = self._pending, []
+            self._flush(pending)
+
+    def _flush(self, pending: List[Tuple[Tuple[str, ...], float, Future]]) -> None:
+        now = time.time()
+        wanted: Dict[str, None] = {}
+        with self._cond:
+            for ids, max_age, _future in pending:
+                for vid in ids:
+                    entry = self._cache.get(vid)
+                    if entry is None or now - entry[0] > max_age:
+                        wanted[vid] = None
+        ids = list(wanted)
+        for start in range(0, len(ids), self.batch_limit):
+            chunk = ids[start : start + self.batch_limit]
+            try:
+                ok, data = self.fetch(self.config, chunk)
+            except Exception as e:
+                ok, data = False, str(e)
+            self.requests_sent += 1
+            if not ok or not isinstance(data, dict):
+                continue
+            fetched_at = time.time()
+            with self._cond:
+                for vid in chunk:
+                    info = data.get(vid) or {}
+                    self._cache[vid] = (fetched_at, info if isinstance(info, dict) else {"status": info})
+            self._notify(data)
+        with self._cond:
+            for ids_, _age, future in pending:
+                result = {vid: self._cache[vid][1] for vid in ids_ if vid in self._cache}
+                if not future.done():
+                    future.set_result(result)
@@ -0,0 +1,218 @@
+import itertools
+import json
+import threading
+from typing import Any, Callable, Dict, Iterable
+
+from core.api import backend_headers, get_download_statuses, get_http_client
+
+ACTIVE_STATUSES = ("queued", "in_progress")
+
+
+class StatusWatcher:
+    """
+    Theo dõi trạng thái job tải trên backend và đẩy cập nhật cho các popup đang mở.
+    Ưu tiên kênh SSE (status_stream_path); backend không hỗ trợ thì long-poll
+    get_download_statuses với chu kỳ giãn dần khi job còn queued/in_progress.
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        fetch_statuses: Callable[[Dict[str, Any], list], tuple] = get_download_statuses,
+        min_interval: float = 2.0,
+        max_interval: float = 60.0,
+        idle_interval: float = 120.0,
+        stream_path: str | None = "/flashstudy/download/status-stream",
+        stream_read_timeout: float = 30.0,
+        on_statuses: Callable[[Dict[str, Any]], None] | None = None,
+    ):
+        self.config = config
+        self.fetch_statuses = fetch_statuses
+        self.min_interval = max(0.1, float(min_interval))
+        self.max_interval = max(self.min_interval, float(max_interval))
+        self.idle_interval = max(self.min_interval, float(idle_interval))
+        self.stream_path = stream_path
+        self.stream_read_timeout = stream_read_timeout
+        self.on_statuses = on_statuses
+        self._stream_supported = bool(stream_path)
+        self._subs: Dict[int, tuple] = {}
+        self._ids = itertools.count(1)
+        self._known: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._interval = self.min_interval
+        self._stream_resp = None
+        self._thread: threading.Thread | None = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], **kwargs) -> "StatusWatcher":
+        config = config or {}
+        return cls(
+            config,
+            min_interval=float(config.get("status_poll_min_interval") or 2.0),
+            max_interval=float(config.get("status_poll_max_interval") or 60.0),
+            stream_path=config.get("status_stream_path", "/flashstudy/download/status-stream") or None,
+            **kwargs,
+        )
+
+    def subscribe(self, video_ids: Iterable[str], callback: Callable[[Dict[str, Any]], None]) -> int:
+        """callback(statuses) được gọi từ thread watcher với {video_id: info} của các id đăng ký."""
+        ids = tuple(dict.fromkeys(v for v in video_ids if v))
+        with self._lock:
+            token = next(self._ids)
+            self._subs[token] = (ids, callback)
+        self.poke()
+        self.start()
+        return token
+
+    def unsubscribe(self, token: int) -> None:
+        with self._lock:
+            self._subs.pop(token, None)
+        self._interrupt_stream()
+
+    def poke(self) -> None:
+        """Có thay đổi (đăng ký mới, vừa enqueue) -> hỏi lại ngay, reset backoff."""
+        self._interval = self.min_interval
+        self._interrupt_stream()
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="flashstudy-status-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._interrupt_stream()
+        self._wake.set()
+
+    def _watched_ids(self) -> list[str]:
+        with self._lock:
+            return list(dict.fromkeys(v for ids, _cb in self._subs.values() for v in ids))
+
+    def _interrupt_stream(self) -> None:
+        resp = self._stream_resp
+        if resp is not None:
+            try:
+                resp.close()
+            except Exception:
+                pass
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            ids = self._watched_ids()
+            if not ids:
+                self._wake.wait(self.idle_interval)
+                self._wake.clear()
+                continue
+            if self._stream_supported and self._listen_stream(ids):
+                # stream bị ngắt -> chờ chút rồi kết nối lại
+                self._wake.wait(self.min_interval)
+                self._wake.clear()
+                continue
+            self._poll_once(ids)
+            self._wake.wait(self._interval)
+            self._wake.clear()
+
+    def _poll_once(self, ids: list[str]) -> None:
+        try:
+            ok, data = self.fetch_statuses(self.config, ids)
+        except Exception as e:
+            ok, data = False, str(e)
+        if not ok or not isinstance(data, dict):
+            self._interval = min(self._interval * 2, self.max_interval)
+            return
+        changed = self._dispatch(data)
+        active = any((data.get(v) or {}).get("status") in ACTIVE_STATUSES for v in ids)
+        if changed:
+            self._interval = self.min_interval
+        elif active:
+            self._interval = min(self._interval * 2, self.max_interval)
+        else:
+            self._interval = self.idle_interval
+
+    def _listen_stream(self, ids: list[str]) -> bool:
+        """Nghe SSE tới khi bị ngắt; trả về False nếu backend không hỗ trợ stream."""
+        base = self.config.get("backend_base_url")
+        if not base:
+            return False
+        try:
+            resp = get_http_client().get(
+                f"{base}{self.stream_path}",
+                params={"video_ids": ",".join(ids)},
+                headers={**backend_headers(self.config), "Accept": "text/event-stream"},
+                stream=True,
+                timeout=(10, self.stream_read_timeout),
+            )
+        except Exception:
+            return False
+        content_type = resp.headers.get("Content-Type", "")
+        if resp.status_code in (404, 405, 501) or (resp.ok and "text/event-stream" not in content_type):
+            resp.close()
+            self._stream_supported = False
+            return False
+        if not resp.ok:
+            resp.close()
+            return False
+
+        self._stream_resp = resp
+        try:
+            data_lines: list[str] = []
+            # chunk_size mặc định (512) giữ event ngắn trong buffer tới khi đủ byte -> đọc từng byte
+            for raw in resp.iter_lines(chunk_size=1, decode_unicode=True):
+                if self._stopped.is_set():
+                    break
+                line = raw or ""
+                if line.startswith("data:"):
+                    data_lines.append(line[5:].lstrip())
+                elif not line and data_lines:
+                    self._handle_event("\n".join(data_lines))
+                    data_lines = []
+                if set(self._watched_ids()) != set(ids):
+                    break
+        except Exception:
+            pass
+        finally:
+            self._stream_resp = None
+            resp.close()
+        return True
+
+    def _handle_event(self, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        if not isinstance(event, dict):
+            return
+        if isinstance(event.get("data"), dict):
+            self._dispatch(event["data"])
+        elif event.get("video_id"):
+            self._dispatch({event["video_id"]: event})
+
+    def _dispatch(self, statuses: Dict[str, Any]) -> bool:
+        if self.on_statuses:
+            try:
+                self.on_statuses(statuses)
+            except Exception as e:
+                print("status watcher sink error:", e)
+        changed_ids = set()
+        with self._lock:
+            for vid, info in statuses.items():
+                info = info if isinstance(info, dict) else {"status": info}
+                if self._known.get(vid) != info:
+                    self._known[vid] = info
+                    changed_ids.add(vid)
+            targets = [
+                (callback, {v: self._known.get(v, {}) for v in ids})
+                for ids, callback in self._subs.values()
+                if changed_ids.intersection(ids)
+            ]
+        for callback, payload in targets:
+            try:
+                callback(payload)
+            except Exception as e:
+                print("status watcher callback error:", e)
+        return bool(changed_ids)
@@ -0,0 +1,304 @@
+import abc
+import atexit
+import json
+import os
+import threading
+import time
+import weakref
+from typing import Any, Dict, Iterable, Mapping
+
+_MISSING = object()
+_open_stores: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    """Ghi file tạm cùng thư mục, fsync rồi os.replace: file đích luôn là bản cũ hoặc bản mới đầy đủ."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_json(path: str, payload: Any, indent: int | None = None) -> None:
+    if indent is None:
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    else:
+        body = json.dumps(payload, ensure_ascii=False, indent=indent)
+    atomic_write(path, body.encode("utf-8"))
+
+
+class FileLock:
+    """Khoá liên tiến trình bằng file `<path>.lock` (fcntl trên POSIX, msvcrt trên Windows)."""
+
+    def __init__(self, path: str, timeout: float = 5.0, poll: float = 0.05):
+        self.path = f"{path}.lock"
+        self.timeout = timeout
+        self.poll = poll
+        self._fd: int | None = None
+
+    def acquire(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                _lock_fd(fd)
+                self._fd = fd
+                return
+            except OSError:
+                if time.monotonic() >= deadline:
+                    os.close(fd)
+                    raise TimeoutError(f"Không lấy được khoá {self.path}")
+                time.sleep(self.poll)
+
+    def release(self) -> None:
+        fd, self._fd = self._fd, None
+        if fd is None:
+            return
+        try:
+            _unlock_fd(fd)
+        finally:
+            os.close(fd)
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+def _lock_fd(fd: int) -> None:
+    if os.name == "nt":
+        import msvcrt
+
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    else:
+        import fcntl
+
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def _unlock_fd(fd: int) -> None:
+    if os.name == "nt":
+        import msvcrt
+
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class KeyValueStore(abc.ABC):
+    """
+    Kho key-value lưu trên đĩa, ghi gộp (debounce): set/update chỉ đánh dấu key thay đổi,
+    sau `debounce` giây mới ghi một lần. Khi ghi chỉ áp các key đã đổi lên bản trên đĩa,
+    nên hai instance app cùng mở không ghi đè thay đổi của nhau.
+    Lớp con cài _read_all() và _write_changes(changed, deleted).
+    """
+
+    def __init__(self, path: str, debounce: float = 0.5):
+        self.path = path
+        self.debounce = max(0.0, float(debounce))
+        self._lock = threading.RLock()
+        self._data: Dict[str, Any] = {}
+        self._changed: Dict[str, Any] = {}
+        self._deleted: set = set()
+        self._timer: threading.Timer | None = None
+        self._data = self._read_all()
+        _open_stores.add(self)
+
+    # ----- đọc -----
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._data.get(key, default)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._data)
+
+    # ----- ghi -----
+
+    def set(self, key: str, value: Any) -> None:
+        self.update({key: value})
+
+    def update(self, values: Mapping[str, Any]) -> None:
+        with self._lock:
+            dirty = False
+            for key, value in (values or {}).items():
+                if self._data.get(key, _MISSING) == value:
+                    continue
+                self._data[key] = value
+                self._changed[key] = value
+                self._deleted.discard(key)
+                dirty = True
+            if dirty:
+                self._schedule()
+
+    def delete(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            dirty = False
+            for key in keys:
+                if key not in self._data:
+                    continue
+                del self._data[key]
+                self._changed.pop(key, None)
+                self._deleted.add(key)
+                dirty = True
+            if dirty:
+                self._schedule()
+
+    def clear(self) -> None:
+        self.delete(list(self._data))
+
+    def flush(self) -> None:
+        """Ghi ngay các thay đổi đang chờ; đồng thời nạp lại thay đổi của instance khác."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._changed and not self._deleted:
+                return
+            changed, deleted = dict(self._changed), set(self._deleted)
+            try:
+                merged = self._write_changes(changed, deleted)
+            except Exception as e:
+                print(f"Save store error ({os.path.basename(self.path)}):", e)
+                self._schedule()
+                return
+            self._changed.clear()
+            self._deleted.clear()
+            if merged is not None:
+                self._data = merged
+
+    def close(self) -> None:
+        self.flush()
+        _open_stores.discard(self)
+
+    def _schedule(self) -> None:
+        if self.debounce == 0:
+            self.flush()
+            return
+        if self._timer is None:
+            self._timer = threading.Timer(self.debounce, self._on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+        self.flush()
+
+    @abc.abstractmethod
+    def _read_all(self) -> Dict[str, Any]: ...
+
+    @abc.abstractmethod
+    def _write_changes(self, changed: Dict[str, Any], deleted: set) -> Dict[str, Any] | None: ...
+
+
+class JsonStore(KeyValueStore):
+    """Lưu cả kho trong một file JSON, ghi nguyên tử dưới FileLock."""
+
+    def __init__(self, path: str, debounce: float = 0.5, indent: int | None = None, lock_timeout: float = 5.0):
+        self.indent = indent
+        self.lock_timeout = lock_timeout
+        super().__init__(path, debounce=debounce)
+
+    def _read_all(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            # giữ lại file hỏng để còn cứu tay, không lặng lẽ ghi đè bằng {}
+            print(f"Load store error ({os.path.basename(self.path)}):", e)
+            try:
+                os.replace(self.path, f"{self.path}.corrupt")
+            except OSError:
+                pass
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _write_changes(self, changed: Dict[str, Any], deleted: set) -> Dict[str, Any]:
+        with FileLock(self.path, timeout=self.lock_timeout):
+            data = self._read_all()
+            data.update(changed)
+            for key in deleted:
+                data.pop(key, None)
+            atomic_write_json(self.path, data, indent=self.indent)
+        return data
+
+
+class SqliteStore(KeyValueStore):
+    """
+    Lưu mỗi key một dòng trong SQLite (WAL): ghi chỉ đụng các key thay đổi, hợp với kho lớn dần.
+    SQLite tự lo khoá giữa các tiến trình và tính nguyên tử của transaction.
+    """
+
+    def __init__(self, path: str, debounce: float = 0.5, busy_timeout: float = 5.0):
+        import sqlite3
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+        super().__init__(path, debounce=debounce)
+
+    def _read_all(self) -> Dict[str, Any]:
+        data = {}
+        for key, value in self._conn.execute("SELECT key, value FROM kv"):
+            try:
+                data[key] = json.loads(value)
+            except ValueError:
+                continue
+        return data
+
+    def _write_changes(self, changed: Dict[str, Any], deleted: set) -> Dict[str, Any]:
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)",
+                [(k, json.dumps(v, ensure_ascii=False, separators=(",", ":"))) for k, v in changed.items()],
+            )
+            self._conn.executemany("DELETE FROM kv WHERE key = ?", [(k,) for k in deleted])
+        return self._read_all()
+
+    def close(self) -> None:
+        super().close()
+        self._conn.close()
+
+
+def open_store(path: str, backend: str | None = None, debounce: float = 0.5, **kwargs) -> KeyValueStore:
+    """backend "sqlite" (hoặc đuôi .db/.sqlite) -> SqliteStore, còn lại JsonStore."""
+    if backend == "sqlite" or (backend is None and path.endswith((".db", ".sqlite"))):
+        return SqliteStore(path, debounce=debounce)
+    return JsonStore(path, debounce=debounce, **kwargs)
+
+
+@atexit.register
+def _flush_open_stores() -> None:
+    for store in list(_open_stores):
+        try:
+            store.flush()
+        except Exception:
+            pass
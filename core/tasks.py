@@ -0,0 +1,160 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Set
+
+
+class Task:
+    def __init__(self, group: str, on_success: Callable | None, on_error: Callable | None):
+        self.group = group
+        self.on_success = on_success
+        self.on_error = on_error
+        self.future = None
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+
+class TaskRunner:
+    """
+    Chạy các call mạng trên worker pool, kết quả đẩy vào queue thread-safe
+    và được xử lý trên thread Tk qua root.after (không block main loop).
+    """
+
+    def __init__(
+        self,
+        root,
+        max_workers: int = 4,
+        poll_ms: int = 16,
+        budget_ms: float = 8.0,
+        on_busy_change: Callable[[int], None] | None = None,
+    ):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.budget_ms = budget_ms
+        self.on_busy_change = on_busy_change
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="flashstudy-ui")
+        self._results: "queue.Queue[tuple]" = queue.Queue()
+        self._tasks: Dict[str, Set[Task]] = {}
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._closed = False
+        self._after_id = self.root.after(self.poll_ms, self._drain)
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def submit(
+        self,
+        fn: Callable,
+        *args,
+        on_success: Callable[[Any], None] | None = None,
+        on_error: Callable[[Exception], None] | None = None,
+        group: str = "default",
+        **kwargs,
+    ) -> Task:
+        task = Task(group, on_success, on_error)
+        with self._lock:
+            self._tasks.setdefault(group, set()).add(task)
+        self._set_inflight(+1)
+
+        def _work():
+            if task.cancelled:
+                self._results.put((task, "cancelled", None))
+                return
+            try:
+                result = fn(*args, **kwargs)
+                self._results.put((task, "ok", result))
+            except Exception as exc:
+                self._results.put((task, "error", exc))
+
+        try:
+            task.future = self._executor.submit(_work)
+        except RuntimeError as exc:
+            self._results.put((task, "error", exc))
+            return task
+        task.future.add_done_callback(
+            lambda f: f.cancelled() and self._results.put((task, "cancelled", None))
+        )
+        return task
+
+    def post(self, callback: Callable, *args) -> None:
+        """Gọi callback trên thread UI (dùng được từ bất kỳ thread nào)."""
+        self._results.put((None, "call", (callback, args)))
+
+    def cancel_group(self, group: str) -> None:
+        with self._lock:
+            tasks = list(self._tasks.get(group, ()))
+        for task in tasks:
+            task.cancel()
+
+    def cancel_all(self) -> None:
+        with self._lock:
+            tasks = [t for group in self._tasks.values() for t in group]
+        for task in tasks:
+            task.cancel()
+
+    def shutdown(self) -> None:
+        self._closed = True
+        self.cancel_all()
+        try:
+            self.root.after_cancel(self._after_id)
+        except Exception:
+            pass
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _set_inflight(self, delta: int) -> None:
+        with self._lock:
+            self._inflight = max(self._inflight + delta, 0)
+            count = self._inflight
+        if self.on_busy_change and threading.current_thread() is threading.main_thread():
+            try:
+                self.on_busy_change(count)
+            except Exception as e:
+                print("busy indicator error:", e)
+
+    def _finish(self, task: Task) -> None:
+        with self._lock:
+            group = self._tasks.get(task.group)
+            if group is not None:
+                group.discard(task)
+                if not group:
+                    self._tasks.pop(task.group, None)
+        self._set_inflight(-1)
+
+    def _drain(self) -> None:
+        if self._closed:
+            return
+        deadline = time.perf_counter() + self.budget_ms / 1000.0
+        while time.perf_counter() < deadline:
+            try:
+                task, kind, payload = self._results.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if kind == "call":
+                    callback, args = payload
+                    callback(*args)
+                    continue
+                self._finish(task)
+                if kind == "cancelled" or task.cancelled:
+                    continue
+                if kind == "ok" and task.on_success:
+                    task.on_success(payload)
+                elif kind == "error":
+                    if task.on_error:
+                        task.on_error(payload)
+                    else:
+                        print("background task error:", payload)
+            except Exception as e:
+                print("task callback error:", e)
+        self._after_id = self.root.after(self.poll_ms, self._drain)
@@ -1,54 +1,48 @@
-import json
+import functools
 import os
-import time
-import hashlib
 import platform
 import uuid
 
+from core.event_log import get_event_logger
+
 
 def ensure_resource_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
 
-def load_config(config_path: str) -> dict:
-    if not config_path or not os.path.isfile(config_path):
-        return {}
+def parse_timestamp(value) -> float | None:
+    """Epoch giây/mili-giây hoặc chuỗi ISO 8601 -> epoch giây; không đọc được -> None."""
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)):
+        # chấp nhận cả epoch mili-giây
+        return float(value) / 1000 if value > 1e12 else float(value)
     try:
-        with open(config_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data if isinstance(data, dict) else {}
-    except Exception:
-        return {}
+        from datetime import datetime
 
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
 
-def save_config(config_path: str, data: dict) -> None:
-    payload = data if isinstance(data, dict) else {}
-    with open(config_path, "w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
 
-
-def log_event(action: str, status: str, message: str = "") -> None:
+def log_event(action: str, status: str, message: str = "", **fields) -> None:
+    """Đẩy sự kiện sang EventLogger (ghi nền, JSON lines); không bao giờ raise."""
     try:
-        base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-        log_path = os.path.join(base_dir, "app_resource", ".log")
-        ts = time.strftime("%Y-%m-%d %H:%M:%S")
-        msg = f"{ts}\t{action}\t{status}"
-        if message:
-            msg = f"{msg}\t{message}"
-        with open(log_path, "a", encoding="utf-8") as f:
-            f.write(msg + "\n")
+        get_event_logger().log(action, status, message, **fields)
     except Exception:
         pass
 
 
-def append_download_log(status: str, url: str, output_path: str, error: str):
-    details = f"output={output_path}\turl={url}"
+def append_download_log(status: str, url: str, output_path: str, error: str, **fields):
     if error:
-        details = f"{details}\terror={error}"
-    log_event("download_video", status, details)
+        fields["error"] = error
+    log_event("download_video", status, output=output_path, url=url, **fields)
 
 
+@functools.lru_cache(maxsize=1)
 def get_device_info() -> dict:
+    import hashlib
+
     hostname = platform.node() or os.getenv("COMPUTERNAME") or "unknown-device"
     os_name = platform.system().lower() or "unknown-os"
     os_version = platform.release() or ""
@@ -0,0 +1,245 @@
+import bisect
+import itertools
+import tkinter as tk
+from tkinter import ttk
+from typing import Any, Callable, Dict, List
+
+_tag_ids = itertools.count(1)
+
+
+class RowView:
+    """
+    Một hàng có thể tái sử dụng. Lớp con dựng widget trong __init__ (gán vào self.widget,
+    master là canvas của VirtualList) và hiển thị dữ liệu trong update(item).
+    """
+
+    widget: tk.Widget
+    item: Any = None
+    kind: Any = None
+
+    def update(self, item: Any) -> None:
+        self.item = item
+
+    def set_hover(self, hover: bool) -> None:
+        pass
+
+
+class VirtualList(ttk.Frame):
+    """
+    Danh sách cuộn chỉ dựng widget cho các hàng trong viewport (+ `buffer` hàng đệm),
+    tái sử dụng hàng khi cuộn. Hover/cuộn chuột dùng một binding chung qua bindtag
+    thay vì bind riêng cho từng widget.
+
+    row_factory(kind, master) -> RowView; item_kind(item) -> kind (mặc định một loại).
+    Chiều cao mỗi loại hàng đo từ hàng đầu tiên được dựng. Có item_key thì set_items
+    đối chiếu theo key: hàng không đổi giữ nguyên, hàng đổi dữ liệu chỉ update().
+    """
+
+    def __init__(
+        self,
+        master: tk.Misc,
+        row_factory: Callable[[Any, tk.Misc], RowView],
+        item_kind: Callable[[Any], Any] | None = None,
+        item_key: Callable[[Any], Any] | None = None,
+        buffer: int = 6,
+        bg: str = "#FFFFFF",
+        on_scroll: Callable[[], None] | None = None,
+        **kwargs,
+    ):
+        super().__init__(master, **kwargs)
+        self.row_factory = row_factory
+        self.item_kind = item_kind or (lambda _item: None)
+        self.item_key = item_key
+        self.buffer = max(0, int(buffer))
+        self.on_scroll = on_scroll
+
+        self.canvas = tk.Canvas(self, highlightthickness=0, bg=bg)
+        self._vsb = ttk.Scrollbar(self, orient="vertical", command=self._yview)
+        self.canvas.configure(yscrollcommand=self._on_yscroll)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self._vsb.pack(side="right", fill="y")
+
+        self._items: List[Any] = []
+        self._offsets: List[int] = [0]
+        self._heights: Dict[Any, int] = {}
+        self._active: Dict[int, RowView] = {}
+        self._windows: Dict[int, int] = {}
+        self._pool: Dict[Any, List[RowView]] = {}
+        self._by_widget: Dict[str, RowView] = {}
+        self._hover: RowView | None = None
+        self._width = 1
+        self._refresh_job = None
+
+        self._tag = f"VirtualListRow{next(_tag_ids)}"
+        self.bind_class(self._tag, "<Enter>", self._on_enter)
+        self.bind_class(self._tag, "<Leave>", self._on_leave)
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.bind_class(self._tag, seq, self._on_wheel)
+            self.canvas.bind(seq, self._on_wheel)
+        self.canvas.bind("<Configure>", self._on_configure)
+
+    # ----- public -----
+
+    def set_items(self, items: List[Any]) -> None:
+        old_items = self._items
+        self._items = list(items)
+        self._measure_kinds()
+        self._offsets = [0]
+        for item in self._items:
+            self._offsets.append(self._offsets[-1] + self._heights[self.item_kind(item)])
+        if self.item_key is None:
+            for index in list(self._active):
+                self._release(index)
+        else:
+            self._reconcile(old_items)
+        self.canvas.configure(scrollregion=(0, 0, self._width, self._offsets[-1]))
+        self.refresh()
+
+    @property
+    def items(self) -> List[Any]:
+        return self._items
+
+    def visible_items(self, margin: int = 0) -> List[Any]:
+        first, last = self._visible_range(margin)
+        return self._items[first:last]
+
+    def refresh(self) -> None:
+        """Gắn hàng cho viewport hiện tại, thu hồi hàng đã ra khỏi vùng đệm."""
+        self._refresh_job = None
+        if not self._items:
+            return
+        first, last = self._visible_range(self.buffer)
+        for index in [i for i in self._active if i < first or i >= last]:
+            self._release(index)
+        for index in range(first, last):
+            if index not in self._active:
+                self._attach(index)
+
+    # ----- internals -----
+
+    def _reconcile(self, old_items: List[Any]) -> None:
+        new_index: Dict[Any, int] = {}
+        for index, item in enumerate(self._items):
+            new_index.setdefault(self.item_key(item), index)
+        active, windows = self._active, self._windows
+        self._active, self._windows = {}, {}
+        for old_index, row in active.items():
+            window = windows[old_index]
+            index = new_index.get(self.item_key(old_items[old_index]))
+            if index is None or index in self._active or self.item_kind(self._items[index]) != row.kind:
+                self._recycle(row, window)
+                continue
+            self._active[index] = row
+            self._windows[index] = window
+            self.canvas.coords(window, 0, self._offsets[index])
+            item = self._items[index]
+            if item != row.item:
+                row.update(item)
+
+    def _visible_range(self, margin_rows: int) -> tuple:
+        try:
+            top = self.canvas.canvasy(0)
+            height = self.canvas.winfo_height()
+        except tk.TclError:
+            return 0, 0
+        first = max(0, bisect.bisect_right(self._offsets, top) - 1 - margin_rows)
+        last = min(len(self._items), bisect.bisect_left(self._offsets, top + max(height, 1)) + margin_rows)
+        return first, last
+
+    def _measure_kinds(self) -> None:
+        for item in self._items:
+            kind = self.item_kind(item)
+            if kind in self._heights:
+                continue
+            row = self._acquire(kind)
+            row.update(item)
+            row.widget.update_idletasks()
+            self._heights[kind] = max(1, row.widget.winfo_reqheight())
+            self._pool[kind].append(row)
+
+    def _acquire(self, kind) -> RowView:
+        pool = self._pool.setdefault(kind, [])
+        if pool:
+            return pool.pop()
+        row = self.row_factory(kind, self.canvas)
+        row.kind = kind
+        self._add_tag(row, row.widget)
+        return row
+
+    def _add_tag(self, row: RowView, widget: tk.Misc) -> None:
+        widget.bindtags((self._tag,) + tuple(widget.bindtags()))
+        self._by_widget[str(widget)] = row
+        for child in widget.winfo_children():
+            self._add_tag(row, child)
+
+    def _attach(self, index: int) -> None:
+        item = self._items[index]
+        kind = self.item_kind(item)
+        row = self._acquire(kind)
+        row.update(item)
+        row.set_hover(False)
+        self._active[index] = row
+        self._windows[index] = self.canvas.create_window(
+            0, self._offsets[index], window=row.widget, anchor="nw", width=self._width, height=self._heights[kind]
+        )
+
+    def _release(self, index: int) -> None:
+        self._recycle(self._active.pop(index), self._windows.pop(index))
+
+    def _recycle(self, row: RowView, window: int) -> None:
+        self.canvas.delete(window)
+        if self._hover is row:
+            self._hover = None
+        self._pool[row.kind].append(row)
+
+    def _schedule_refresh(self) -> None:
+        if self._refresh_job is None:
+            self._refresh_job = self.after_idle(self.refresh)
+
+    def _yview(self, *args) -> None:
+        self.canvas.yview(*args)
+
+    def _on_yscroll(self, first, last) -> None:
+        self._vsb.set(first, last)
+        self._schedule_refresh()
+        if self.on_scroll:
+            self.on_scroll()
+
+    def _on_configure(self, event) -> None:
+        self._width = max(1, event.width)
+        for window in self._windows.values():
+            self.canvas.itemconfigure(window, width=self._width)
+        self.canvas.configure(scrollregion=(0, 0, self._width, self._offsets[-1]))
+        self._schedule_refresh()
+
+    def _on_wheel(self, event) -> str:
+        if getattr(event, "num", None) == 4:
+            step = -1
+        elif getattr(event, "num", None) == 5:
+            step = 1
+        else:
+            step = -1 if event.delta > 0 else 1
+        self.canvas.yview_scroll(step * 3, "units")
+        return "break"
+
+    def _on_enter(self, event) -> None:
+        row = self._by_widget.get(str(event.widget))
+        if row is None or row is self._hover:
+            return
+        if self._hover is not None:
+            self._hover.set_hover(False)
+        self._hover = row
+        row.set_hover(True)
+
+    def _on_leave(self, event) -> None:
+        row = self._by_widget.get(str(event.widget))
+        if row is None or row is not self._hover:
+            return
+        try:
+            under = self.winfo_containing(event.x_root, event.y_root)
+        except (tk.TclError, KeyError):
+            under = None
+        if under is not None and self._by_widget.get(str(under)) is row:
+            return
+        row.set_hover(False)
+        self._hover = None
@@ -0,0 +1,82 @@
+import threading
+import time
+
+from app import FlashStudyDownloaderApp
+from core.json_stream import ArrayStreamParser
+from core.models import CourseDetail, Lesson
+from core.tasks import TaskRunner
+
+
+class _FakeRoot:
+    def after(self, _ms, _fn, *_args):
+        return None
+
+    def after_cancel(self, _after_id):
+        pass
+
+
+class _StreamingApi:
+    def __init__(self, partial_seen: threading.Event):
+        self.partial_seen = partial_seen
+        self.full = CourseDetail([Lesson(1, "Chương 1"), Lesson(2, "Chương 2")])
+
+    def stream_course_detail(self, course_id, on_lessons=None):
+        on_lessons(CourseDetail(self.full.lessons[:1]))
+        # chờ UI xử lý partial đầu tiên rồi mới trả phần còn lại
+        assert self.partial_seen.wait(5)
+        on_lessons(self.full)
+        return 0, self.full
+
+
+class _FakeApp:
+    """Chỉ những gì _open_course_detail dùng; show_course_content huỷ group "screen" khi chuyển màn như _switch_frame."""
+
+    def __init__(self):
+        self.tasks = TaskRunner(_FakeRoot())
+        self.partial_seen = threading.Event()
+        self.AppApi = _StreamingApi(self.partial_seen)
+        self._screens = {}
+        self.shown = []
+        self.applied = []
+
+    def _open_cached_course(self, course_id, course_title):
+        return False
+
+    def _set_status(self, text):
+        pass
+
+    def show_course_content(self, chapters, course_title="", course_id=None, prefetch=True):
+        key = ("course", course_id)
+        if key not in self._screens:
+            self.tasks.cancel_group("screen")
+            self._screens[key] = {"key": key}
+        self.shown.append((chapters, prefetch))
+
+    def _apply_course_content(self, screen, chapters, prefetch=True):
+        self.applied.append((chapters, prefetch))
+        self.partial_seen.set()
+
+
+def test_stream_survives_first_partial_callback():
+    app = _FakeApp()
+    FlashStudyDownloaderApp._open_course_detail(app, 7, "Toán")
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and not (app.shown and app.shown[-1][0] == app.AppApi.full):
+        app.tasks._drain()
+        time.sleep(0.01)
+    app.tasks.shutdown()
+
+    assert app.applied and app.applied[0] == (CourseDetail([Lesson(1, "Chương 1")]), False)
+    # kết quả cuối vẫn tới (task không bị huỷ) và bật prefetch
+    assert app.shown[-1] == (app.AppApi.full, True)
+
+
+def test_number_split_across_chunks_is_one_item():
+    parser = ArrayStreamParser(("data", "lessons"))
+    items = parser.feed(b'{"data": {"lessons": [{"id": 1}, 4')
+    items += parser.feed(b"56, 7")
+    items += parser.feed(b'8]}, "status": 200}')
+    parser.close()
+    assert items == [{"id": 1}, 456, 78]
+    assert parser.done
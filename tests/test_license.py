@@ -0,0 +1,252 @@
+import base64
+import hashlib
+import hmac
+import json
+import shutil
+import threading
+import time
+
+import pytest
+import requests
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+
+from core.license import LICENSE_EXPIRED, LICENSE_GRACE, LICENSE_VALID, LicenseCache, LicenseChecker
+
+LICENSE_KEY = "FS-TEST-KEY"
+DEVICE_ID = "device-a"
+HOUR = 3600
+CONFIG = {"license_key": LICENSE_KEY, "backend_base_url": "http://backend.invalid"}
+DEVICE_INFO = {"device_name": "test", "os": "linux"}
+
+_SERVER_KEY = Ed25519PrivateKey.generate()
+PUBLIC_KEY = base64.b64encode(_SERVER_KEY.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)).decode()
+
+
+def _signed(expires_at, device_id=DEVICE_ID, **extra):
+    """Dữ liệu license như backend trả về: expires_at kèm chữ ký server."""
+    message = f"{LICENSE_KEY}|{device_id}|{expires_at}".encode("utf-8")
+    signature = base64.b64encode(_SERVER_KEY.sign(message)).decode()
+    return {"plan": "pro", "expires_at": expires_at, "signature": signature, **extra}
+
+
+def _read(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_resealed(path, record, device_id=DEVICE_ID):
+    """Sửa tay rồi tính lại seal: ai có license_key + device_id đều làm được."""
+    record = {k: v for k, v in record.items() if k != "seal"}
+    key = hashlib.sha256(f"{LICENSE_KEY}\0{device_id}".encode("utf-8")).digest()
+    body = json.dumps(record, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    record["seal"] = hmac.new(key, body, hashlib.sha256).hexdigest()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(record, f)
+
+
+class _StubBackend:
+    """Thay cho verify_license: mỗi lần gọi lấy một phản hồi trong `responses` (exception thì raise)."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def __call__(self, config, device_info, raise_on_unreachable=False):
+        self.calls.append(raise_on_unreachable)
+        if not self.responses:
+            raise AssertionError("backend không được gọi")
+        response = self.responses.pop(0)
+        if isinstance(response, BaseException):
+            raise response
+        return response
+
+
+def _server_error(status=503):
+    resp = requests.Response()
+    resp.status_code = status
+    return requests.HTTPError(f"License backend lỗi: status={status}", response=resp)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LicenseCache(
+        str(tmp_path / ".license_cache.json"), DEVICE_ID, ttl=24 * HOUR, grace=3 * 24 * HOUR, public_key=PUBLIC_KEY
+    )
+
+
+def _seed(cache, expires_in, verified_ago=0.0):
+    now = time.time()
+    return cache.store(LICENSE_KEY, _signed(now + expires_in), now=now - verified_ago)
+
+
+def test_valid_cache_skips_network(cache):
+    _seed(cache, expires_in=20 * HOUR)
+    backend = _StubBackend()
+    ok, data = LicenseChecker(cache, backend).check(CONFIG, DEVICE_INFO)
+    assert ok
+    assert data["plan"] == "pro"
+    assert backend.calls == []
+
+
+@pytest.mark.parametrize("failure", [_server_error(503), requests.ConnectionError("unreachable")])
+def test_backend_failure_within_grace_is_allowed(cache, failure):
+    _seed(cache, expires_in=-HOUR, verified_ago=25 * HOUR)
+    assert cache.status(cache.load(LICENSE_KEY)) == LICENSE_GRACE
+    backend = _StubBackend(failure)
+    ok, data = LicenseChecker(cache, backend).check(CONFIG, DEVICE_INFO)
+    assert ok
+    assert data["plan"] == "pro"
+    assert backend.calls == [True]
+    # cache giữ nguyên để lần sau vẫn còn grace
+    assert cache.load(LICENSE_KEY) is not None
+
+
+def test_backend_failure_past_grace_is_rejected(cache):
+    _seed(cache, expires_in=-4 * 24 * HOUR, verified_ago=5 * 24 * HOUR)
+    assert cache.status(cache.load(LICENSE_KEY)) == LICENSE_EXPIRED
+    backend = _StubBackend(requests.ConnectionError("unreachable"))
+    ok, message = LicenseChecker(cache, backend).check(CONFIG, DEVICE_INFO)
+    assert not ok
+    assert "Không kết nối được" in message
+    assert backend.calls == [True]
+
+
+def test_rejection_during_refresh_clears_cache_and_revokes(cache):
+    # còn hạn nhưng đã vào cửa sổ refresh -> check() cho qua và refresh nền
+    _seed(cache, expires_in=HOUR, verified_ago=23 * HOUR)
+    assert cache.needs_refresh(cache.load(LICENSE_KEY))
+    revoked = []
+    done = threading.Event()
+
+    def on_revoked(message):
+        revoked.append(message)
+        done.set()
+
+    backend = _StubBackend((False, "License đã bị thu hồi"))
+    ok, _data = LicenseChecker(cache, backend, on_revoked=on_revoked).check(CONFIG, DEVICE_INFO)
+    assert ok
+    assert done.wait(5)
+    assert revoked == ["License đã bị thu hồi"]
+    assert cache.load(LICENSE_KEY) is None
+
+
+def test_corrupted_cache_is_rejected_by_seal(cache):
+    _seed(cache, expires_in=20 * HOUR)
+    record = _read(cache.path)
+    record["data"]["plan"] = "enterprise"
+    with open(cache.path, "w", encoding="utf-8") as f:
+        json.dump(record, f)
+    assert cache.load(LICENSE_KEY) is None
+
+
+def test_resealed_expiry_is_rejected_by_signature(cache):
+    _seed(cache, expires_in=-4 * 24 * HOUR, verified_ago=5 * 24 * HOUR)
+    record = _read(cache.path)
+    record["data"]["expires_at"] = time.time() + 30 * 24 * HOUR
+    _write_resealed(cache.path, record)
+
+    assert cache.load(LICENSE_KEY) is None
+    backend = _StubBackend((False, "License không hợp lệ"))
+    ok, _message = LicenseChecker(cache, backend).check(CONFIG, DEVICE_INFO)
+    assert not ok
+    assert backend.calls == [True]
+
+
+def test_resealed_verified_at_cannot_outlive_signed_expiry(cache):
+    # seal tính lại được, nhưng hạn offline không vượt expires_at đã ký
+    _seed(cache, expires_in=-4 * 24 * HOUR, verified_ago=5 * 24 * HOUR)
+    record = _read(cache.path)
+    record["verified_at"] = time.time()
+    record["expires_at"] = time.time() + 365 * 24 * HOUR
+    _write_resealed(cache.path, record)
+
+    loaded = cache.load(LICENSE_KEY)
+    assert loaded is not None
+    assert cache.status(loaded) == LICENSE_EXPIRED
+
+
+def test_unsigned_record_is_not_trusted_by_default(tmp_path):
+    cache = LicenseCache(str(tmp_path / ".license_cache.json"), DEVICE_ID)
+    cache.store(LICENSE_KEY, {"plan": "pro", "expires_at": time.time() + 20 * HOUR})
+    assert cache.load(LICENSE_KEY) is None
+
+
+def test_long_license_is_rechecked_every_cache_window(cache):
+    now = time.time()
+    record = cache.store(LICENSE_KEY, _signed(now + 365 * 24 * HOUR), now=now)
+    assert cache.status(record, now=now + 12 * HOUR) == LICENSE_VALID
+    assert cache.needs_refresh(record, now=now + 20 * HOUR)
+    assert cache.status(record, now=now + 25 * HOUR) == LICENSE_GRACE
+
+
+def test_cache_copied_to_another_device_is_rejected(cache, tmp_path):
+    _seed(cache, expires_in=20 * HOUR)
+    copied_path = tmp_path / "other" / ".license_cache.json"
+    copied_path.parent.mkdir()
+    shutil.copy(cache.path, copied_path)
+
+    # sửa device_id và tính lại seal cho máy mới: chữ ký server vẫn gắn với máy cũ
+    record = _read(copied_path)
+    record["device_id"] = "device-b"
+    _write_resealed(copied_path, record, device_id="device-b")
+
+    other = LicenseCache(str(copied_path), "device-b", public_key=PUBLIC_KEY)
+    assert other.load(LICENSE_KEY) is None
+    backend = _StubBackend(requests.ConnectionError("unreachable"))
+    ok, _message = LicenseChecker(other, backend).check(CONFIG, DEVICE_INFO)
+    assert not ok
+    assert backend.calls == [True]
+
+
+class _LicenseBackend:
+    """Backend license thật qua http.server trên cổng ngẫu nhiên, trả cố định (status, body)."""
+
+    def __init__(self, status, body):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *_args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _verify_against(backend):
+    from core.api import verify_license
+
+    config = dict(CONFIG, backend_base_url=backend.base_url, device_id=DEVICE_ID)
+    return verify_license(config, DEVICE_INFO, raise_on_unreachable=True)
+
+
+def test_malformed_body_is_a_rejection_not_unreachable():
+    backend = _LicenseBackend(200, b"<html>not json")
+    try:
+        ok, message = _verify_against(backend)
+    finally:
+        backend.close()
+    assert not ok
+    assert "Lỗi verify license" in message
+
+
+def test_server_error_is_unreachable():
+    backend = _LicenseBackend(503, b"{}")
+    try:
+        with pytest.raises(requests.HTTPError):
+            _verify_against(backend)
+    finally:
+        backend.close()
@@ -0,0 +1,44 @@
+import threading
+import time
+
+from app import FlashStudyDownloaderApp
+from core.media_library import MediaLibrary
+
+
+class _FakeApp:
+    def __init__(self, download_dir):
+        self.configuration = {"download_dir": download_dir}
+        self.media_library = None
+        self._media_library_lock = threading.Lock()
+
+
+def test_concurrent_callers_share_one_library(tmp_path, monkeypatch):
+    created = []
+    original = MediaLibrary.from_config.__func__
+
+    def slow_from_config(cls, config, download_dir):
+        # nới rộng cửa sổ race giữa kiểm tra None và gán
+        time.sleep(0.05)
+        library = original(cls, config, download_dir)
+        created.append(library)
+        return library
+
+    monkeypatch.setattr(MediaLibrary, "from_config", classmethod(slow_from_config))
+    app = _FakeApp(str(tmp_path))
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(FlashStudyDownloaderApp._get_media_library(app)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    try:
+        assert len(created) == 1
+        assert len(results) == 8
+        assert all(library is created[0] for library in results)
+    finally:
+        for library in created:
+            library.close()
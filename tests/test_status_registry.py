@@ -0,0 +1,74 @@
+import time
+
+from core.status_registry import StatusRegistry
+
+
+class _StubFetch:
+    """Thay cho get_download_statuses: trả lần lượt các phản hồi trong `responses`."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def __call__(self, config, video_ids):
+        self.calls.append(list(video_ids))
+        response = self.responses.pop(0) if self.responses else (False, "backend down")
+        if isinstance(response, BaseException):
+            raise response
+        return response
+
+
+def _registry(fetch):
+    return StatusRegistry({}, fetch=fetch, tick=0.0, ttl=5.0)
+
+
+def test_fetcher_reports_success():
+    registry = _registry(_StubFetch((True, {"v1": {"status": "done"}})))
+    try:
+        assert registry.as_fetcher()({}, ["v1"]) == (True, {"v1": {"status": "done"}})
+    finally:
+        registry.stop()
+
+
+def test_fetcher_reports_backend_failure():
+    registry = _registry(_StubFetch((False, "status=503")))
+    try:
+        ok, message = registry.as_fetcher()({}, ["v1"])
+        assert not ok
+        assert "thiếu" in message
+    finally:
+        registry.stop()
+
+
+def test_fetcher_does_not_pass_stale_entries_off_as_fresh():
+    fetch = _StubFetch((True, {"v1": {"status": "queued"}}), ConnectionError("unreachable"))
+    registry = _registry(fetch)
+    try:
+        assert registry.as_fetcher()({}, ["v1"])[0]
+        time.sleep(0.05)
+        # lần sau backend lỗi: registry vẫn còn bản cũ nhưng adapter phải báo lỗi
+        ok, _message = registry.as_fetcher(max_age=0.0)({}, ["v1"])
+        assert not ok
+        assert len(fetch.calls) == 2
+    finally:
+        registry.stop()
+
+
+def test_update_skips_entries_already_held():
+    registry = _registry(_StubFetch((True, {"v1": {"status": "done", "drive_link": "x"}})))
+    notified = []
+    registry.add_listener(notified.append)
+    try:
+        statuses = registry.get(["v1"])
+        assert notified == [{"v1": {"status": "done", "drive_link": "x"}}]
+        stamp = registry._cache["v1"][0]
+
+        # StatusWatcher đẩy lại chính kết quả registry vừa trả -> không báo listener lần hai
+        registry.update(statuses)
+        assert len(notified) == 1
+        assert registry._cache["v1"][0] == stamp
+
+        registry.update({"v1": {"status": "expired"}, "v2": "queued"})
+        assert notified[-1] == {"v1": {"status": "expired"}, "v2": {"status": "queued"}}
+    finally:
+        registry.stop()
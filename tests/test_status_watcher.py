@@ -0,0 +1,184 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from core.status_watcher import StatusWatcher
+
+STREAM_PATH = "/flashstudy/download/status-stream"
+
+
+class _Backend:
+    """
+    Backend giả trên cổng ngẫu nhiên. `stream_plan` là danh sách hành vi cho từng lần mở stream:
+    ("events", [payload...], giữ_kết_nối) hoặc ("status", mã HTTP); hết plan thì trả 501.
+    """
+
+    def __init__(self, stream_plan, poll_statuses=None):
+        self.stream_plan = list(stream_plan)
+        self.poll_statuses = poll_statuses or {}
+        self.stream_requests = 0
+        self.poll_requests = []
+        self.stream_closed = threading.Event()
+        self.released = threading.Event()
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *_args):
+                pass
+
+            def do_GET(self):
+                if not self.path.startswith(STREAM_PATH):
+                    self._reply(404, b"{}")
+                    return
+                backend.stream_requests += 1
+                step = backend.stream_plan.pop(0) if backend.stream_plan else ("status", 501)
+                if step[0] == "status":
+                    self._reply(step[1], b"{}")
+                    return
+                _kind, events, keep_open = step
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                try:
+                    for event in events:
+                        self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                    # giữ kết nối bằng comment keep-alive như backend thật
+                    while keep_open and not backend.released.wait(0.05):
+                        self.wfile.write(b": ping\n\n")
+                        self.wfile.flush()
+                except OSError:
+                    pass
+                finally:
+                    backend.stream_closed.set()
+                    self.close_connection = True
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                ids = json.loads(body or b"{}").get("video_ids") or []
+                backend.poll_requests.append(ids)
+                data = {v: backend.poll_statuses[v] for v in ids if v in backend.poll_statuses}
+                self._reply(200, json.dumps({"code": 0, "data": data}).encode("utf-8"))
+
+            def _reply(self, status, body):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.released.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def make_backend():
+    backends = []
+
+    def factory(stream_plan, poll_statuses=None):
+        backend = _Backend(stream_plan, poll_statuses)
+        backends.append(backend)
+        return backend
+
+    yield factory
+    for backend in backends:
+        backend.close()
+
+
+def _watcher(backend):
+    config = {"backend_base_url": backend.base_url, "device_id": "test-device"}
+    return StatusWatcher(config, min_interval=0.1, max_interval=0.5, stream_read_timeout=5.0)
+
+
+def _collector():
+    received = []
+    cond = threading.Condition()
+
+    def callback(statuses):
+        with cond:
+            received.append(statuses)
+            cond.notify_all()
+
+    def wait_for(predicate, timeout=5.0):
+        with cond:
+            return cond.wait_for(lambda: any(predicate(s) for s in received), timeout)
+
+    return callback, wait_for
+
+
+def test_sse_event_is_pushed_to_subscriber(make_backend):
+    backend = make_backend([("events", [{"video_id": "v1", "status": "done", "progress": 100}], True)])
+    watcher = _watcher(backend)
+    callback, wait_for = _collector()
+    try:
+        watcher.subscribe(["v1"], callback)
+        # event phải tới ngay, không nằm trong buffer chờ thêm keep-alive
+        assert wait_for(lambda s: s.get("v1", {}).get("status") == "done", timeout=1.0)
+        assert backend.stream_requests == 1
+        assert backend.poll_requests == []
+    finally:
+        watcher.stop()
+
+
+def test_falls_back_to_polling_when_stream_drops(make_backend):
+    backend = make_backend(
+        [("events", [{"video_id": "v1", "status": "in_progress"}], False), ("status", 503)],
+        poll_statuses={"v1": {"status": "done"}},
+    )
+    watcher = _watcher(backend)
+    callback, wait_for = _collector()
+    try:
+        watcher.subscribe(["v1"], callback)
+        assert wait_for(lambda s: s.get("v1", {}).get("status") == "in_progress")
+        # stream đóng, lần nối lại bị 503 -> watcher hỏi qua status-by-video
+        assert wait_for(lambda s: s.get("v1", {}).get("status") == "done")
+        assert backend.stream_requests >= 2
+        assert ["v1"] in backend.poll_requests
+    finally:
+        watcher.stop()
+
+
+def test_unsupported_stream_switches_to_polling_for_good(make_backend):
+    backend = make_backend([("status", 404)], poll_statuses={"v1": {"status": "queued"}})
+    watcher = _watcher(backend)
+    callback, wait_for = _collector()
+    try:
+        watcher.subscribe(["v1"], callback)
+        assert wait_for(lambda s: s.get("v1", {}).get("status") == "queued")
+        deadline = time.monotonic() + 5
+        while len(backend.poll_requests) < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert len(backend.poll_requests) >= 2
+        assert backend.stream_requests == 1
+    finally:
+        watcher.stop()
+
+
+def test_stop_closes_open_stream_and_ends_thread(make_backend):
+    backend = make_backend([("events", [{"video_id": "v1", "status": "queued"}], True)])
+    watcher = _watcher(backend)
+    callback, wait_for = _collector()
+    watcher.subscribe(["v1"], callback)
+    assert wait_for(lambda s: "v1" in s)
+
+    watcher.stop()
+    watcher._thread.join(5)
+    assert not watcher._thread.is_alive()
+    assert watcher._stream_resp is None
+    # phía server thấy client đã đóng stream (không đợi tới lúc tắt server)
+    assert backend.stream_closed.wait(5)
+    assert backend.stream_requests == 1